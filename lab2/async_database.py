@@ -0,0 +1,323 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
+
+from database import GeometryDatabase, _insert_calculations, _throughput_report
+from geometry_package import Material
+
+
+class _Cancelled(Exception):
+    """Внутренний сигнал отмены пакетной записи (транзакция откатывается)"""
+
+
+class _WriteJob:
+    """Задание писателя: save - одна строка, bulk - пакет в одной транзакции"""
+
+    __slots__ = ('kind', 'payload', 'future', 'loop', 'cancelled')
+
+    def __init__(self, kind: str, payload, future: asyncio.Future, loop: asyncio.AbstractEventLoop):
+        self.kind = kind
+        self.payload = payload
+        self.future = future
+        self.loop = loop
+        self.cancelled = False
+
+
+class AsyncGeometryDatabase:
+    """Асинхронная обёртка GeometryDatabase для сервисов на asyncio.
+
+    Запись идёт в одном выделенном потоке-писателе через очередь: записи
+    упорядочены, подряд идущие save_calculation фиксируются одной транзакцией.
+    Чтение выполняется в пуле из readers потоков, у каждого своё соединение;
+    в режиме WAL читатели не ждут писателя и друг друга.
+
+    Обратное давление: в работе не больше max_pending заданий записи. Когда
+    лимит исчерпан, submit_calculation/save_calculation ждут (не блокируя цикл
+    событий), пока писатель не завершит одно из заданий.
+
+    Отмена:
+    - запись, отменённая до того, как писатель её взял, не выполняется;
+    - запись, которую писатель уже выполняет, доводится до фиксации, результат
+      отбрасывается (для гарантированной записи - asyncio.shield);
+    - пакетная запись при отмене откатывается целиком, даже если часть строк
+      уже вставлена (проверка отмены - перед каждым пакетом chunk_size строк);
+    - отменённое чтение прерывается через sqlite3.Connection.interrupt().
+    """
+
+    _STOP = object()
+
+    def __init__(self, db_path: str = "geometry_calculations.db", max_pending: int = 1000,
+                 readers: int = 4, max_batch: int = 500, cached_statements: int = 128):
+        if db_path == ":memory:":
+            raise ValueError("Асинхронный режим требует файл базы: у каждого потока своё соединение")
+        if max_pending <= 0 or readers <= 0 or max_batch <= 0:
+            raise ValueError("Лимиты очереди, читателей и пакета должны быть положительными")
+        self.db_path = db_path
+        self.max_pending = max_pending
+        self.max_batch = max_batch
+        self.cached_statements = cached_statements
+        self._readers = readers
+        self._db = None
+        self._queue = queue.Queue()
+        self._slots = None
+        self._pending = 0
+        self._drained = None
+        self._writer = None
+        self._reader_pool = None
+        self._closed = False
+
+    async def start(self) -> 'AsyncGeometryDatabase':
+        """Открытие базы (схема и миграции - в отдельном потоке) и запуск писателя"""
+        if self._db is not None:
+            return self
+        self._db = await asyncio.to_thread(GeometryDatabase, self.db_path, self.cached_statements)
+        self._slots = asyncio.Semaphore(self.max_pending)
+        self._drained = asyncio.Event()
+        self._drained.set()
+        self._reader_pool = ThreadPoolExecutor(max_workers=self._readers,
+                                               thread_name_prefix="geometry-async-reader")
+        self._writer = threading.Thread(target=self._run_writer, name="geometry-async-writer", daemon=True)
+        self._writer.start()
+        return self
+
+    async def close(self):
+        """Остановка: уже принятые записи фиксируются, новые не принимаются"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._db is None:
+            return
+        self._queue.put(self._STOP)
+        await asyncio.to_thread(self._writer.join)
+        self._reader_pool.shutdown(wait=True)
+        self._db.close()
+
+    async def __aenter__(self) -> 'AsyncGeometryDatabase':
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    @property
+    def database(self) -> GeometryDatabase:
+        """Синхронная база (каталог материалов и т.п.)"""
+        self._check_open()
+        return self._db
+
+    @property
+    def pending(self) -> int:
+        """Число заданий записи, которые ещё не завершены писателем"""
+        return self._pending
+
+    def _check_open(self):
+        if self._db is None:
+            raise RuntimeError("База не открыта: используйте 'async with' или await start()")
+        if self._closed:
+            raise RuntimeError("База уже закрыта")
+
+    # Запись
+
+    async def _submit(self, kind: str, payload) -> asyncio.Future:
+        self._check_open()
+        await self._slots.acquire()
+        if self._closed:
+            self._slots.release()
+            raise RuntimeError("База уже закрыта")
+        loop = asyncio.get_running_loop()
+        job = _WriteJob(kind, payload, loop.create_future(), loop)
+
+        def on_done(future):
+            if future.cancelled():
+                job.cancelled = True
+        job.future.add_done_callback(on_done)
+        self._pending += 1
+        self._drained.clear()
+        self._queue.put(job)
+        return job.future
+
+    async def submit_calculation(self, shape_data: Dict[str, Any], parameters: Dict[str, float],
+                                 material: Optional[Material] = None) -> asyncio.Future:
+        """Постановка расчёта в очередь. Ждёт только свободного места (обратное
+        давление); возвращает future, которая завершится после фиксации строки"""
+        return await self._submit('save', (shape_data, parameters, material))
+
+    async def save_calculation(self, shape_data: Dict[str, Any], parameters: Dict[str, float],
+                               material: Optional[Material] = None):
+        """Сохранение расчёта; возвращается после фиксации транзакции"""
+        await (await self.submit_calculation(shape_data, parameters, material))
+
+    async def save_calculations_bulk(self, records: Iterable[Tuple[Dict[str, Any], Dict[str, float]]],
+                                     chunk_size: int = 1000) -> Dict[str, Any]:
+        """Пакетное сохранение в одной транзакции; records читается в потоке-писателе"""
+        if chunk_size <= 0:
+            raise ValueError("Размер пакета должен быть положительным")
+        return await (await self._submit('bulk', (records, chunk_size)))
+
+    async def flush(self):
+        """Ожидание завершения всех принятых заданий записи (как queue.join():
+        семафор отвечает только за обратное давление, поэтому несколько flush
+        могут ждать одновременно)"""
+        self._check_open()
+        await self._drained.wait()
+
+    def _complete(self, job: _WriteJob, result=None, error: Optional[BaseException] = None):
+        # Вызывается в потоке писателя; future и семафор трогаются только из цикла событий
+        def resolve():
+            self._pending -= 1
+            if self._pending == 0:
+                self._drained.set()
+            self._slots.release()
+            if job.future.done():
+                return
+            if error is not None:
+                job.future.set_exception(error)
+            else:
+                job.future.set_result(result)
+        try:
+            job.loop.call_soon_threadsafe(resolve)
+        except RuntimeError:
+            # Цикл событий уже закрыт - результат некому отдать
+            pass
+
+    def _run_writer(self):
+        carry = None
+        while True:
+            job = carry if carry is not None else self._queue.get()
+            carry = None
+            if job is self._STOP:
+                break
+            if job.kind == 'bulk':
+                self._write_bulk(job)
+                continue
+            batch = [job]
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not self._STOP and item.kind == 'save':
+                    batch.append(item)
+                else:
+                    carry = item
+                    break
+            self._write_batch(batch)
+        self._db.close_thread_connection()
+
+    def _write_batch(self, batch: List[_WriteJob]):
+        jobs = []
+        rows = []
+        for job in batch:
+            if job.cancelled:
+                self._complete(job)
+                continue
+            try:
+                rows.append(self._db._calculation_row(*job.payload))
+            except (KeyError, TypeError, ValueError) as e:
+                self._complete(job, error=e)
+                continue
+            jobs.append(job)
+        if not jobs:
+            return
+        conn = self._db.connection
+        try:
+            with conn:
+                _insert_calculations(conn, rows)
+        except Exception as e:
+            for job in jobs:
+                self._complete(job, error=e)
+            return
+        for job in jobs:
+            self._complete(job)
+
+    def _write_bulk(self, job: _WriteJob):
+        if job.cancelled:
+            self._complete(job)
+            return
+        records, chunk_size = job.payload
+        conn = self._db.connection
+        rows = (self._db._calculation_row(*record) for record in records)
+        saved = 0
+        start = time.perf_counter()
+        try:
+            with conn:
+                if not conn.in_transaction:
+                    conn.execute('BEGIN')
+                chunk = []
+                for row in rows:
+                    chunk.append(row)
+                    if len(chunk) == chunk_size:
+                        if job.cancelled:
+                            raise _Cancelled()
+                        _insert_calculations(conn, chunk)
+                        saved += len(chunk)
+                        chunk = []
+                if job.cancelled:
+                    raise _Cancelled()
+                if chunk:
+                    _insert_calculations(conn, chunk)
+                    saved += len(chunk)
+        except _Cancelled:
+            self._complete(job)
+            return
+        except Exception as e:
+            self._complete(job, error=e)
+            return
+        self._complete(job, _throughput_report(saved, time.perf_counter() - start))
+
+    # Чтение
+
+    async def _read(self, func: Callable, *args, **kwargs):
+        """Вызов func в потоке-читателе; при отмене запрос прерывается"""
+        self._check_open()
+        loop = asyncio.get_running_loop()
+        lock = threading.Lock()
+        state = {'conn': None, 'cancelled': False}
+
+        def call():
+            conn = self._db.connection
+            with lock:
+                if state['cancelled']:
+                    return None
+                state['conn'] = conn
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with lock:
+                    state['conn'] = None
+
+        future = loop.run_in_executor(self._reader_pool, call)
+        try:
+            return await future
+        except asyncio.CancelledError:
+            with lock:
+                state['cancelled'] = True
+                if state['conn'] is not None:
+                    state['conn'].interrupt()
+            raise
+
+    async def get_calculations_page(self, limit: int = 50, after: Optional[int] = None,
+                                    **filters) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """Страница истории (см. GeometryDatabase.get_calculations_page)"""
+        return await self._read(self._db.get_calculations_page, limit, after, **filters)
+
+    async def iter_calculations(self, page_size: int = 500, **filters) -> AsyncIterator[Dict[str, Any]]:
+        """Асинхронный обход истории: каждая страница читается в потоке-читателе"""
+        after = None
+        while True:
+            rows, after = await self.get_calculations_page(page_size, after, **filters)
+            for row in rows:
+                yield row
+            if after is None:
+                break
+
+    async def get_statistics(self) -> Dict[str, Any]:
+        return await self._read(self._db.get_statistics)
+
+    async def get_material_statistics(self) -> List[Dict[str, Any]]:
+        return await self._read(self._db.get_material_statistics)
+
+    async def get_shape_statistics(self) -> List[Dict[str, Any]]:
+        return await self._read(self._db.get_shape_statistics)
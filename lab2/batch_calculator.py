@@ -0,0 +1,231 @@
+import argparse
+import csv
+import json
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+
+from geometry_package import MaterialCatalog, get_shape_spec
+from geometry_package.instrumentation import METRICS
+from database import GeometryDatabase
+from exporters import EXPORTERS, exporter_for
+
+# Каталог материалов без базы данных; с --db используется каталог из таблицы materials
+STANDARD_CATALOG = MaterialCatalog.standard()
+_worker_materials = STANDARD_CATALOG
+
+RESULT_FIELDS = ['type', 'volume', 'surface_area', 'mass', 'material', 'parameters']
+
+
+class SpecError(ValueError):
+    pass
+
+
+def calculate_properties(shape, material) -> Dict[str, Any]:
+    """Расчёт свойств фигуры (та же логика, что в ConsoleGeometryCalculator)"""
+    shape.material = material
+    return shape.to_dict()
+
+
+def evaluate_spec(spec: Dict[str, Any],
+                  materials: Optional[MaterialCatalog] = None) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """Расчёт одной строки входного файла: возвращает (результат, параметры)"""
+    materials = materials if materials is not None else _worker_materials
+    if not isinstance(spec, dict):
+        raise SpecError("Строка не является описанием фигуры")
+    # Фигура - по имени класса или по названию из меню консольной версии (реестр фигур)
+    try:
+        shape_spec = get_shape_spec(str(spec.get('shape', '')).strip())
+    except KeyError:
+        raise SpecError(f"Неизвестная фигура: {spec.get('shape')!r}")
+    if not shape_spec.interactive:
+        raise SpecError(f"Фигуру {shape_spec.name} нельзя задать во входном файле")
+
+    material = materials.get(str(spec.get('material', '')).strip())
+    if material is None:
+        raise SpecError(f"Неизвестный материал: {spec.get('material')!r}")
+
+    parameters = {}
+    if shape_spec.parametric:
+        for name in shape_spec.names:
+            try:
+                value = float(spec[name])
+            except (KeyError, TypeError, ValueError):
+                raise SpecError(f"Параметр '{name}' отсутствует или не является числом")
+            if value <= 0:
+                raise SpecError(f"Параметр '{name}' должен быть положительным")
+            parameters[name] = value
+    else:
+        # Фигуры из файлов (сетки STL) задаются текстовыми полями
+        for name, label in shape_spec.inputs:
+            if not str(spec.get(name, '')).strip():
+                raise SpecError(f"Поле '{name}' ({label}) не заполнено")
+            parameters[name] = str(spec[name]).strip()
+
+    try:
+        shape = shape_spec.create(parameters)
+    except (OSError, ValueError) as e:
+        raise SpecError(str(e))
+    return calculate_properties(shape, material), parameters
+
+
+def _init_worker(materials: MaterialCatalog):
+    # Каталог передаётся рабочему процессу один раз, а не с каждым пакетом
+    global _worker_materials
+    _worker_materials = materials
+
+
+def _evaluate_chunk(chunk: List[Tuple[int, Dict[str, Any]]],
+                    materials: Optional[MaterialCatalog] = None) -> List[tuple]:
+    results = []
+    for line_number, spec in chunk:
+        try:
+            results.append((line_number, evaluate_spec(spec, materials), None))
+        except SpecError as e:
+            results.append((line_number, None, str(e)))
+    return results
+
+
+def read_specs(path: str, input_format: Optional[str] = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Потоковое чтение описаний фигур из CSV или JSONL ('-' - стандартный ввод)"""
+    input_format = input_format or ('jsonl' if path.endswith(('.jsonl', '.json')) else 'csv')
+    f = sys.stdin if path == '-' else open(path, encoding='utf-8', newline='')
+    try:
+        if input_format == 'csv':
+            for line_number, row in enumerate(csv.DictReader(f), start=2):
+                yield line_number, {key: value for key, value in row.items() if value not in (None, '')}
+        else:
+            for line_number, line in enumerate(f, start=1):
+                if line.strip():
+                    try:
+                        yield line_number, json.loads(line)
+                    except ValueError:
+                        yield line_number, None
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+class BatchGeometryCalculator:
+    """Неинтерактивный расчёт потока фигур с выводом в файл, stdout или базу данных"""
+
+    def __init__(self, workers: int = 1, chunk_size: int = 1000, max_reported_errors: int = 100,
+                 materials: Optional[MaterialCatalog] = None):
+        if workers < 1 or chunk_size < 1:
+            raise ValueError("Число процессов и размер пакета должны быть положительными")
+        self.workers = workers
+        self.materials = materials if materials is not None else STANDARD_CATALOG
+        self.chunk_size = chunk_size
+        self.max_reported_errors = max_reported_errors
+        self.error_count = 0
+        self.errors = []
+
+    def evaluate(self, specs: Iterable[Tuple[int, Dict[str, Any]]]) -> Iterator[Tuple[Dict[str, Any], Dict[str, float]]]:
+        """Результаты в порядке входа; в памяти держится не больше 2 * workers пакетов"""
+        specs = iter(specs)
+        chunks = iter(lambda: list(islice(specs, self.chunk_size)), [])
+
+        if self.workers == 1:
+            for chunk in chunks:
+                yield from self._collect(_evaluate_chunk(chunk, self.materials))
+            return
+
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(self.materials,)) as executor:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(executor.submit(_evaluate_chunk, chunk))
+                if len(pending) >= 2 * self.workers:
+                    yield from self._collect(pending.popleft().result())
+            while pending:
+                yield from self._collect(pending.popleft().result())
+
+    def _collect(self, results: List[tuple]) -> Iterator[Tuple[Dict[str, Any], Dict[str, float]]]:
+        for line_number, result, error in results:
+            if error is None:
+                yield result
+            else:
+                self.error_count += 1
+                if len(self.errors) < self.max_reported_errors:
+                    self.errors.append((line_number, error))
+
+    def run(self, specs: Iterable[Tuple[int, Dict[str, Any]]], output=None, output_format: Optional[str] = 'jsonl',
+            db: Optional[GeometryDatabase] = None) -> Dict[str, Any]:
+        """Расчёт и запись результатов; возвращает отчёт о производительности.
+        
+        output - путь к файлу или текстовый поток; формат - любой из exporters.EXPORTERS.
+        """
+        start = time.perf_counter()
+        counter = {'rows': 0}
+        exporter = exporter_for(output, output_format, RESULT_FIELDS) if output is not None else None
+
+        def results():
+            for shape_data, parameters in self.evaluate(specs):
+                counter['rows'] += 1
+                if exporter is not None:
+                    exporter.write(dict(shape_data, parameters=parameters))
+                yield shape_data, parameters
+
+        try:
+            if db is not None:
+                db.save_calculations_bulk(results(), chunk_size=self.chunk_size)
+            else:
+                for _ in results():
+                    pass
+        finally:
+            if exporter is not None:
+                exporter.close()
+
+        elapsed = time.perf_counter() - start
+        return {
+            'rows': counter['rows'],
+            'errors': self.error_count,
+            'seconds': elapsed,
+            'rows_per_second': counter['rows'] / elapsed if elapsed > 0 else 0.0
+        }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Пакетный расчёт геометрических фигур")
+    parser.add_argument('input', help="CSV или JSONL с описанием фигур ('-' - стандартный ввод)")
+    parser.add_argument('--input-format', choices=['csv', 'jsonl'])
+    parser.add_argument('-o', '--output', help="файл результатов ('-' - стандартный вывод)")
+    parser.add_argument('--format', dest='output_format', choices=sorted(EXPORTERS),
+                        help="формат результатов (по умолчанию - по расширению файла)")
+    parser.add_argument('--db', nargs='?', const='geometry_calculations.db',
+                        help="сохранить результаты в базу данных")
+    parser.add_argument('-j', '--workers', type=int, default=1, help="число процессов")
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--metrics', help="файл снимка метрик (.prom - формат Prometheus, иначе JSON); "
+                                          "замеры операций пишутся при GEOMETRY_METRICS=1")
+    args = parser.parse_args(argv)
+
+    output = args.output if args.output is not None else (None if args.db else '-')
+    output_format = args.output_format
+    if output == '-':
+        output = sys.stdout
+        output_format = output_format or 'jsonl'
+
+    db = GeometryDatabase(args.db) if args.db else None
+    calculator = BatchGeometryCalculator(workers=args.workers, chunk_size=args.chunk_size,
+                                         materials=db.materials if db is not None else None)
+    try:
+        report = calculator.run(read_specs(args.input, args.input_format), output, output_format, db)
+    finally:
+        if db is not None:
+            db.close()
+        if args.metrics:
+            METRICS.write(args.metrics)
+
+    for line_number, error in calculator.errors:
+        print(f"Строка {line_number}: {error}", file=sys.stderr)
+    print(f"Обработано: {report['rows']}, ошибок: {report['errors']}, "
+          f"{report['seconds']:.2f} с, {report['rows_per_second']:.0f} строк/с", file=sys.stderr)
+    return 1 if report['errors'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+"""Замер памяти на один объект фигуры с помощью tracemalloc.
+
+Запуск из каталога lab2:
+    python -m benchmarks.footprint [количество]
+"""
+import gc
+import sys
+import tracemalloc
+from typing import Callable
+
+from geometry_package import Parallelepiped, Tetrahedron, Sphere, Steel
+
+
+def measure_footprint(factory: Callable[[int], object], count: int = 100_000) -> float:
+    """Средний прирост памяти (байт) на один объект, созданный factory(i).
+
+    Учитываются сам объект, его атрибуты-числа и ссылка в списке,
+    в котором объекты удерживаются на время замера.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        objects = [factory(i) for i in range(count)]
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del objects
+    return (after - before) / count
+
+
+def _computed(shape):
+    shape.volume
+    shape.surface_area
+    return shape
+
+
+CASES = {
+    'Parallelepiped(l, w, h, Steel())': lambda i: Parallelepiped(i + 0.5, 2.0, 3.0, Steel()),
+    'Parallelepiped + volume/area': lambda i: _computed(Parallelepiped(i + 0.5, 2.0, 3.0, Steel())),
+    'Tetrahedron(e, Steel())': lambda i: Tetrahedron(i + 0.5, Steel()),
+    'Sphere(r, Steel())': lambda i: Sphere(i + 0.5, Steel()),
+}
+
+
+def main(count: int = 100_000):
+    for name, factory in CASES.items():
+        print(f"{name:<36} {measure_footprint(factory, count):8.1f} байт")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,68 @@
+"""Ядра math_kernels против встроенной арифметики int.
+
+Запуск из каталога lab2:
+    python -m benchmarks.kernels [--bits 10000 100000 1000000 4000000] [--repeat 3]
+
+Для каждой длины операндов печатается время встроенной операции (int.__mul__,
+pow, math.isqrt) и питоновского ядра, а также ускорение (>1 - ядро быстрее).
+Karatsuba и целый Ньютон на чистом Python проигрывают встроенным функциям при
+любых размерах; Toom-3 выигрывает только на очень длинных числах, где его
+асимптотика лучше встроенной Карацубы. Для кубического корня встроенного аналога
+нет, он сравнивается с math.isqrt того же числа.
+"""
+import argparse
+import random
+import sys
+import time
+from math import isqrt
+
+from math_kernels import (karatsuba_multiply, toom3_multiply, fast_multiply, fast_square,
+                          fast_power, integer_nth_root, _nth_root_floor)
+
+
+def _best(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def cases(bits: int, rng: random.Random):
+    """(операция, встроенная функция, ядро) для операндов длины bits"""
+    a = rng.getrandbits(bits) | (1 << (bits - 1))
+    b = rng.getrandbits(bits) | (1 << (bits - 1))
+    modulus = rng.getrandbits(min(bits, 4096)) | 1
+    exponent = rng.getrandbits(min(bits, 4096))
+    return [
+        ('mul karatsuba', lambda: a * b, lambda: karatsuba_multiply(a, b)),
+        ('mul toom3', lambda: a * b, lambda: toom3_multiply(a, b)),
+        ('mul fast', lambda: a * b, lambda: fast_multiply(a, b)),
+        ('square fast', lambda: a * a, lambda: fast_square(a)),
+        ('pow mod', lambda: pow(a, exponent, modulus), lambda: fast_power(a, exponent, modulus)),
+        ('root 2 newton', lambda: isqrt(a), lambda: _nth_root_floor(a, 2)),
+        ('root 3', lambda: isqrt(a), lambda: integer_nth_root(a, 3)),
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--bits', type=int, nargs='+', default=[10_000, 100_000, 1_000_000, 4_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    print(f"Python {sys.version.split()[0]}")
+    print(f"{'бит':>9} {'операция':<14} {'встроенная, мс':>15} {'ядро, мс':>10} {'ускорение':>10}")
+    for bits in args.bits:
+        for name, builtin, kernel in cases(bits, rng):
+            builtin_time = _best(builtin, args.repeat)
+            kernel_time = _best(kernel, args.repeat)
+            print(f"{bits:>9} {name:<14} {builtin_time * 1e3:>15.3f} {kernel_time * 1e3:>10.3f} "
+                  f"{builtin_time / kernel_time:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
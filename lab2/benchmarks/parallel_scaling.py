@@ -0,0 +1,85 @@
+"""Масштабирование ParallelEvaluator по числу процессов.
+
+Запуск из каталога lab2:
+    python -m benchmarks.parallel_scaling [--count N] [--workers 1 2 4 8 16]
+
+Коллекция - смесь параллелепипедов, тетраэдров и шаров со случайными размерами
+(кэш to_dict почти не попадает). Базой служит обычный [s.to_dict() for s in shapes].
+Для каждого числа процессов печатаются время, ускорение и эффективность, а также
+доля работы главного процесса (упаковка параметров и сборка словарей), которая
+ограничивает ускорение сверху по закону Амдала.
+"""
+import argparse
+import os
+import random
+import time
+
+from geometry_package import (Parallelepiped, Tetrahedron, Sphere, Steel, Aluminum, Copper,
+                              ParallelEvaluator, set_shape_cache)
+from geometry_package.parallel import _pack, _evaluate_packed, _merge
+
+
+def make_shapes(count: int, seed: int = 1):
+    rng = random.Random(seed)
+    materials = [Steel(), Aluminum(), Copper()]
+    shapes = []
+    for i in range(count):
+        material = materials[i % 3]
+        kind = rng.randrange(3)
+        if kind == 0:
+            shapes.append(Parallelepiped(rng.uniform(0.1, 2), rng.uniform(0.1, 2), rng.uniform(0.1, 2), material))
+        elif kind == 1:
+            shapes.append(Tetrahedron(rng.uniform(0.1, 2), material))
+        else:
+            shapes.append(Sphere(rng.uniform(0.1, 2), material))
+    return shapes
+
+
+def _timed(fn):
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def serial_fraction(shapes, chunk_size: int = 20_000) -> float:
+    """Доля времени главного процесса в однопроцессном проходе упаковка -> расчёт -> сборка"""
+    main = work = 0.0
+    for offset in range(0, len(shapes), chunk_size):
+        chunk = shapes[offset:offset + chunk_size]
+        started = time.perf_counter()
+        packed = _pack(chunk)
+        main += time.perf_counter() - started
+        started = time.perf_counter()
+        results = _evaluate_packed(packed)
+        work += time.perf_counter() - started
+        started = time.perf_counter()
+        _merge(results)
+        main += time.perf_counter() - started
+    return main / (main + work)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=1_000_000)
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=[n for n in (1, 2, 4, 8, 16) if n <= (os.cpu_count() or 1)])
+    args = parser.parse_args(argv)
+
+    # Кэш отключён, чтобы мерить расчёт, а не попадания
+    set_shape_cache(None)
+    shapes = make_shapes(args.count)
+    baseline = _timed(lambda: [shape.to_dict() for shape in shapes])
+    fraction = serial_fraction(shapes)
+    print(f"Фигур: {args.count}, ядер: {os.cpu_count()}, to_dict по одной: {baseline:.2f} с")
+    print(f"Доля главного процесса: {fraction:.1%} (предел ускорения ~{1 / fraction:.1f}x)")
+    print(f"{'процессов':>9} {'фрагмент':>9} {'время, с':>9} {'ускорение':>10} {'эффективность':>14}")
+    for workers in args.workers:
+        evaluator = ParallelEvaluator(workers=workers)
+        elapsed = _timed(lambda: evaluator.evaluate(shapes))
+        speedup = baseline / elapsed
+        print(f"{workers:>9} {evaluator.last_chunk_size:>9} {elapsed:>9.2f} "
+              f"{speedup:>9.2f}x {speedup / workers:>13.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""Минимальный запускатель замеров в духе asv/pytest-benchmark без зависимостей.
+
+Замер - функция-генератор, зарегистрированная декоратором @benchmark. Она получает
+параметр (например, число строк в базе), готовит данные, отдаёт через yield
+замеряемую функцию без аргументов и после yield убирает за собой:
+
+    @benchmark('shapes.construct', params=[10_000], ops=lambda n: n)
+    def construct(n):
+        yield lambda: [Sphere(1.0) for _ in range(n)]
+
+Результаты сохраняются в JSON и сравниваются с базовым файлом: замер считается
+регрессией, если его медиана выросла больше чем на threshold.
+"""
+import fnmatch
+import json
+import os
+import platform
+import statistics
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+RESULTS_VERSION = 1
+
+REGISTRY: Dict[str, 'Benchmark'] = {}
+
+
+class Benchmark:
+    """Зарегистрированный замер: имя, функция-генератор и значения параметра"""
+
+    def __init__(self, name: str, func: Callable, params: Sequence = (None,),
+                 ops: Optional[Callable[[Any], int]] = None, number: Optional[int] = None):
+        self.name = name
+        self.func = func
+        self.params = list(params)
+        self.ops = ops
+        self.number = number
+
+    def key(self, param) -> str:
+        return self.name if param is None else f"{self.name}[{param}]"
+
+    def __repr__(self) -> str:
+        return f"Benchmark({self.name!r}, params={self.params})"
+
+
+def benchmark(name: str, params: Sequence = (None,), ops: Optional[Callable[[Any], int]] = None,
+              number: Optional[int] = None):
+    """Регистрация замера. ops(param) - число операций за один вызов (для времени
+    на операцию), number - вызовов на одно повторение (None - подбирается)"""
+    def register(func):
+        if name in REGISTRY:
+            raise ValueError(f"Замер {name!r} уже зарегистрирован")
+        REGISTRY[name] = Benchmark(name, func, params, ops, number)
+        return func
+    return register
+
+
+def _autorange(func: Callable[[], Any], min_time: float) -> int:
+    """Число вызовов, которое занимает не меньше min_time (как timeit.autorange)"""
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        if time.perf_counter() - started >= min_time:
+            return number
+        number *= 2 if number < 8 else 10
+
+
+def measure(bench: Benchmark, param, repeat: int = 5, min_time: float = 0.2) -> Dict[str, Any]:
+    """Запуск одного замера: repeat повторений по number вызовов"""
+    generator = bench.func(param) if param is not None else bench.func()
+    func = next(generator)
+    try:
+        number = bench.number or _autorange(func, min_time)
+        times = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for _ in range(number):
+                func()
+            times.append((time.perf_counter() - started) / number)
+    except BaseException:
+        generator.close()
+        raise
+    # Код после yield - уборка, как в фикстурах pytest
+    for _ in generator:
+        raise RuntimeError(f"Замер {bench.name!r} должен содержать ровно один yield")
+
+    result = {
+        'name': bench.name,
+        'param': param,
+        'number': number,
+        'repeat': repeat,
+        'min': min(times),
+        'median': statistics.median(times),
+        'mean': statistics.fmean(times),
+        'stdev': statistics.stdev(times) if len(times) > 1 else 0.0,
+    }
+    if bench.ops is not None:
+        ops = bench.ops(param)
+        result['ops'] = ops
+        result['per_op'] = result['median'] / ops
+    return result
+
+
+def select(patterns: Optional[Iterable[str]] = None) -> List[Benchmark]:
+    """Замеры, имена которых подходят под шаблоны fnmatch ('db.*')"""
+    patterns = list(patterns or ['*'])
+    return [bench for name, bench in REGISTRY.items()
+            if any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)]
+
+
+def run(benchmarks: Iterable[Benchmark], params: Optional[Dict[str, Sequence]] = None,
+        repeat: int = 5, min_time: float = 0.2,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """Запуск замеров; params переопределяет значения параметров по имени замера"""
+    results = {}
+    for bench in benchmarks:
+        for param in (params or {}).get(bench.name, bench.params):
+            result = measure(bench, param, repeat, min_time)
+            results[bench.key(param)] = result
+            if progress is not None:
+                progress(result)
+    return {
+        'version': RESULTS_VERSION,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'machine': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'processor': platform.processor() or platform.machine(),
+            'cpu_count': os.cpu_count(),
+        },
+        'benchmarks': results,
+    }
+
+
+def save_results(results: Dict[str, Any], path: str):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    with open(path, encoding='utf-8') as f:
+        results = json.load(f)
+    if results.get('version') != RESULTS_VERSION:
+        raise ValueError(f"Файл {path}: неподдерживаемая версия результатов {results.get('version')!r}")
+    return results
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any],
+            threshold: float = 0.1) -> List[Dict[str, Any]]:
+    """Сравнение медиан с базой. Для каждого общего замера - отношение
+    текущее/базовое и статус: 'regression', 'improvement' или 'ok'"""
+    if threshold < 0:
+        raise ValueError("Порог регрессии не может быть отрицательным")
+    rows = []
+    for key, result in current['benchmarks'].items():
+        base = baseline['benchmarks'].get(key)
+        if base is None or base['median'] <= 0:
+            continue
+        ratio = result['median'] / base['median']
+        if ratio > 1 + threshold:
+            status = 'regression'
+        elif ratio < 1 / (1 + threshold):
+            status = 'improvement'
+        else:
+            status = 'ok'
+        rows.append({'key': key, 'baseline': base['median'], 'current': result['median'],
+                     'ratio': ratio, 'status': status})
+    return rows
+
+
+def format_time(seconds: float) -> str:
+    for unit, scale in (('с', 1), ('мс', 1e-3), ('мкс', 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3g} {unit}"
+    return f"{seconds / 1e-9:.3g} нс"
@@ -0,0 +1,325 @@
+"""Набор замеров производительности geometry_package и GeometryDatabase.
+
+Запуск из каталога lab2:
+    python -m benchmarks.suite [-k 'db.*'] [--rows 10000 1000000 10000000]
+                               [-o results.json] [--baseline baseline.json] [--threshold 0.1]
+
+Замеры: создание фигур, холодный и тёплый доступ к объёму и площади, to_dict
+с кэшем и без, одиночная и пакетная запись в базу, запросы истории на базах
+из --rows строк и выгрузка отчётов. Базы истории создаются один раз в --data-dir
+и переиспользуются (10 000 000 строк - около 1.5 ГБ и нескольких минут на создание).
+Результаты пишутся в JSON; с --baseline печатается сравнение, и при регрессии
+больше --threshold код возврата - 1.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+from contextlib import contextmanager
+
+from geometry_package import (Parallelepiped, Sphere, Cylinder, Steel, Aluminum, Copper,
+                              ShapeCache, get_shape_cache, set_shape_cache)
+from database import GeometryDatabase
+from exporters import EXPORTERS, export_calculations
+
+from .runner import benchmark, compare, format_time, load_results, run, save_results, select
+
+SHAPE_COUNT = 10_000
+INSERT_COUNT = {'single': 500, 'bulk': 10_000}
+HISTORY_ROWS = [10_000]
+EXPORT_ROWS = [10_000]
+DATA_DIR = os.path.join(tempfile.gettempdir(), 'geometry_benchmarks')
+
+_MATERIALS = (Steel(), Aluminum(), Copper())
+_SHAPE_FACTORIES = {
+    'Parallelepiped': lambda i: Parallelepiped(1 + i % 97, 2 + i % 89, 3 + i % 83, _MATERIALS[i % 3]),
+    'Sphere': lambda i: Sphere(0.5 + i % 997, _MATERIALS[i % 3]),
+    'Cylinder': lambda i: Cylinder(0.5 + i % 97, 1 + i % 89, _MATERIALS[i % 3]),
+}
+
+
+def make_shapes(kind: str, count: int = SHAPE_COUNT) -> list:
+    factory = _SHAPE_FACTORIES[kind]
+    return [factory(i) for i in range(count)]
+
+
+def _ops(_):
+    return SHAPE_COUNT
+
+
+# Фигуры
+
+
+@benchmark('shapes.construct', params=list(_SHAPE_FACTORIES), ops=_ops)
+def construct(kind):
+    factory = _SHAPE_FACTORIES[kind]
+    yield lambda: [factory(i) for i in range(SHAPE_COUNT)]
+
+
+@benchmark('shapes.properties_cold', params=list(_SHAPE_FACTORIES), ops=_ops)
+def properties_cold(kind):
+    # Кэш объекта сбрасывается перед каждым доступом - замер включает сброс двух слотов
+    shapes = make_shapes(kind)
+
+    def access():
+        for shape in shapes:
+            shape._volume = shape._surface_area = None
+            shape.volume
+            shape.surface_area
+    yield access
+
+
+@benchmark('shapes.properties_warm', params=list(_SHAPE_FACTORIES), ops=_ops)
+def properties_warm(kind):
+    shapes = make_shapes(kind)
+    for shape in shapes:
+        shape.volume
+        shape.surface_area
+
+    def access():
+        for shape in shapes:
+            shape.volume
+            shape.surface_area
+    yield access
+
+
+@benchmark('shapes.to_dict', params=['no_cache', 'cold_cache', 'warm_cache', 'lossless'], ops=_ops)
+def to_dict(mode):
+    # no_cache - без общего кэша; cold_cache - новый кэш на каждый проход;
+    # warm_cache - все записи уже в кэше; lossless - to_dict(precision=None)
+    shapes = make_shapes('Sphere')
+    previous = get_shape_cache()
+    if mode == 'no_cache':
+        set_shape_cache(None)
+    elif mode == 'warm_cache':
+        set_shape_cache(ShapeCache(maxsize=2 * SHAPE_COUNT))
+        for shape in shapes:
+            shape.to_dict()
+
+    def convert():
+        if mode == 'cold_cache':
+            set_shape_cache(ShapeCache(maxsize=2 * SHAPE_COUNT))
+        if mode == 'lossless':
+            for shape in shapes:
+                shape.to_dict(precision=None)
+        else:
+            for shape in shapes:
+                shape.to_dict()
+    try:
+        yield convert
+    finally:
+        set_shape_cache(previous)
+
+
+# Запись в базу
+
+
+def _records(count: int) -> list:
+    return [(shape.to_dict(), shape.parameters) for shape in make_shapes('Sphere', count)]
+
+
+@benchmark('db.insert_single', ops=lambda _: INSERT_COUNT['single'])
+def insert_single():
+    records = _records(INSERT_COUNT['single'])
+    with tempfile.TemporaryDirectory() as directory:
+        with GeometryDatabase(os.path.join(directory, 'insert.db')) as db:
+            def insert():
+                for shape_data, parameters in records:
+                    db.save_calculation(shape_data, parameters)
+            yield insert
+
+
+@benchmark('db.insert_bulk', ops=lambda _: INSERT_COUNT['bulk'])
+def insert_bulk():
+    records = _records(INSERT_COUNT['bulk'])
+    with tempfile.TemporaryDirectory() as directory:
+        with GeometryDatabase(os.path.join(directory, 'insert.db')) as db:
+            yield lambda: db.save_calculations_bulk(records)
+
+
+@benchmark('db.insert_group_writer', ops=lambda _: INSERT_COUNT['bulk'])
+def insert_group_writer():
+    records = _records(INSERT_COUNT['bulk'])
+    with tempfile.TemporaryDirectory() as directory:
+        with GeometryDatabase(os.path.join(directory, 'insert.db')) as db:
+            def insert():
+                with db.group_writer() as writer:
+                    for shape_data, parameters in records:
+                        writer.save_calculation(shape_data, parameters)
+            yield insert
+
+
+# История
+
+
+_POPULATE_SQL = '''
+    WITH RECURSIVE seq(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM seq WHERE i < ?)
+    INSERT INTO calculations
+    (shape_type, volume, surface_area, mass, material_id, parameters, created_at)
+    SELECT
+        CASE i % 3 WHEN 0 THEN 'Parallelepiped' WHEN 1 THEN 'Sphere' ELSE 'Tetrahedron' END,
+        (i % 1000 + 1) / 1000.0,
+        (i % 700 + 1) / 100.0,
+        (i % 1000 + 1) / 1000.0 * (i % 3 + 1) * 1000,
+        i % 3 + 1,
+        CASE i % 3
+            WHEN 0 THEN json_object('length', (i % 10 + 1) / 10.0, 'width', 0.5, 'height', 0.2)
+            WHEN 1 THEN json_object('radius', (i % 1000 + 1) / 1000.0)
+            ELSE json_object('edge', (i % 500 + 1) / 100.0)
+        END,
+        datetime('2024-01-01', '+' || (i / 10) || ' seconds')
+    FROM seq
+'''
+
+
+def populated_database(rows: int, data_dir: str = None) -> str:
+    """Путь к базе истории из rows строк; создаётся при первом обращении.
+    Индексы удаляются на время заполнения и строятся заново init_database"""
+    data_dir = data_dir or DATA_DIR
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f'history_{rows}.db')
+    if os.path.exists(path):
+        conn = sqlite3.connect(path)
+        try:
+            count = conn.execute('SELECT COALESCE(SUM(count), 0) FROM calculation_stats').fetchone()[0]
+        except sqlite3.Error:
+            count = None
+        finally:
+            conn.close()
+        if count == rows:
+            return path
+        os.remove(path)
+
+    with GeometryDatabase(path) as db:
+        conn = db.connection
+        indexes = [name for name, in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_calculations_%'")]
+        with conn:
+            for name in indexes:
+                conn.execute(f'DROP INDEX {name}')
+            conn.execute(_POPULATE_SQL, (rows,))
+        db.rebuild_statistics()
+        db.init_database()
+        conn.execute('ANALYZE')
+    return path
+
+
+@contextmanager
+def history_database(rows: int):
+    with GeometryDatabase(populated_database(rows)) as db:
+        yield db
+
+
+@benchmark('history.first_page', params=HISTORY_ROWS)
+def history_first_page(rows):
+    with history_database(rows) as db:
+        yield lambda: db.get_calculations_page(50)
+
+
+@benchmark('history.deep_page', params=HISTORY_ROWS)
+def history_deep_page(rows):
+    # Страница из середины истории по ключу - без OFFSET
+    with history_database(rows) as db:
+        yield lambda: db.get_calculations_page(50, after=rows // 2)
+
+
+@benchmark('history.filter', params=HISTORY_ROWS)
+def history_filter(rows):
+    with history_database(rows) as db:
+        yield lambda: db.get_calculations_page(50, shape_type='Sphere', material='Медь',
+                                               min_volume=0.5, max_volume=0.6)
+
+
+@benchmark('history.parameter_range', params=HISTORY_ROWS)
+def history_parameter_range(rows):
+    with history_database(rows) as db:
+        yield lambda: db.get_calculations_page(50, parameter_ranges={'radius': (0.1, 0.2)})
+
+
+@benchmark('history.statistics', params=HISTORY_ROWS)
+def history_statistics(rows):
+    with history_database(rows) as db:
+        def statistics():
+            db.get_statistics()
+            db.get_material_statistics()
+            db.get_shape_statistics()
+        yield statistics
+
+
+# Выгрузка
+
+
+def _export_benchmark(fmt: str):
+    @benchmark(f'export.{fmt}', params=EXPORT_ROWS, ops=lambda rows: rows)
+    def export(rows):
+        with tempfile.TemporaryDirectory() as directory:
+            target = os.path.join(directory, f'history.{fmt}')
+            with history_database(rows) as db:
+                yield lambda: export_calculations(db, target, fmt)
+    return export
+
+
+for _fmt in ('csv', 'jsonl', 'parquet'):
+    if _fmt in EXPORTERS:
+        _export_benchmark(_fmt)
+
+
+def print_comparison(rows: list, threshold: float):
+    print(f"\n{'замер':<42} {'база':>10} {'сейчас':>10} {'отношение':>10}")
+    for row in rows:
+        mark = {'regression': '  РЕГРЕССИЯ', 'improvement': '  ускорение'}.get(row['status'], '')
+        print(f"{row['key']:<42} {format_time(row['baseline']):>10} {format_time(row['current']):>10} "
+              f"{row['ratio']:>9.2f}x{mark}")
+    regressions = sum(row['status'] == 'regression' for row in rows)
+    print(f"\nРегрессий (медиана хуже больше чем на {threshold:.0%}): {regressions}")
+
+
+def main(argv=None) -> int:
+    global DATA_DIR
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-k', '--select', nargs='+', default=['*'],
+                        help="шаблоны имён замеров (fnmatch), например 'db.*' 'history.*'")
+    parser.add_argument('--rows', type=int, nargs='+', default=HISTORY_ROWS,
+                        help="размеры баз истории, например 10000 1000000 10000000")
+    parser.add_argument('--export-rows', type=int, nargs='+', default=EXPORT_ROWS)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help="минимальная длительность одного повторения, с")
+    parser.add_argument('--data-dir', default=DATA_DIR, help="каталог для баз истории")
+    parser.add_argument('-o', '--output', help="файл JSON для результатов")
+    parser.add_argument('--baseline', help="файл JSON с базовыми результатами")
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help="допустимое замедление медианы (0.1 = 10%%)")
+    parser.add_argument('--list', action='store_true', help="только перечислить замеры")
+    args = parser.parse_args(argv)
+
+    DATA_DIR = args.data_dir
+    benchmarks = select(args.select)
+    if args.list:
+        for bench in benchmarks:
+            print(bench.name)
+        return 0
+
+    params = {bench.name: args.rows for bench in benchmarks if bench.name.startswith('history.')}
+    params.update({bench.name: args.export_rows for bench in benchmarks if bench.name.startswith('export.')})
+
+    def progress(result):
+        per_op = f"  ({format_time(result['per_op'])}/оп.)" if 'per_op' in result else ''
+        key = result['name'] if result['param'] is None else f"{result['name']}[{result['param']}]"
+        print(f"{key:<42} {format_time(result['median']):>10} ±{format_time(result['stdev'])}{per_op}",
+              flush=True)
+
+    results = run(benchmarks, params, repeat=args.repeat, min_time=args.min_time, progress=progress)
+    if args.output:
+        save_results(results, args.output)
+    if args.baseline:
+        rows = compare(results, load_results(args.baseline), args.threshold)
+        print_comparison(rows, args.threshold)
+        if any(row['status'] == 'regression' for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,31 +1,302 @@
 import sqlite3
+import ast
+import json
 import os
+import queue
+import threading
+import time
 from datetime import datetime
-from typing import List, Dict, Any
+from itertools import islice
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+
+from geometry_package import Material, MaterialCatalog, shape_specs
+from geometry_package.instrumentation import timed
+
+# Тексты запросов вынесены в константы: sqlite3 кэширует подготовленные
+# выражения по тексту SQL, поэтому повторные вызовы не компилируют запрос заново
+INSERT_CALCULATION_SQL = '''
+    INSERT INTO calculations
+    (shape_type, volume, surface_area, mass, material_id, parameters)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+# Материал хранится внешним ключом material_id на таблицу materials
+CALCULATIONS_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS {table} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        shape_type TEXT NOT NULL,
+        volume REAL NOT NULL,
+        surface_area REAL NOT NULL,
+        mass REAL NOT NULL,
+        material_id INTEGER NOT NULL REFERENCES materials (id),
+        parameters TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+CALCULATION_FIELDS = ['id', 'shape_type', 'volume', 'surface_area', 'mass',
+                      'material', 'parameters', 'created_at']
+
+# Имя материала подставляется подзапросом по первичному ключу materials,
+# поэтому строки выборки (и выгрузки) по-прежнему содержат название материала
+_CALCULATION_COLUMNS = {
+    'material': '(SELECT name FROM materials WHERE materials.id = calculations.material_id)',
+}
+
+SELECT_CALCULATIONS_SQL = f'''
+    SELECT {', '.join(_CALCULATION_COLUMNS.get(field, field) for field in CALCULATION_FIELDS)}
+    FROM calculations
+'''
+
+# Индексы под фильтры истории. Ключ страницы - id: он AUTOINCREMENT и растёт
+# вместе с created_at, а каждый индекс SQLite неявно заканчивается rowid,
+# поэтому "фильтр + id < ?" читается из индекса без сортировки
+CALCULATION_INDEXES = [
+    'CREATE INDEX IF NOT EXISTS idx_calculations_created ON calculations (created_at)',
+    'CREATE INDEX IF NOT EXISTS idx_calculations_shape ON calculations (shape_type)',
+    'CREATE INDEX IF NOT EXISTS idx_calculations_material ON calculations (material_id)',
+    'CREATE INDEX IF NOT EXISTS idx_calculations_volume ON calculations (volume)',
+    # MIN/MAX(mass) группы в триггере удаления - один переход по индексу
+    # вместо просмотра всех строк группы
+    'CREATE INDEX IF NOT EXISTS idx_calculations_group_mass ON calculations (shape_type, material_id, mass)',
+]
+
+# Параметры фигур хранятся в JSON; для каждого параметра есть индекс по выражению.
+# Запрос использует индекс, только если выражение совпадает с ним дословно.
+# Имена берутся из реестра фигур при открытии базы, поэтому индексы получают и
+# фигуры, зарегистрированные позже (register_shape)
+def parameter_names() -> Tuple[str, ...]:
+    names = {}
+    for spec in shape_specs(parametric=True):
+        names.update(dict.fromkeys(spec.names))
+    return tuple(names)
+
+
+def _parameter_expression(name: str) -> str:
+    if not name.isidentifier():
+        raise ValueError(f"Некорректное имя параметра: {name}")
+    return f"json_extract(parameters, '$.{name}')"
+
+
+def _parameter_index(name: str) -> str:
+    return (f'CREATE INDEX IF NOT EXISTS idx_calculations_param_{name} '
+            f'ON calculations ({_parameter_expression(name)})')
+
+# Сводная таблица по парам (фигура, id материала): её пополняет путь записи
+# (одно обновление на группу в пакете), а удаления и изменения строк учитывают
+# триггеры.
+# Статистика читается из неё, а не агрегатами по всей таблице calculations
+STATISTICS_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS calculation_stats (
+        shape_type TEXT NOT NULL,
+        material_id INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        volume_sum REAL NOT NULL,
+        mass_sum REAL NOT NULL,
+        mass_min REAL NOT NULL,
+        mass_max REAL NOT NULL,
+        PRIMARY KEY (shape_type, material_id)
+    )
+    ''',
+    # Минимум и максимум пересчитываются только для своей группы
+    # и только если удалена крайняя строка
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_calculations_stats_delete
+    AFTER DELETE ON calculations
+    BEGIN
+        UPDATE calculation_stats SET
+            count = count - 1,
+            volume_sum = volume_sum - OLD.volume,
+            mass_sum = mass_sum - OLD.mass
+        WHERE shape_type = OLD.shape_type AND material_id = OLD.material_id;
+        
+        DELETE FROM calculation_stats
+        WHERE shape_type = OLD.shape_type AND material_id = OLD.material_id AND count <= 0;
+        
+        UPDATE calculation_stats SET
+            mass_min = (SELECT MIN(mass) FROM calculations
+                        WHERE shape_type = OLD.shape_type AND material_id = OLD.material_id),
+            mass_max = (SELECT MAX(mass) FROM calculations
+                        WHERE shape_type = OLD.shape_type AND material_id = OLD.material_id)
+        WHERE shape_type = OLD.shape_type AND material_id = OLD.material_id
+          AND (OLD.mass <= mass_min OR OLD.mass >= mass_max);
+    END
+    ''',
+    # Изменение строки - удаление старых значений из их группы и добавление
+    # новых; крайние значения старой группы пересчитываются в самом конце,
+    # когда в calculations уже новые значения
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_calculations_stats_update
+    AFTER UPDATE OF shape_type, material_id, volume, mass ON calculations
+    BEGIN
+        UPDATE calculation_stats SET
+            count = count - 1,
+            volume_sum = volume_sum - OLD.volume,
+            mass_sum = mass_sum - OLD.mass
+        WHERE shape_type = OLD.shape_type AND material_id = OLD.material_id;
+        
+        DELETE FROM calculation_stats
+        WHERE shape_type = OLD.shape_type AND material_id = OLD.material_id AND count <= 0;
+        
+        INSERT INTO calculation_stats
+        (shape_type, material_id, count, volume_sum, mass_sum, mass_min, mass_max)
+        VALUES (NEW.shape_type, NEW.material_id, 1, NEW.volume, NEW.mass, NEW.mass, NEW.mass)
+        ON CONFLICT (shape_type, material_id) DO UPDATE SET
+            count = count + 1,
+            volume_sum = volume_sum + excluded.volume_sum,
+            mass_sum = mass_sum + excluded.mass_sum,
+            mass_min = MIN(mass_min, excluded.mass_min),
+            mass_max = MAX(mass_max, excluded.mass_max);
+        
+        UPDATE calculation_stats SET
+            mass_min = (SELECT MIN(mass) FROM calculations
+                        WHERE shape_type = OLD.shape_type AND material_id = OLD.material_id),
+            mass_max = (SELECT MAX(mass) FROM calculations
+                        WHERE shape_type = OLD.shape_type AND material_id = OLD.material_id)
+        WHERE shape_type = OLD.shape_type AND material_id = OLD.material_id
+          AND (OLD.mass <= mass_min OR OLD.mass >= mass_max);
+    END
+    ''',
+]
+
+UPDATE_STATISTICS_SQL = '''
+    INSERT INTO calculation_stats
+    (shape_type, material_id, count, volume_sum, mass_sum, mass_min, mass_max)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (shape_type, material_id) DO UPDATE SET
+        count = count + excluded.count,
+        volume_sum = volume_sum + excluded.volume_sum,
+        mass_sum = mass_sum + excluded.mass_sum,
+        mass_min = MIN(mass_min, excluded.mass_min),
+        mass_max = MAX(mass_max, excluded.mass_max)
+'''
+
+REBUILD_STATISTICS_SQL = '''
+    INSERT INTO calculation_stats
+    (shape_type, material_id, count, volume_sum, mass_sum, mass_min, mass_max)
+    SELECT shape_type, material_id, COUNT(*), SUM(volume), SUM(mass), MIN(mass), MAX(mass)
+    FROM calculations
+    GROUP BY shape_type, material_id
+'''
+
+# Версия схемы хранится в PRAGMA user_version
+SCHEMA_VERSION = 4
+
+
+def _calculation_row(shape_data: Dict[str, Any], parameters: Dict[str, float],
+                     material_id: int) -> tuple:
+    """Преобразование результата расчёта в строку таблицы calculations"""
+    return (
+        shape_data['type'],
+        shape_data['volume'],
+        shape_data['surface_area'],
+        shape_data['mass'],
+        material_id,
+        json.dumps(parameters)
+    )
+
+
+def _calculation_from_row(row: tuple) -> Dict[str, Any]:
+    return {
+        'id': row[0],
+        'shape_type': row[1],
+        'volume': row[2],
+        'surface_area': row[3],
+        'mass': row[4],
+        'material': row[5],
+        'parameters': json.loads(row[6]),
+        'created_at': row[7]
+    }
+
+
+@timed('database._insert_calculations')
+def _insert_calculations(conn: sqlite3.Connection, rows: List[tuple]):
+    """Вставка строк и обновление сводной статистики в текущей транзакции"""
+    conn.executemany(INSERT_CALCULATION_SQL, rows)
+    
+    groups = {}
+    for shape_type, volume, _, mass, material_id, _ in rows:
+        group = groups.get((shape_type, material_id))
+        if group is None:
+            groups[(shape_type, material_id)] = [1, volume, mass, mass, mass]
+        else:
+            group[0] += 1
+            group[1] += volume
+            group[2] += mass
+            group[3] = min(group[3], mass)
+            group[4] = max(group[4], mass)
+    conn.executemany(UPDATE_STATISTICS_SQL, [key + tuple(values) for key, values in groups.items()])
+
+
+def _throughput_report(rows: int, elapsed: float) -> Dict[str, Any]:
+    return {
+        'rows': rows,
+        'seconds': elapsed,
+        'rows_per_second': rows / elapsed if elapsed > 0 else 0.0
+    }
+
 
 class GeometryDatabase:
-    def __init__(self, db_path: str = "geometry_calculations.db"):
+    def __init__(self, db_path: str = "geometry_calculations.db", cached_statements: int = 128):
         self.db_path = db_path
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._catalog = None
         self.init_database()
     
+    @timed('GeometryDatabase._connect')
+    def _connect(self) -> sqlite3.Connection:
+        """Открытие нового соединения с настройками для постоянной работы"""
+        conn = sqlite3.connect(self.db_path, cached_statements=self.cached_statements,
+                               check_same_thread=False)
+        if self.db_path != ":memory:":
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+    
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """Долгоживущее соединение текущего потока"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+    
+    def close(self):
+        """Закрытие всех открытых соединений"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+    
+    def close_thread_connection(self):
+        """Закрытие соединения текущего потока"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.conn = None
+            with self._lock:
+                if conn in self._connections:
+                    self._connections.remove(conn)
+            conn.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
     def init_database(self):
         """Инициализация базы данных и создание таблиц"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connection
         cursor = conn.cursor()
         
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS calculations (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                shape_type TEXT NOT NULL,
-                volume REAL NOT NULL,
-                surface_area REAL NOT NULL,
-                mass REAL NOT NULL,
-                material TEXT NOT NULL,
-                parameters TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS materials (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -35,87 +306,499 @@ class GeometryDatabase:
         ''')
         
         # Добавляем базовые материалы если их нет
-        base_materials = [
-            ('Сталь', 7850.0),
-            ('Алюминий', 2700.0),
-            ('Медь', 8960.0)
-        ]
+        base_materials = [(material.name, material.density) for material in MaterialCatalog.standard()]
         
         cursor.executemany('''
             INSERT OR IGNORE INTO materials (name, density) VALUES (?, ?)
         ''', base_materials)
         
+        cursor.execute(CALCULATIONS_SCHEMA.format(table='calculations'))
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS shape_cache (
+                key TEXT PRIMARY KEY,
+                volume REAL NOT NULL,
+                surface_area REAL NOT NULL,
+                record TEXT NOT NULL
+            )
+        ''')
+        
+        version = cursor.execute('PRAGMA user_version').fetchone()[0]
+        if version < 3:
+            self._migrate_material_ids(cursor)
+        if version < 2:
+            self._migrate_parameters_to_json(cursor)
+        if version < 4:
+            # Сводная таблица версий 1-2 была по имени материала, а в версии 3
+            # не было триггера изменения строк - строится заново
+            cursor.execute('DROP TABLE IF EXISTS calculation_stats')
+            for statement in STATISTICS_SCHEMA:
+                cursor.execute(statement)
+            self._rebuild_statistics(cursor)
+        for statement in CALCULATION_INDEXES:
+            cursor.execute(statement)
+        for name in parameter_names():
+            cursor.execute(_parameter_index(name))
+        if version < SCHEMA_VERSION:
+            cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        
         conn.commit()
-        conn.close()
+        self._catalog = None
     
-    def save_calculation(self, shape_data: Dict[str, Any], parameters: Dict[str, float]):
-        """Сохранение расчета в базу данных"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def _migrate_material_ids(self, cursor: sqlite3.Cursor):
+        """Перевод столбца material (имя) во внешний ключ material_id.
         
+        Таблица calculations пересоздаётся; материалы, которых нет в materials,
+        добавляются с плотностью mass / volume из их расчётов.
+        """
+        columns = [row[1] for row in cursor.execute('PRAGMA table_info(calculations)')]
+        if 'material' not in columns:
+            return
         cursor.execute('''
-            INSERT INTO calculations 
-            (shape_type, volume, surface_area, mass, material, parameters)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (
-            shape_data['type'],
-            shape_data['volume'],
-            shape_data['surface_area'],
-            shape_data['mass'],
-            shape_data['material'],
-            str(parameters)
-        ))
+            INSERT OR IGNORE INTO materials (name, density)
+            SELECT material, COALESCE(AVG(mass / NULLIF(volume, 0)), 0)
+            FROM calculations
+            GROUP BY material
+        ''')
+        cursor.execute('DROP TABLE IF EXISTS calculations_v3')
+        cursor.execute(CALCULATIONS_SCHEMA.format(table='calculations_v3'))
+        cursor.execute('''
+            INSERT INTO calculations_v3
+            (id, shape_type, volume, surface_area, mass, material_id, parameters, created_at)
+            SELECT c.id, c.shape_type, c.volume, c.surface_area, c.mass, m.id, c.parameters, c.created_at
+            FROM calculations AS c JOIN materials AS m ON m.name = c.material
+        ''')
+        # Вместе с таблицей удаляются её индексы и триггер статистики
+        cursor.execute('DROP TABLE calculations')
+        cursor.execute('ALTER TABLE calculations_v3 RENAME TO calculations')
+    
+    @property
+    def materials(self) -> MaterialCatalog:
+        """Каталог материалов: загружается из таблицы materials один раз"""
+        catalog = self._catalog
+        if catalog is None:
+            catalog = self.reload_materials()
+        return catalog
+    
+    def reload_materials(self) -> MaterialCatalog:
+        """Повторное чтение таблицы materials (например, после правок другим процессом)"""
+        rows = self.connection.execute('SELECT id, name, density FROM materials ORDER BY id')
+        self._catalog = MaterialCatalog(rows)
+        return self._catalog
+    
+    def add_material(self, name: str, density: float) -> Material:
+        """Добавление материала в таблицу и каталог"""
+        if not name or density <= 0:
+            raise ValueError("Материал должен иметь имя и положительную плотность")
+        with self.connection as conn:
+            conn.execute('INSERT INTO materials (name, density) VALUES (?, ?)', (name, density))
+        return self.reload_materials()[name]
+    
+    def material_id(self, name: str, density: Optional[float] = None) -> int:
+        """id материала по имени; каталог перечитывается, если имени в нём нет.
         
+        Неизвестный материал с известной плотностью добавляется в materials, как
+        при миграции. Внутри открытой транзакции (пакетная запись) каталог не
+        перечитывается: он увидел бы незафиксированную строку, которая исчезнет
+        при откате. id ищется запросом к таблице, а в каталог материал попадёт
+        при первом обращении после фиксации.
+        """
+        try:
+            return self.materials.id_of(name)
+        except KeyError:
+            pass
+        conn = self.connection
+        in_transaction = conn.in_transaction
+        if in_transaction:
+            row = conn.execute('SELECT id FROM materials WHERE name = ?', (name,)).fetchone()
+            if row is not None:
+                return row[0]
+        else:
+            try:
+                return self.reload_materials().id_of(name)
+            except KeyError:
+                pass
+        if not name or density is None or density <= 0:
+            raise ValueError(f"Материал {name!r} отсутствует в таблице materials "
+                             f"(добавьте его через add_material)")
+        cursor = conn.execute('INSERT INTO materials (name, density) VALUES (?, ?)', (name, density))
+        if in_transaction:
+            return cursor.lastrowid
         conn.commit()
-        conn.close()
+        return self.reload_materials().id_of(name)
+    
+    def material_name(self, material_id: int) -> str:
+        try:
+            return self.materials[material_id].name
+        except KeyError:
+            return self.reload_materials()[material_id].name
+    
+    def _calculation_row(self, shape_data: Dict[str, Any], parameters: Dict[str, float],
+                         material: Optional[Material] = None) -> tuple:
+        # Плотность нового материала - из самого материала фигуры, а не из
+        # округлённых mass / volume словаря
+        name = shape_data['material']
+        if material is not None and material.name == name:
+            density = material.density
+        else:
+            density = Material.density_of(name)
+        return _calculation_row(shape_data, parameters, self.material_id(name, density))
+    
+    def _migrate_parameters_to_json(self, cursor: sqlite3.Cursor, chunk_size: int = 1000):
+        """Перевод старых строк parameters из str(dict) в JSON"""
+        last_id = 0
+        while True:
+            rows = cursor.execute('''
+                SELECT id, parameters FROM calculations
+                WHERE id > ? AND json_valid(parameters) = 0
+                ORDER BY id LIMIT ?
+            ''', (last_id, chunk_size)).fetchall()
+            if not rows:
+                break
+            updates = []
+            for row_id, text in rows:
+                try:
+                    parameters = ast.literal_eval(text)
+                except (ValueError, SyntaxError):
+                    parameters = None
+                if not isinstance(parameters, dict):
+                    parameters = {'raw': text}
+                updates.append((json.dumps(parameters), row_id))
+            cursor.executemany('UPDATE calculations SET parameters = ? WHERE id = ?', updates)
+            last_id = rows[-1][0]
+    
+    def rebuild_statistics(self):
+        """Полный пересчёт сводной таблицы статистики"""
+        with self.connection as conn:
+            self._rebuild_statistics(conn.cursor())
+    
+    @staticmethod
+    def _rebuild_statistics(cursor: sqlite3.Cursor):
+        cursor.execute('DELETE FROM calculation_stats')
+        cursor.execute(REBUILD_STATISTICS_SQL)
+    
+    def save_calculation(self, shape_data: Dict[str, Any], parameters: Dict[str, float],
+                         material: Optional[Material] = None):
+        """Сохранение расчета в базу данных (material - материал фигуры, если его
+        ещё нет в таблице materials)"""
+        with self.connection as conn:
+            _insert_calculations(conn, [self._calculation_row(shape_data, parameters, material)])
+    
+    @timed('GeometryDatabase.save_calculations_bulk')
+    def save_calculations_bulk(self, records: Iterable[Tuple[Dict[str, Any], Dict[str, float]]],
+                               chunk_size: int = 1000) -> Dict[str, Any]:
+        """Пакетное сохранение пар (результат, параметры) в одной транзакции;
+        третьим элементом записи может идти материал фигуры"""
+        if chunk_size <= 0:
+            raise ValueError("Размер пакета должен быть положительным")
+        
+        conn = self.connection
+        rows = (self._calculation_row(*record) for record in records)
+        saved = 0
+        start = time.perf_counter()
+        
+        with conn:
+            # Транзакция открывается до разбора первой записи, чтобы новые
+            # материалы из пакета откатывались вместе с ним
+            if not conn.in_transaction:
+                conn.execute('BEGIN')
+            while True:
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    break
+                _insert_calculations(conn, chunk)
+                saved += len(chunk)
+        
+        return _throughput_report(saved, time.perf_counter() - start)
+    
+    def group_writer(self, max_batch: int = 500, max_delay: float = 0.05) -> 'GroupCommitWriter':
+        """Фоновый писатель с групповой фиксацией транзакций"""
+        return GroupCommitWriter(self, max_batch=max_batch, max_delay=max_delay)
     
     def get_all_calculations(self) -> List[Dict[str, Any]]:
         """Получение всех расчетов из базы данных"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        return list(self.iter_calculations())
+    
+    def save_shape_cache(self, cache) -> int:
+        """Сохранение записей кэша результатов фигур (ShapeCache) в базу"""
+        rows = [(json.dumps([key[0], list(key[1]), key[2], key[3]]), volume, surface_area,
+                 json.dumps(record))
+                for key, (volume, surface_area, record) in cache.items()]
+        with self.connection as conn:
+            conn.executemany('''
+                INSERT OR REPLACE INTO shape_cache (key, volume, surface_area, record)
+                VALUES (?, ?, ?, ?)
+            ''', rows)
+        return len(rows)
+    
+    def load_shape_cache(self, cache) -> int:
+        """Прогрев кэша результатов фигур из базы; возвращает число загруженных записей"""
+        cursor = self.connection.execute(
+            'SELECT key, volume, surface_area, record FROM shape_cache ORDER BY rowid LIMIT ?',
+            (cache.maxsize,))
+        loaded = 0
+        for key, volume, surface_area, record in cursor:
+            shape_type, parameters, density, material = json.loads(key)
+            cache.put((shape_type, tuple(parameters), density, material),
+                      (volume, surface_area, json.loads(record)))
+            loaded += 1
+        return loaded
+    
+    def get_calculations_page(self, limit: int = 50, after: Optional[int] = None,
+                              **filters) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """Страница истории расчетов (от новых к старым).
         
-        cursor.execute('''
-            SELECT * FROM calculations ORDER BY created_at DESC
-        ''')
+        after - id последней строки предыдущей страницы.
+        Возвращает строки страницы и ключ для запроса следующей страницы
+        (None, если страница последняя).
+        """
+        rows, next_key = self._select_page(limit, after, filters)
+        return [_calculation_from_row(row) for row in rows], next_key
+    
+    def iter_calculation_rows(self, page_size: int = 5000, **filters) -> Iterator[List[tuple]]:
+        """Страницы истории в виде необработанных кортежей (поля - CALCULATION_FIELDS,
+        parameters - JSON-строка). Используется для быстрой выгрузки без построения словарей.
+        """
+        after = None
+        while True:
+            rows, after = self._select_page(page_size, after, filters)
+            if rows:
+                yield rows
+            if after is None:
+                break
+    
+    @timed('GeometryDatabase._select_page')
+    def _select_page(self, limit: int, after: Optional[int],
+                     filters: Dict[str, Any]) -> Tuple[List[tuple], Optional[int]]:
+        if limit <= 0:
+            raise ValueError("Размер страницы должен быть положительным")
         
-        calculations = []
-        for row in cursor.fetchall():
-            calculations.append({
-                'id': row[0],
-                'shape_type': row[1],
-                'volume': row[2],
-                'surface_area': row[3],
-                'mass': row[4],
-                'material': row[5],
-                'parameters': row[6],
-                'created_at': row[7]
-            })
+        conditions, params = self._history_filters(**filters)
+        if after is not None:
+            conditions.append('id < ?')
+            params.append(after)
+        
+        sql = SELECT_CALCULATIONS_SQL
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY id DESC LIMIT ?'
+        params.append(limit)
+        
+        rows = self.connection.execute(sql, params).fetchall()
+        
+        next_key = None
+        if len(rows) == limit:
+            next_key = rows[-1][0]
+        return rows, next_key
+    
+    def iter_calculations(self, page_size: int = 500, **filters) -> Iterator[Dict[str, Any]]:
+        """Потоковый обход истории расчетов страницами фиксированного размера.
         
-        conn.close()
-        return calculations
+        Фильтры: shape_type, material, date_from, date_to, min_volume, max_volume
+        и parameter_ranges - словарь {параметр: (минимум, максимум)}, например
+        {'radius': (0.1, 0.2)}; любая граница может быть None.
+        """
+        after = None
+        while True:
+            rows, after = self.get_calculations_page(page_size, after, **filters)
+            yield from rows
+            if after is None:
+                break
     
+    def _history_filters(self, shape_type: Optional[str] = None, material: Optional[str] = None,
+                         date_from: Optional[str] = None, date_to: Optional[str] = None,
+                         min_volume: Optional[float] = None,
+                         max_volume: Optional[float] = None,
+                         parameter_ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None
+                         ) -> Tuple[List[str], list]:
+        """Условия WHERE для фильтров истории"""
+        conditions = []
+        params = []
+        if material is not None:
+            # Неизвестный материал - пустая выборка (id материалов положительны)
+            try:
+                material = self.material_id(material)
+            except ValueError:
+                material = 0
+        for column, operator, value in (
+            ('shape_type', '=', shape_type),
+            ('material_id', '=', material),
+            ('created_at', '>=', date_from),
+            ('created_at', '<=', date_to),
+            ('volume', '>=', min_volume),
+            ('volume', '<=', max_volume),
+        ):
+            if value is not None:
+                conditions.append(f'{column} {operator} ?')
+                params.append(value)
+        for name, (low, high) in (parameter_ranges or {}).items():
+            expression = _parameter_expression(name)
+            if low is not None:
+                conditions.append(f'{expression} >= ?')
+                params.append(low)
+            if high is not None:
+                conditions.append(f'{expression} <= ?')
+                params.append(high)
+        return conditions, params
+    
+    @timed('GeometryDatabase.get_statistics')
     def get_statistics(self) -> Dict[str, Any]:
         """Получение статистики по расчетам"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT COUNT(*) FROM calculations')
-        total_calculations = cursor.fetchone()[0]
-        
-        cursor.execute('SELECT COUNT(DISTINCT shape_type) FROM calculations')
-        unique_shapes = cursor.fetchone()[0]
+        cursor = self.connection.cursor()
         
-        cursor.execute('SELECT COUNT(DISTINCT material) FROM calculations')
-        unique_materials = cursor.fetchone()[0]
+        cursor.execute('''
+            SELECT COALESCE(SUM(count), 0), COUNT(DISTINCT shape_type), COUNT(DISTINCT material_id)
+            FROM calculation_stats
+        ''')
+        total_calculations, unique_shapes, unique_materials = cursor.fetchone()
         
+        # MAX по индексу idx_calculations_created - одно чтение края индекса
         cursor.execute('SELECT MAX(created_at) FROM calculations')
         last_calculation = cursor.fetchone()[0]
         
-        conn.close()
-        
         return {
             'total_calculations': total_calculations,
             'unique_shapes': unique_shapes,
             'unique_materials': unique_materials,
             'last_calculation': last_calculation
-        }
\ No newline at end of file
+        }
+    
+    def get_material_statistics(self) -> List[Dict[str, Any]]:
+        """Количество, суммарные объём и масса, средняя/мин./макс. масса по материалам"""
+        statistics = self._grouped_statistics('material_id')
+        for item in statistics:
+            item['material'] = self.material_name(item.pop('material_id'))
+        statistics.sort(key=lambda item: item['material'])
+        return statistics
+    
+    def get_shape_statistics(self) -> List[Dict[str, Any]]:
+        """Количество, суммарные объём и масса, средняя/мин./макс. масса по фигурам"""
+        return self._grouped_statistics('shape_type')
+    
+    def _grouped_statistics(self, column: str) -> List[Dict[str, Any]]:
+        cursor = self.connection.execute(f'''
+            SELECT {column}, SUM(count), SUM(volume_sum), SUM(mass_sum), MIN(mass_min), MAX(mass_max)
+            FROM calculation_stats
+            GROUP BY {column}
+            ORDER BY {column}
+        ''')
+        
+        statistics = []
+        for name, count, volume_sum, mass_sum, mass_min, mass_max in cursor:
+            statistics.append({
+                column: name,
+                'count': count,
+                'volume_sum': volume_sum,
+                'mass_sum': mass_sum,
+                'mass_mean': mass_sum / count,
+                'mass_min': mass_min,
+                'mass_max': mass_max
+            })
+        return statistics
+
+class GroupCommitWriter:
+    """Буферизует save_calculation и фиксирует накопленные строки одной транзакцией
+    по достижении max_batch строк или по истечении max_delay секунд"""
+    
+    _STOP = object()
+    
+    def __init__(self, db: GeometryDatabase, max_batch: int = 500, max_delay: float = 0.05):
+        if db.db_path == ":memory:":
+            raise ValueError("Групповая запись требует файл базы: у потока-писателя своё соединение")
+        if max_batch <= 0:
+            raise ValueError("Размер пакета должен быть положительным")
+        self.db = db
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = queue.Queue()
+        self._error = None
+        self._rows = 0
+        self._batches = 0
+        self._busy_time = 0.0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="geometry-group-commit", daemon=True)
+        self._thread.start()
+    
+    def save_calculation(self, shape_data: Dict[str, Any], parameters: Dict[str, float],
+                         material: Optional[Material] = None):
+        """Постановка расчёта в очередь на запись"""
+        if self._closed:
+            raise RuntimeError("Писатель уже закрыт")
+        self._raise_pending_error()
+        self._queue.put(self.db._calculation_row(shape_data, parameters, material))
+    
+    def flush(self):
+        """Ожидание записи всех поставленных в очередь строк"""
+        self._queue.join()
+        self._raise_pending_error()
+    
+    def close(self):
+        """Запись остатка очереди и остановка фонового потока"""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(self._STOP)
+            self._thread.join()
+        self._raise_pending_error()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def get_statistics(self) -> Dict[str, Any]:
+        """Количество записанных строк, транзакций и скорость записи"""
+        report = _throughput_report(self._rows, self._busy_time)
+        report['batches'] = self._batches
+        report['pending'] = self._queue.qsize()
+        return report
+    
+    def _raise_pending_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+    
+    def _run(self):
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            if item is self._STOP:
+                self._queue.task_done()
+                break
+            
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                try:
+                    if timeout > 0:
+                        item = self._queue.get(timeout=timeout)
+                    else:
+                        item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is self._STOP:
+                    stop = True
+                    self._queue.task_done()
+                    break
+                batch.append(item)
+            
+            self._write(batch)
+            for _ in batch:
+                self._queue.task_done()
+        
+        self.db.close_thread_connection()
+    
+    @timed('GroupCommitWriter._write')
+    def _write(self, batch: List[tuple]):
+        conn = self.db.connection
+        start = time.perf_counter()
+        try:
+            with conn:
+                _insert_calculations(conn, batch)
+        except sqlite3.Error as e:
+            self._error = e
+            return
+        self._busy_time += time.perf_counter() - start
+        self._rows += len(batch)
+        self._batches += 1
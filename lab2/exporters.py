@@ -0,0 +1,301 @@
+import csv
+import json
+import os
+from abc import ABC, abstractmethod
+from json.encoder import encode_basestring
+from typing import Dict, Any, Iterable, Optional, Sequence
+
+from geometry_package.instrumentation import timed
+
+# Экспорт любого числа записей расчётов (словарей to_dict() или страниц истории из
+# GeometryDatabase) потоком: в памяти держится не больше одного пакета строк
+
+
+def _cell(value):
+    """Значение ячейки для табличных форматов: вложенные структуры - JSON-строкой"""
+    if isinstance(value, (dict, list, tuple)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+class ReportExporter(ABC):
+    """Базовый экспортёр: write() принимает запись-словарь, write_rows() - пакет
+    строк-кортежей в порядке fields, close() завершает файл"""
+
+    extension = ''
+    binary = False
+
+    def __init__(self, target, fields: Optional[Sequence[str]] = None,
+                 json_fields: Sequence[str] = ()):
+        # target - путь к файлу или уже открытый поток (для текстовых форматов);
+        # json_fields - поля, которые в строках write_rows уже лежат JSON-текстом
+        self.target = target
+        self.fields = list(fields) if fields is not None else None
+        self.json_fields = set(json_fields)
+        self.rows = 0
+        self._started = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, record: Dict[str, Any]):
+        self._ensure_started(record)
+        self._write_rows([[_cell(record.get(field)) for field in self.fields]])
+        self.rows += 1
+
+    def write_many(self, records: Iterable[Dict[str, Any]]):
+        for record in records:
+            self.write(record)
+
+    def write_rows(self, rows: Sequence[Sequence[Any]]):
+        """Быстрый путь для необработанных строк (например, страниц из базы данных)"""
+        if self.fields is None:
+            raise ValueError("Для write_rows нужно заранее задать fields")
+        self._ensure_started(None)
+        self._write_rows(rows)
+        self.rows += len(rows)
+
+    def close(self):
+        if not self._started and self.fields is not None:
+            self._ensure_started(None)
+        if self._started:
+            self._finish()
+
+    def _ensure_started(self, record: Optional[Dict[str, Any]]):
+        if not self._started:
+            if self.fields is None:
+                self.fields = list(record)
+            self._start()
+            self._started = True
+
+    def _start(self):
+        pass
+
+    @abstractmethod
+    def _write_rows(self, rows: Sequence[Sequence[Any]]):
+        pass
+
+    def _finish(self):
+        pass
+
+
+class _TextExporter(ReportExporter):
+    def _start(self):
+        if isinstance(self.target, (str, os.PathLike)):
+            self._file = open(self.target, 'w', encoding='utf-8', newline='')
+            self._owns_file = True
+        else:
+            self._file = self.target
+            self._owns_file = False
+
+    def _finish(self):
+        if self._owns_file:
+            self._file.close()
+        else:
+            self._file.flush()
+
+
+class CsvExporter(_TextExporter):
+    extension = '.csv'
+
+    def _start(self):
+        super()._start()
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(self.fields)
+
+    def _write_rows(self, rows):
+        self._writer.writerows(rows)
+
+
+class JsonlExporter(_TextExporter):
+    extension = '.jsonl'
+
+    def write(self, record: Dict[str, Any]):
+        # Вложенные значения (параметры фигуры) остаются объектами JSON
+        self._ensure_started(record)
+        self._file.write(json.dumps({field: record.get(field) for field in self.fields},
+                                    ensure_ascii=False) + '\n')
+        self.rows += 1
+
+    def _write_rows(self, rows):
+        # JSON-текст из json_fields вставляется в строку как есть, без разбора:
+        # строка собирается из пар "ключ": значение, где обычные значения
+        # кодируются по одному (строки - сразу кодировщиком строк на C)
+        fields = self.fields
+        # Один кодировщик на пакет: json.dumps с параметрами создаёт его на каждый вызов
+        dumps = json.JSONEncoder(ensure_ascii=False).encode
+        raw = [field in self.json_fields for field in fields]
+        if not any(raw):
+            self._file.write(''.join(dumps(dict(zip(fields, row))) + '\n' for row in rows))
+            return
+        keys = [dumps(field) + ': ' for field in fields]
+        plan = list(zip(keys, raw))
+        lines = []
+        for row in rows:
+            parts = []
+            for (key, is_raw), value in zip(plan, row):
+                if value is None:
+                    parts.append(key + 'null')
+                elif is_raw:
+                    parts.append(key + value)
+                elif value.__class__ is str:
+                    parts.append(key + encode_basestring(value))
+                else:
+                    parts.append(key + dumps(value))
+            lines.append('{' + ', '.join(parts) + '}')
+        lines.append('')
+        self._file.write('\n'.join(lines))
+
+
+class XlsxExporter(ReportExporter):
+    """XLSX через openpyxl в режиме write-only: строки сразу уходят во временный файл"""
+
+    extension = '.xlsx'
+    binary = True
+
+    def _start(self):
+        from openpyxl import Workbook
+        self._workbook = Workbook(write_only=True)
+        self._sheet = self._workbook.create_sheet("Расчёты")
+        self._sheet.append(self.fields)
+
+    def _write_rows(self, rows):
+        append = self._sheet.append
+        for row in rows:
+            append(row)
+
+    def _finish(self):
+        self._workbook.save(self.target)
+
+
+class DocxExporter(ReportExporter):
+    """Таблица в DOCX через python-docx.
+
+    python-docx строит документ целиком в памяти, поэтому формат рассчитан
+    на отчёты, а не на выгрузку миллионов строк - для них есть CSV/JSONL/Parquet.
+    """
+
+    extension = '.docx'
+    binary = True
+
+    def _start(self):
+        from docx import Document
+        self._document = Document()
+        self._document.add_heading("Отчёт по расчётам геометрических фигур", level=1)
+        self._table = self._document.add_table(rows=1, cols=len(self.fields))
+        for cell, field in zip(self._table.rows[0].cells, self.fields):
+            cell.text = str(field)
+
+    def _write_rows(self, rows):
+        for row in rows:
+            for cell, value in zip(self._table.add_row().cells, row):
+                cell.text = '' if value is None else str(value)
+
+    def _finish(self):
+        self._document.save(self.target)
+
+
+class ParquetExporter(ReportExporter):
+    """Parquet через pyarrow: строки копятся пакетами по batch_size и пишутся row group'ами.
+
+    Схема берётся из первого пакета; целые столбцы (кроме integer_fields) расширяются
+    до float64, чтобы размеры вроде 24 и 4.1888 в разных пакетах давали один тип.
+    """
+
+    extension = '.parquet'
+    binary = True
+    batch_size = 65536
+    integer_fields = frozenset({'id'})
+
+    def _start(self):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("Для экспорта в Parquet нужен пакет pyarrow (pip install pyarrow)")
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self._writer = None
+        self._columns = [[] for _ in self.fields]
+
+    def _write_rows(self, rows):
+        if not rows:
+            return
+        for column, values in zip(self._columns, zip(*rows)):
+            column.extend(values)
+        if len(self._columns[0]) >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        table = self._pa.table(dict(zip(self.fields, self._columns)))
+        if self._writer is None:
+            schema = self._pa.schema([
+                field.with_type(self._pa.float64())
+                if self._pa.types.is_integer(field.type) and field.name not in self.integer_fields
+                else field
+                for field in table.schema
+            ])
+            table = table.cast(schema)
+            self._writer = self._pq.ParquetWriter(self.target, schema)
+        else:
+            table = table.cast(self._writer.schema)
+        self._writer.write_table(table)
+        self._columns = [[] for _ in self.fields]
+
+    def _finish(self):
+        if self._columns[0] or self._writer is None:
+            self._flush()
+        self._writer.close()
+
+
+EXPORTERS = {
+    'csv': CsvExporter,
+    'jsonl': JsonlExporter,
+    'xlsx': XlsxExporter,
+    'docx': DocxExporter,
+    'parquet': ParquetExporter,
+}
+
+
+def register_exporter(name: str, exporter_class: type):
+    """Подключение нового формата экспорта"""
+    EXPORTERS[name] = exporter_class
+
+
+def exporter_for(target, fmt: Optional[str] = None, fields: Optional[Sequence[str]] = None,
+                 json_fields: Sequence[str] = ()) -> ReportExporter:
+    """Экспортёр по имени формата или по расширению файла"""
+    if fmt is None:
+        if not isinstance(target, (str, os.PathLike)):
+            raise ValueError("Для потока нужно явно указать формат")
+        extension = os.path.splitext(str(target))[1].lower()
+        fmt = next((name for name, cls in EXPORTERS.items() if cls.extension == extension), None)
+        if fmt is None:
+            raise ValueError(f"Неизвестный формат файла: {target}")
+    if fmt not in EXPORTERS:
+        raise ValueError(f"Неизвестный формат экспорта: {fmt}")
+    exporter_class = EXPORTERS[fmt]
+    if exporter_class.binary and not isinstance(target, (str, os.PathLike)):
+        raise ValueError(f"Формат {fmt} можно записать только в файл")
+    return exporter_class(target, fields, json_fields)
+
+
+def export_records(records: Iterable[Dict[str, Any]], target, fmt: Optional[str] = None,
+                   fields: Optional[Sequence[str]] = None) -> int:
+    """Экспорт записей в файл или поток; возвращает число записанных строк"""
+    with exporter_for(target, fmt, fields) as exporter:
+        exporter.write_many(records)
+    return exporter.rows
+
+
+@timed('exporters.export_calculations')
+def export_calculations(db, target, fmt: Optional[str] = None, page_size: int = 5000, **filters) -> int:
+    """Выгрузка истории расчетов из GeometryDatabase страницами прямо из курсора"""
+    from database import CALCULATION_FIELDS
+    with exporter_for(target, fmt, CALCULATION_FIELDS, json_fields=('parameters',)) as exporter:
+        for rows in db.iter_calculation_rows(page_size, **filters):
+            exporter.write_rows(rows)
+    return exporter.rows
@@ -1,6 +1,17 @@
 from .base import Shape3D
-from .shapes import Parallelepiped, Tetrahedron, Sphere
-from .materials import Material, Steel, Aluminum, Copper
+from .registry import FormulaShape, ShapeSpec, register_shape, get_shape_spec, shape_specs, compile_formula
+from .shapes import Parallelepiped, Tetrahedron, Sphere, Cylinder, Cone, Torus, Ellipsoid, Prism
+from .mesh import Mesh
+from .materials import Material, Steel, Aluminum, Copper, MaterialCatalog
+from .units import Units
+from .batch import ShapeBatch
+from .cache import ShapeCache, get_shape_cache, set_shape_cache
+from .parallel import ParallelEvaluator
+from .packing import PackingEstimator
 
-__all__ = ['Shape3D', 'Parallelepiped', 'Tetrahedron', 'Sphere', 
-           'Material', 'Steel', 'Aluminum', 'Copper']
\ No newline at end of file
+__all__ = ['Shape3D', 'Parallelepiped', 'Tetrahedron', 'Sphere', 'Cylinder', 'Cone', 'Torus',
+           'Ellipsoid', 'Prism', 'Mesh', 'FormulaShape', 'ShapeSpec', 'register_shape',
+           'get_shape_spec', 'shape_specs', 'compile_formula',
+           'Material', 'Steel', 'Aluminum', 'Copper', 'MaterialCatalog', 'Units', 'ShapeBatch',
+           'ShapeCache', 'get_shape_cache', 'set_shape_cache', 'ParallelEvaluator',
+           'PackingEstimator']
\ No newline at end of file
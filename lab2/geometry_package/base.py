@@ -1,10 +1,16 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from fractions import Fraction
+from typing import Dict, Any, Optional, Tuple, Union
 from .materials import Material
+from .units import Units, exact_value, resolve_units
+from . import cache as _cache
+from .instrumentation import timed
 
 class Shape3D(ABC):
     #Абстрактный базовый класс для 3D фигур
     
+    __slots__ = ('_material', '_volume', '_surface_area')
+    
     def __init__(self, material: Material = None):
         self._material = material
         self._volume = None
@@ -20,6 +26,11 @@ class Shape3D(ABC):
             raise TypeError("Материал класса не найден.")
         self._material = value
     
+    @property
+    def parameters(self) -> Optional[Dict[str, float]]:
+        #Параметры фигуры в каноническом порядке; None - фигура не кэшируется
+        return None
+    
     @property
     def volume(self) -> float:
         if self._volume is None:
@@ -38,6 +49,10 @@ class Shape3D(ABC):
             raise ValueError("Материал не задан")
         return self.volume * self.material.density
     
+    def bounding_box(self) -> Tuple[float, float, float]:
+        #Габариты фигуры в собственных осях (нужны для оценки загрузки контейнера)
+        raise TypeError(f"Габариты фигуры {self.__class__.__name__} не заданы")
+    
     @abstractmethod
     def _calculate_volume(self) -> float:
         pass
@@ -52,12 +67,86 @@ class Shape3D(ABC):
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}()"
     
-    def to_dict(self) -> Dict[str, Any]:
-        #Возвращает словарь с параметрами фигуры
+    @timed('Shape3D.to_dict')
+    def to_dict(self, precision: Optional[int] = 4, units: Union[None, str, Units] = None,
+                arithmetic: str = 'float') -> Dict[str, Any]:
+        #Возвращает словарь с параметрами фигуры. Если включён общий кэш
+        #(set_shape_cache), готовые словари берутся из него; без кэша обычный
+        #вызов стоит столько же, сколько простое построение словаря.
+        #precision=None - значения без округления; units - единицы результатов
+        #(Units или единица длины 'mm'); arithmetic='decimal'/'fraction' - точный
+        #расчёт по формулам реестра (значения - Decimal/Fraction, без кэша)
+        cache = _cache._shape_cache
+        if precision == 4 and units is None and arithmetic == 'float':
+            if cache is None:
+                return self._build_dict()
+            entry = self._cached_entry(cache)
+            return dict(entry[2]) if entry is not None else self._build_dict()
+        units = resolve_units(units)
+        if arithmetic != 'float':
+            return self._exact_dict(precision, units, arithmetic)
+        entry = self._cached_entry(cache) if cache is not None else None
+        volume, surface_area = entry[:2] if entry is not None else (self.volume, self.surface_area)
+        mass = volume * self._material.density if self._material else None
+        return self._format_dict(volume, surface_area, mass, precision, units)
+    
+    @timed('Shape3D._build_dict')
+    def _build_dict(self) -> Dict[str, Any]:
+        material = self._material
+        volume = self.volume
         return {
             'type': self.__class__.__name__,
-            'volume': round(self.volume, 4),
+            'volume': round(volume, 4),
             'surface_area': round(self.surface_area, 4),
-            'mass': round(self.mass, 4) if self.material else None,
-            'material': self.material.name if self.material else None
-        }
\ No newline at end of file
+            'mass': round(volume * material.density, 4) if material else None,
+            'material': material.name if material else None
+        }
+    
+    def _format_dict(self, volume, surface_area, mass, precision: Optional[int],
+                     units: Optional[Units]) -> Dict[str, Any]:
+        #Словарь to_dict из значений в СИ: перевод единиц и округление
+        material = self._material
+        if units is not None:
+            volume, surface_area, mass = units.from_si(volume, surface_area, mass)
+        if precision is not None:
+            volume = round(volume, precision)
+            surface_area = round(surface_area, precision)
+            mass = round(mass, precision) if mass is not None else None
+        return {
+            'type': self.__class__.__name__,
+            'volume': volume,
+            'surface_area': surface_area,
+            'mass': mass,
+            'material': material.name if material else None
+        }
+    
+    def _exact_dict(self, precision: Optional[int], units: Optional[Units],
+                    arithmetic: str) -> Dict[str, Any]:
+        spec = getattr(type(self), 'spec', None)
+        parameters = self.parameters
+        if spec is None or not spec.parametric or parameters is None:
+            raise TypeError(f"Фигура {self.__class__.__name__} не поддерживает точный расчёт")
+        values = {name: exact_value(value, arithmetic) for name, value in parameters.items()}
+        volume = spec.volume(arithmetic=arithmetic)(**values)
+        surface_area = spec.surface_area(arithmetic=arithmetic)(**values)
+        if arithmetic == 'fraction' and not (isinstance(volume, Fraction) and isinstance(surface_area, Fraction)):
+            # Например, степень с дробным показателем: Fraction ** Fraction даёт float
+            raise ValueError(f"Формулы {self.__class__.__name__} не вычисляются в рациональных числах")
+        material = self._material
+        mass = volume * exact_value(material.density, arithmetic) if material else None
+        return self._format_dict(volume, surface_area, mass, precision, units)
+    
+    def _cached_entry(self, cache: '_cache.ShapeCache'):
+        #Запись общего кэша для фигуры с такими же параметрами и материалом
+        parameters = self.parameters
+        if parameters is None:
+            return None
+        material = self._material
+        key = (self.__class__.__name__, tuple(parameters.values()),
+               material.density if material else None,
+               material.name if material else None)
+        entry = cache.get(key)
+        if entry is None:
+            entry = (self.volume, self.surface_area, self._build_dict())
+            cache.put(key, entry)
+        return entry
\ No newline at end of file
@@ -0,0 +1,155 @@
+import numpy as np
+from typing import Dict, Any, Iterable, Iterator, Optional, Sequence, Union
+from .base import Shape3D
+from .registry import get_shape_spec
+from .units import Units, resolve_units
+
+
+def _vector_formulas(shape_type: type):
+    #Векторные формулы из реестра фигур - те же строки, что и у скалярного расчёта
+    try:
+        spec = get_shape_spec(shape_type)
+    except KeyError:
+        spec = None
+    if spec is None or not spec.parametric:
+        raise TypeError(f"Фигура {getattr(shape_type, '__name__', shape_type)} "
+                        f"не поддерживает пакетный расчёт")
+    return spec.names, spec.volume(vectorized=True), spec.surface_area(vectorized=True)
+
+
+class ShapeBatch:
+    #Колоночный пакет однотипных фигур: размеры и плотности хранятся в массивах NumPy,
+    #объём, площадь и масса считаются одним векторным проходом.
+    #units - единицы размеров и плотности (Units('mm', 'g/cm3')): столбцы переводятся
+    #в СИ одной операцией на столбец
+
+    def __init__(self, shape_type: type, density=None, materials: Sequence[str] = None,
+                 units: Union[None, str, Units] = None, **dimensions):
+        names, volume_fn, area_fn = _vector_formulas(shape_type)
+        if set(dimensions) != set(names):
+            raise ValueError(f"Для {shape_type.__name__} нужны параметры: {', '.join(names)}")
+        units = resolve_units(units)
+        if units is not None:
+            dimensions = units.dimensions_to_si(get_shape_spec(shape_type),
+                                                {name: np.asarray(dimensions[name], dtype=np.float64)
+                                                 for name in names})
+
+        columns = {}
+        size = None
+        for name in names:
+            column = np.asarray(dimensions[name], dtype=np.float64)
+            if column.ndim != 1:
+                raise ValueError(f"Параметр '{name}' должен быть одномерным массивом")
+            if size is None:
+                size = len(column)
+            elif len(column) != size:
+                raise ValueError("Все массивы размеров должны иметь одинаковую длину")
+            columns[name] = column
+
+        if density is not None:
+            density = np.asarray(density, dtype=np.float64)
+            if units is not None:
+                density = units.density_to_si(density)
+            density = np.broadcast_to(density, (size,))
+        if materials is not None and len(materials) != size:
+            raise ValueError("Длина столбца материалов не совпадает с числом фигур")
+
+        self._shape_type = shape_type
+        self._columns = columns
+        self._density = density
+        self._materials = materials
+        self._volume_fn = volume_fn
+        self._area_fn = area_fn
+        self._volume = None
+        self._surface_area = None
+        self._mass = None
+
+    @classmethod
+    def from_shapes(cls, shapes: Iterable[Shape3D]) -> 'ShapeBatch':
+        #Собирает пакет из готовых объектов одного типа
+        shapes = list(shapes)
+        if not shapes:
+            raise ValueError("Пустой список фигур")
+        shape_type = type(shapes[0])
+        if any(type(shape) is not shape_type for shape in shapes):
+            raise TypeError("Все фигуры в пакете должны быть одного типа")
+        names = _vector_formulas(shape_type)[0]
+        dimensions = {name: [getattr(shape, name) for shape in shapes] for name in names}
+
+        if all(shape.material is not None for shape in shapes):
+            density = [shape.material.density for shape in shapes]
+            materials = [shape.material.name for shape in shapes]
+        else:
+            density = None
+            materials = None
+        return cls(shape_type, density=density, materials=materials, **dimensions)
+
+    @property
+    def shape_type(self) -> type:
+        return self._shape_type
+
+    @property
+    def density(self):
+        return self._density
+
+    def column(self, name: str) -> np.ndarray:
+        return self._columns[name]
+
+    def __len__(self) -> int:
+        return len(next(iter(self._columns.values())))
+
+    @property
+    def volume(self) -> np.ndarray:
+        if self._volume is None:
+            self._volume = self._volume_fn(**self._columns)
+        return self._volume
+
+    @property
+    def surface_area(self) -> np.ndarray:
+        if self._surface_area is None:
+            self._surface_area = self._area_fn(**self._columns)
+        return self._surface_area
+
+    @property
+    def mass(self) -> np.ndarray:
+        if self._density is None:
+            raise ValueError("Плотность не задана")
+        if self._mass is None:
+            self._mass = self.volume * self._density
+        return self._mass
+
+    def __repr__(self) -> str:
+        return f"ShapeBatch({self._shape_type.__name__}, n={len(self)})"
+
+    def to_dicts(self, precision: Optional[int] = 4,
+                 units: Union[None, str, Units] = None) -> Iterator[Dict[str, Any]]:
+        #Построчно отдаёт словари в формате Shape3D.to_dict с теми же precision и units.
+        #Единицы переводятся над целыми массивами; precision=None - без округления
+        name = self._shape_type.__name__
+        volume, surface_area = self.volume, self.surface_area
+        mass = self.mass if self._density is not None else None
+        units = resolve_units(units)
+        if units is not None:
+            volume, surface_area, mass = units.from_si(volume, surface_area, mass)
+        volume = volume.tolist()
+        surface_area = surface_area.tolist()
+        mass = mass.tolist() if mass is not None else None
+        materials = self._materials
+        if precision is None:
+            for i in range(len(volume)):
+                yield {
+                    'type': name,
+                    'volume': volume[i],
+                    'surface_area': surface_area[i],
+                    'mass': mass[i] if mass is not None else None,
+                    'material': materials[i] if materials is not None else None
+                }
+            return
+        for i in range(len(volume)):
+            yield {
+                'type': name,
+                'volume': round(volume[i], precision),
+                'surface_area': round(surface_area[i], precision),
+                'mass': round(mass[i], precision) if mass is not None else None,
+                'material': materials[i] if materials is not None else None
+            }
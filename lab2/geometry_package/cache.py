@@ -0,0 +1,99 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Hashable, Optional, Tuple
+
+from .instrumentation import METRICS
+
+
+class ShapeCache:
+    #Ограниченный LRU-кэш результатов расчёта фигур, общий для всего процесса
+    #(включается set_shape_cache).
+    #Ключ - (тип фигуры, параметры, плотность, материал), значение -
+    #(объём, площадь поверхности, словарь to_dict())
+
+    def __init__(self, maxsize: int = 4096):
+        if maxsize <= 0:
+            raise ValueError("Размер кэша должен быть положительным")
+        self._maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def maxsize(self) -> int:
+        return self._maxsize
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[Tuple[float, float, Dict[str, Any]]]:
+        #Чтение без блокировки: отдельные операции OrderedDict атомарны под GIL,
+        #а запись, вытесненная между get и move_to_end, просто не продвигается
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        try:
+            self._data.move_to_end(key)
+        except KeyError:
+            pass
+        self.hits += 1
+        return entry
+
+    def put(self, key: Hashable, entry: Tuple[float, float, Dict[str, Any]]):
+        with self._lock:
+            self._data[key] = entry
+            self._data.move_to_end(key)
+            if len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+
+    def items(self):
+        with self._lock:
+            return list(self._data.items())
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'size': len(self._data),
+            'maxsize': self._maxsize
+        }
+
+    def __repr__(self) -> str:
+        return f"ShapeCache(size={len(self._data)}, maxsize={self._maxsize})"
+
+
+# Кэш по умолчанию выключен: для неповторяющихся фигур поиск и вставка ключа
+# дороже самого расчёта. Включается set_shape_cache(ShapeCache()) там, где
+# одинаковые детали повторяются (пакетный импорт, склад)
+_shape_cache = None
+
+
+def _cache_values() -> Dict[str, float]:
+    #Значения общего кэша для снимка метрик (instrumentation.METRICS)
+    if _shape_cache is None:
+        return {}
+    stats = _shape_cache.stats()
+    return {f'shape_cache.{name}': stats[name] for name in ('hits', 'misses', 'hit_rate', 'size')}
+
+
+METRICS.register_collector(_cache_values)
+
+
+def get_shape_cache() -> Optional[ShapeCache]:
+    return _shape_cache
+
+
+def set_shape_cache(cache: Optional[ShapeCache]):
+    #Замена общего кэша; None отключает кэширование
+    global _shape_cache
+    _shape_cache = cache
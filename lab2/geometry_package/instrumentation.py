@@ -0,0 +1,280 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from bisect import bisect_left
+from contextlib import nullcontext
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Инструментирование горячих путей (расчёт фигур, to_dict, вызовы базы данных).
+# По умолчанию выключено: декоратор timed возвращает функцию без изменений, а timer -
+# общий пустой контекст, поэтому накладных расходов нет. Включается переменной
+# окружения до импорта пакета: GEOMETRY_METRICS=1
+ENV_VAR = 'GEOMETRY_METRICS'
+
+# Верхние границы корзин гистограммы времени, с (как у гистограмм Prometheus)
+BUCKETS = (1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+
+def _env_enabled() -> bool:
+    return os.environ.get(ENV_VAR, '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+ENABLED = _env_enabled()
+
+
+class _Histogram:
+    #Число вызовов, сумма, минимум, максимум и корзины по BUCKETS (+Inf - последняя)
+    __slots__ = ('count', 'total', 'min', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.buckets[bisect_left(BUCKETS, seconds)] += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(BUCKETS + (float('inf'),), self.buckets):
+            cumulative += count
+            buckets['+Inf' if bound == float('inf') else repr(bound)] = cumulative
+        return {
+            'count': self.count,
+            'sum': self.total,
+            'min': self.min if self.count else 0.0,
+            'max': self.max,
+            'mean': self.total / self.count if self.count else 0.0,
+            'buckets': buckets,
+        }
+
+
+def _label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Metrics:
+    #Хранилище замеров: гистограммы времени по операциям, счётчики событий и
+    #сборщики значений (например, попаданий ShapeCache), опрашиваемые при снимке
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._collectors = []
+
+    def observe(self, operation: str, seconds: float):
+        with self._lock:
+            histogram = self._histograms.get(operation)
+            if histogram is None:
+                histogram = self._histograms[operation] = _Histogram()
+            histogram.observe(seconds)
+
+    def increment(self, event: str, value: float = 1):
+        with self._lock:
+            self._counters[event] = self._counters.get(event, 0) + value
+
+    def register_collector(self, collector: Callable[[], Dict[str, float]]):
+        #collector() -> {имя: значение}; вызывается при каждом снимке
+        self._collectors.append(collector)
+
+    def timer(self, operation: str) -> '_Timer':
+        return _Timer(self, operation)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            operations = {name: histogram.to_dict() for name, histogram in sorted(self._histograms.items())}
+            counters = dict(sorted(self._counters.items()))
+        gauges = {}
+        for collector in self._collectors:
+            gauges.update(collector())
+        return {'enabled': ENABLED, 'operations': operations, 'counters': counters, 'gauges': gauges}
+
+    def to_json(self, indent: Optional[int] = 2) -> str:
+        return json.dumps(self.snapshot(), ensure_ascii=False, indent=indent)
+
+    def to_prometheus(self, prefix: str = 'geometry') -> str:
+        #Снимок в текстовом формате Prometheus
+        snapshot = self.snapshot()
+        lines = []
+        if snapshot['operations']:
+            metric = f'{prefix}_operation_seconds'
+            lines += [f'# HELP {metric} Duration of instrumented operations',
+                      f'# TYPE {metric} histogram']
+            for name, data in snapshot['operations'].items():
+                label = f'operation="{_label(name)}"'
+                for bound, count in data['buckets'].items():
+                    lines.append(f'{metric}_bucket{{{label},le="{bound}"}} {count}')
+                lines.append(f'{metric}_sum{{{label}}} {data["sum"]!r}')
+                lines.append(f'{metric}_count{{{label}}} {data["count"]}')
+        if snapshot['counters']:
+            metric = f'{prefix}_events_total'
+            lines += [f'# HELP {metric} Counted events', f'# TYPE {metric} counter']
+            lines += [f'{metric}{{event="{_label(name)}"}} {value}' for name, value in snapshot['counters'].items()]
+        if snapshot['gauges']:
+            metric = f'{prefix}_value'
+            lines += [f'# HELP {metric} Collected values', f'# TYPE {metric} gauge']
+            lines += [f'{metric}{{name="{_label(name)}"}} {value}' for name, value in snapshot['gauges'].items()]
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path: str):
+        #Снимок в файл: .prom/.txt - формат Prometheus, иначе JSON
+        text = self.to_prometheus() if path.endswith(('.prom', '.txt')) else self.to_json()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+
+class _Timer:
+    __slots__ = ('_metrics', '_operation', '_started')
+
+    def __init__(self, metrics: Metrics, operation: str):
+        self._metrics = metrics
+        self._operation = operation
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._metrics.observe(self._operation, time.perf_counter() - self._started)
+
+
+METRICS = Metrics()
+_NULL_TIMER = nullcontext()
+
+
+def is_enabled() -> bool:
+    return ENABLED
+
+
+def enable(value: bool = True):
+    #Включение во время работы влияет на timer() и increment(); функции, уже
+    #обёрнутые timed при импорте, включаются только переменной окружения
+    global ENABLED
+    ENABLED = bool(value)
+
+
+def timer(operation: str, metrics: Optional[Metrics] = None):
+    #Замер блока: with timer('export.csv'): ...
+    if not ENABLED:
+        return _NULL_TIMER
+    return (metrics or METRICS).timer(operation)
+
+
+def increment(event: str, value: float = 1, metrics: Optional[Metrics] = None):
+    if ENABLED:
+        (metrics or METRICS).increment(event, value)
+
+
+def timed(operation: Optional[str] = None, metrics: Optional[Metrics] = None,
+          enabled: Optional[bool] = None):
+    #Декоратор замера функции. Выключенный (по умолчанию) возвращает саму функцию
+    def decorate(func):
+        if not (ENABLED if enabled is None else enabled):
+            return func
+        name = operation or func.__qualname__
+        target = metrics or METRICS
+        observe = target.observe
+        perf_counter = time.perf_counter
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            started = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe(name, perf_counter() - started)
+        return wrapper
+    return decorate
+
+
+class ProfileCapture:
+    #cProfile вокруг блока (работает независимо от GEOMETRY_METRICS):
+    #
+    #    with ProfileCapture('to_dict.prof') as capture:
+    #        ...
+    #    print(capture.report())
+
+    def __init__(self, path: Optional[str] = None, sort: str = 'cumulative', limit: int = 25):
+        self.path = path
+        self.sort = sort
+        self.limit = limit
+        self.stats = None
+        self._profiler = cProfile.Profile()
+
+    def __enter__(self) -> 'ProfileCapture':
+        self._profiler.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._profiler.disable()
+        self.stats = pstats.Stats(self._profiler)
+        if self.path:
+            self.stats.dump_stats(self.path)
+
+    def report(self) -> str:
+        if self.stats is None:
+            raise RuntimeError("Профиль ещё не снят")
+        stream = io.StringIO()
+        pstats.Stats(self._profiler, stream=stream).sort_stats(self.sort).print_stats(self.limit)
+        return stream.getvalue()
+
+
+class MemoryCapture:
+    #tracemalloc вокруг блока: прирост памяти по строкам кода и пик за время блока
+
+    def __init__(self, limit: int = 10, frames: int = 1):
+        self.limit = limit
+        self.frames = frames
+        self.peak = 0
+        self.allocated = 0
+        self.top: List[Tuple[str, int, int]] = []
+        self._started_tracing = False
+        self._before = None
+
+    def __enter__(self) -> 'MemoryCapture':
+        self._started_tracing = not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start(self.frames)
+        tracemalloc.reset_peak()
+        self._before = tracemalloc.take_snapshot()
+        self._base = tracemalloc.get_traced_memory()[0]
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        current, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        if self._started_tracing:
+            tracemalloc.stop()
+        self.allocated = current - self._base
+        self.peak = peak - self._base
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        differences = after.filter_traces(filters).compare_to(self._before.filter_traces(filters), 'lineno')
+        self.top = [(str(stat.traceback), stat.size_diff, stat.count_diff)
+                    for stat in differences[:self.limit]]
+        self._before = None
+
+    def report(self) -> str:
+        lines = [f"Прирост: {self.allocated / 1024:.1f} КиБ, пик: {self.peak / 1024:.1f} КиБ"]
+        lines += [f"{size / 1024:10.1f} КиБ {count:+8d}  {location}" for location, size, count in self.top]
+        return '\n'.join(lines)
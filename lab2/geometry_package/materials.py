@@ -1,7 +1,19 @@
+from types import MappingProxyType
+from typing import Iterable, Iterator, List, Tuple, Union
+
+
 class Material:
+    __slots__ = ('_name', '_density')
+    
+    _interned = {}
+    # Плотность последнего созданного материала с таким именем: словарь to_dict()
+    # хранит только имя, а базе нужна плотность нового материала
+    _densities = {}
+    
     def __init__(self, name: str, density: float):
         self._name = name
         self._density = density
+        Material._densities[name] = density
     
     @property
     def name(self) -> str:
@@ -16,15 +28,135 @@ class Material:
     
     def __repr__(self) -> str:
         return f"Material('{self._name}', {self._density})"
+    
+    @classmethod
+    def density_of(cls, name: str):
+        #Плотность известного в процессе материала по имени (None, если такого не было)
+        return cls._densities.get(name)
+    
+    @classmethod
+    def intern(cls, name: str, density: float) -> 'Material':
+        #Единственный общий экземпляр материала с таким именем и плотностью
+        key = (name, float(density))
+        material = cls._interned.get(key)
+        if material is None:
+            material = cls._interned.setdefault(key, Material(name, density))
+        return material
 
-class Steel(Material):
+class _StandardMaterial(Material):
+    #Стандартные материалы - приспособленцы: Steel() и т.п. всегда возвращают
+    #один и тот же экземпляр, поэтому фигуры не хранят собственные копии
+    __slots__ = ()
+    
+    _instances = {}
+    
+    def __new__(cls):
+        instance = _StandardMaterial._instances.get(cls)
+        if instance is None:
+            instance = _StandardMaterial._instances.setdefault(cls, super().__new__(cls))
+        return instance
+
+class Steel(_StandardMaterial):
+    __slots__ = ()
+    
     def __init__(self):
         super().__init__("Сталь", 7850.0)
 
-class Aluminum(Material):
+class Aluminum(_StandardMaterial):
+    __slots__ = ()
+    
     def __init__(self):
         super().__init__("Алюминий", 2700.0)
 
-class Copper(Material):
+class Copper(_StandardMaterial):
+    __slots__ = ()
+    
     def __init__(self):
-        super().__init__("Медь", 8960.0)
\ No newline at end of file
+        super().__init__("Медь", 8960.0)
+
+# Стандартные материалы и порядок их id в таблице materials
+_STANDARD_MATERIALS = (Steel(), Aluminum(), Copper())
+_STANDARD_BY_NAME = {material.name: material for material in _STANDARD_MATERIALS}
+
+
+class MaterialCatalog:
+    #Неизменяемый индекс материалов: id и имя -> Material (строки таблицы materials).
+    #Поиск по имени и по id - одно обращение к словарю, поэтому каталог годится
+    #для тысяч материалов. Каталог не меняется: with_material возвращает новый
+    #каталог, и уже выданный можно без блокировок читать из любого потока
+    __slots__ = ('_by_id', '_by_name', '_ids')
+    
+    def __init__(self, rows: Iterable[Tuple[int, str, float]] = ()):
+        by_id = {}
+        by_name = {}
+        ids = {}
+        for material_id, name, density in rows:
+            density = float(density)
+            material = _STANDARD_BY_NAME.get(name)
+            if material is None or material.density != density:
+                material = Material.intern(name, density)
+            by_id[material_id] = material
+            by_name[name] = material
+            ids[name] = material_id
+        self._by_id = MappingProxyType(by_id)
+        self._by_name = MappingProxyType(by_name)
+        self._ids = MappingProxyType(ids)
+    
+    @classmethod
+    def standard(cls) -> 'MaterialCatalog':
+        #Каталог стандартных материалов с id, как в только что созданной базе
+        return cls((material_id, material.name, material.density)
+                   for material_id, material in enumerate(_STANDARD_MATERIALS, start=1))
+    
+    def __len__(self) -> int:
+        return len(self._by_id)
+    
+    def __iter__(self) -> Iterator[Material]:
+        #Материалы в порядке id
+        return iter(self._by_id.values())
+    
+    def __contains__(self, key: Union[int, str]) -> bool:
+        return key in (self._by_name if isinstance(key, str) else self._by_id)
+    
+    def __getitem__(self, key: Union[int, str]) -> Material:
+        #Материал по имени или по id
+        try:
+            return self._by_name[key] if isinstance(key, str) else self._by_id[key]
+        except KeyError:
+            raise KeyError(f"Неизвестный материал: {key!r}") from None
+    
+    def get(self, key: Union[int, str], default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+    
+    def id_of(self, name: str) -> int:
+        try:
+            return self._ids[name]
+        except KeyError:
+            raise KeyError(f"Неизвестный материал: {name!r}") from None
+    
+    def density(self, key: Union[int, str]) -> float:
+        return self[key].density
+    
+    def names(self) -> List[str]:
+        return list(self._by_name)
+    
+    def rows(self) -> List[Tuple[int, str, float]]:
+        #Строки (id, имя, плотность) - из них каталог строится заново
+        return [(material_id, material.name, material.density)
+                for material_id, material in self._by_id.items()]
+    
+    def with_material(self, material_id: int, name: str, density: float) -> 'MaterialCatalog':
+        #Новый каталог с добавленным (или заменённым) материалом
+        rows = [row for row in self.rows() if row[0] != material_id and row[1] != name]
+        rows.append((material_id, name, density))
+        return MaterialCatalog(rows)
+    
+    def __reduce__(self):
+        # MappingProxyType не сериализуется pickle - каталог передаётся строками
+        return MaterialCatalog, (self.rows(),)
+    
+    def __repr__(self) -> str:
+        return f"MaterialCatalog({len(self)} материалов)"
@@ -0,0 +1,148 @@
+import os
+import numpy as np
+from typing import Optional, Tuple
+from .base import Shape3D
+from .registry import register_shape
+from .instrumentation import timed
+
+# Двоичный STL: 80 байт заголовка, uint32 - число треугольников, затем записи по 50 байт
+STL_HEADER_SIZE = 84
+STL_RECORD_DTYPE = np.dtype([
+    ('normal', '<f4', (3,)),
+    ('vertices', '<f4', (3, 3)),
+    ('attribute', '<u2'),
+])
+
+# Треугольники обрабатываются кусками: в памяти - не больше одного куска в float64
+_CHUNK_TRIANGLES = 1 << 13
+
+
+def _stl_triangles(path: str) -> np.ndarray:
+    #Вершины треугольников (n, 3, 3) float32 прямо из файла через np.memmap
+    size = os.path.getsize(path)
+    if size < STL_HEADER_SIZE:
+        raise ValueError(f"Файл {path} слишком мал для двоичного STL")
+    count = int(np.fromfile(path, dtype='<u4', count=1, offset=80)[0])
+    if size != STL_HEADER_SIZE + count * STL_RECORD_DTYPE.itemsize:
+        raise ValueError(f"Файл {path} не является двоичным STL "
+                         f"(ожидалось {count} треугольников; текстовый STL не поддерживается)")
+    if count == 0:
+        return np.empty((0, 3, 3), dtype=np.float32)
+    records = np.memmap(path, dtype=STL_RECORD_DTYPE, mode='r', offset=STL_HEADER_SIZE, shape=(count,))
+    return records['vertices']
+
+
+def write_stl(path: str, triangles, header: bytes = b'geometry_package') -> int:
+    #Запись треугольников (n, 3, 3) в двоичный STL; нормали считаются по вершинам
+    triangles = np.asarray(triangles, dtype=np.float32)
+    records = np.zeros(len(triangles), dtype=STL_RECORD_DTYPE)
+    records['vertices'] = triangles
+    normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    records['normal'] = np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+    with open(path, 'wb') as f:
+        f.write(header[:80].ljust(80, b'\0'))
+        f.write(np.uint32(len(records)).tobytes())
+        records.tofile(f)
+    return len(records)
+
+
+@register_shape(title="Треугольная сетка (STL)",
+                dimensions=(('path', 'Файл', ''), ('triangle_count', 'Число треугольников', '')),
+                inputs=(('path', 'Путь к двоичному STL-файлу'),), factory='from_stl')
+class Mesh(Shape3D):
+    #Фигура, заданная замкнутой треугольной сеткой: массив треугольников (n, 3, 3).
+    #Объём - сумма знаковых объёмов тетраэдров, площадь - сумма площадей треугольников.
+    #Оба значения считаются за один векторный проход по кускам массива, поэтому
+    #сетка из STL (np.memmap) не читается в память целиком
+
+    __slots__ = ('_triangles', '_path')
+
+    def __init__(self, triangles, material=None, path: Optional[str] = None):
+        super().__init__(material)
+        triangles = np.asarray(triangles)
+        if triangles.dtype.kind != 'f':
+            triangles = triangles.astype(np.float64)
+        if triangles.ndim != 3 or triangles.shape[1:] != (3, 3):
+            raise ValueError("Сетка задаётся массивом треугольников формы (n, 3, 3)")
+        self._triangles = triangles
+        self._path = path
+
+    @classmethod
+    def from_arrays(cls, vertices, faces, material=None) -> 'Mesh':
+        #Сетка по массиву вершин (m, 3) и индексам граней (n, 3)
+        vertices = np.asarray(vertices, dtype=np.float64)
+        faces = np.asarray(faces, dtype=np.intp)
+        return cls(vertices[faces], material)
+
+    @classmethod
+    def from_stl(cls, path: str, material=None) -> 'Mesh':
+        #Сетка из двоичного STL-файла, отображённого в память
+        return cls(_stl_triangles(path), material, path=str(path))
+
+    @property
+    def triangles(self) -> np.ndarray:
+        return self._triangles
+
+    @property
+    def triangle_count(self) -> int:
+        return len(self._triangles)
+
+    @property
+    def path(self) -> Optional[str]:
+        return self._path
+
+    @timed('Mesh._measure')
+    def _measure(self):
+        #Объём и площадь за один проход. Для треугольника (a, b, c) с n = (b-a) x (c-a):
+        #площадь = |n| / 2, знаковый объём тетраэдра с вершиной в опорной точке = (a-p)·n / 6.
+        #Опорная точка - первая вершина сетки, чтобы не терять точность далеко от начала координат
+        triangles = self._triangles
+        volume = 0.0
+        area = 0.0
+        if len(triangles):
+            ox, oy, oz = (float(c) for c in triangles[0, 0])
+            columns = None
+            for start in range(0, len(triangles), _CHUNK_TRIANGLES):
+                chunk = triangles[start:start + _CHUNK_TRIANGLES].reshape(-1, 9)
+                if columns is None or columns.shape[1] != len(chunk):
+                    columns = np.empty((9, len(chunk)))
+                # Покомпонентные непрерывные столбцы float64: ax, ay, az, bx, ..., cz
+                columns[...] = chunk.T
+                ax, ay, az, bx, by, bz, cx, cy, cz = columns
+                ux, uy, uz = bx - ax, by - ay, bz - az
+                vx, vy, vz = cx - ax, cy - ay, cz - az
+                # n = u x v
+                nx = uy * vz - uz * vy
+                ny = uz * vx - ux * vz
+                nz = ux * vy - uy * vx
+                ax -= ox
+                ay -= oy
+                az -= oz
+                volume += float(ax @ nx + ay @ ny + az @ nz)
+                area += float(np.sqrt(nx * nx + ny * ny + nz * nz).sum())
+        self._volume = abs(volume) / 6
+        self._surface_area = area / 2
+
+    def _calculate_volume(self) -> float:
+        self._measure()
+        return self._volume
+
+    def _calculate_surface_area(self) -> float:
+        self._measure()
+        return self._surface_area
+
+    def bounding_box(self) -> Tuple[float, float, float]:
+        if not len(self._triangles):
+            raise ValueError("Пустая сетка не имеет габаритов")
+        low = np.full(3, np.inf)
+        high = np.full(3, -np.inf)
+        for start in range(0, len(self._triangles), _CHUNK_TRIANGLES):
+            points = np.asarray(self._triangles[start:start + _CHUNK_TRIANGLES]).reshape(-1, 3)
+            low = np.minimum(low, points.min(axis=0))
+            high = np.maximum(high, points.max(axis=0))
+        return tuple(float(d) for d in high - low)
+
+    def __repr__(self) -> str:
+        source = f", path={self._path!r}" if self._path else ""
+        return f"Mesh(triangles={len(self._triangles)}{source})"
@@ -0,0 +1,255 @@
+import math
+from itertools import groupby, permutations
+from typing import Dict, Any, List, Sequence, Tuple
+
+from .base import Shape3D
+from .shapes import Parallelepiped, Sphere
+
+# Допуск сравнения размеров: ряд из десяти деталей по 0.1 м должен влезать в 1 м
+_EPS = 1e-9
+
+
+def bounding_box(shape: Shape3D) -> Tuple[float, float, float]:
+    #Габариты фигуры (по убыванию), в которых она укладывается коробкой
+    try:
+        dims = shape.bounding_box()
+    except TypeError:
+        raise TypeError(f"Фигура {shape.__class__.__name__} не поддерживается упаковкой")
+    return tuple(sorted((float(d) for d in dims), reverse=True))
+
+
+class _MaxTree:
+    #Дерево отрезков по максимуму: поиск первого элемента не меньше порога за O(log n).
+    #Нужно для first-fit: полок и слоёв бывают тысячи, а деталей - сотни тысяч
+
+    def __init__(self):
+        self._size = 1
+        self._tree = [-math.inf] * 2
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, value: float) -> int:
+        if self._count == self._size:
+            values = self._tree[self._size:self._size + self._count]
+            self._size *= 2
+            self._tree = [-math.inf] * (2 * self._size)
+            self._tree[self._size:self._size + self._count] = values
+            for i in range(self._size - 1, 0, -1):
+                self._tree[i] = max(self._tree[2 * i], self._tree[2 * i + 1])
+        index = self._count
+        self._count += 1
+        self.update(index, value)
+        return index
+
+    def update(self, index: int, value: float):
+        tree = self._tree
+        i = index + self._size
+        tree[i] = value
+        i //= 2
+        while i:
+            tree[i] = max(tree[2 * i], tree[2 * i + 1])
+            i //= 2
+
+    def find_first(self, threshold: float, start: int = 0) -> int:
+        #Индекс первого элемента >= threshold, начиная со start, или -1
+        tree = self._tree
+        size = self._size
+        if start >= self._count:
+            return -1
+        # Подъём от листа start, пока справа не найдётся поддерево с подходящим максимумом
+        i = start + size
+        if tree[i] >= threshold:
+            return start
+        while True:
+            if i & 1 == 0 and tree[i + 1] >= threshold:
+                i += 1
+                break
+            i //= 2
+            if i <= 1:
+                return -1
+        while i < size:
+            i = 2 * i if tree[2 * i] >= threshold else 2 * i + 1
+        return i - size
+
+
+class PackingEstimator:
+    #Оценка загрузки контейнера-параллелепипеда деталями.
+    #Разнотипные детали укладываются эвристикой first-fit decreasing по слоям и полкам
+    #(каждая деталь - в своих габаритах, длинной стороной вдоль длинной оси контейнера),
+    #одинаковые шары - по гексагональной плотной или кубической решётке.
+    #Результат - словарь с размещениями, коэффициентом заполнения и массой по материалам
+
+    def __init__(self, container: Parallelepiped):
+        if not isinstance(container, Parallelepiped):
+            raise TypeError("Контейнер должен быть параллелепипедом")
+        dims = (float(container.length), float(container.width), float(container.height))
+        if min(dims) <= 0:
+            raise ValueError("Размеры контейнера должны быть положительными")
+        self._container = container
+        self._dims = dims
+
+    @property
+    def container(self) -> Parallelepiped:
+        return self._container
+
+    def pack(self, items: Sequence[Shape3D], method: str = 'auto') -> Dict[str, Any]:
+        #method: 'shelf' - first-fit decreasing, 'lattice' - решётка (только одинаковые
+        #шары), 'auto' - решётка для одинаковых шаров, иначе полки
+        items = list(items)
+        spheres_only = bool(items) and all(type(item) is Sphere for item in items)
+        same_radius = spheres_only and len({item.radius for item in items}) == 1
+        if method == 'auto':
+            method = 'lattice' if same_radius else 'shelf'
+        if method == 'lattice':
+            if not same_radius:
+                raise ValueError("Решётчатая упаковка применима только к одинаковым шарам")
+            placements = self._pack_lattice(items)
+        elif method == 'shelf':
+            placements = self._pack_shelves(items)
+        else:
+            raise ValueError(f"Неизвестный метод упаковки: {method}")
+        return self._report(items, placements, method)
+
+    def lattice_capacity(self, radius: float) -> int:
+        #Сколько шаров радиуса radius помещается в контейнер (лучшая из решёток)
+        return self._best_lattice(radius)[0]
+
+    def _report(self, items: List[Shape3D], placements: List[tuple], method: str) -> Dict[str, Any]:
+        placed_indexes = {placement[0] for placement in placements}
+        volume = 0.0
+        mass_by_material = {}
+        for index in placed_indexes:
+            item = items[index]
+            volume += item.volume
+            if item.material is not None:
+                name = item.material.name
+                mass_by_material[name] = mass_by_material.get(name, 0.0) + item.mass
+        return {
+            'method': method,
+            'placed': len(placements),
+            'unplaced': [index for index in range(len(items)) if index not in placed_indexes],
+            'fill_ratio': volume / self._container.volume,
+            'placed_volume': volume,
+            'mass_by_material': mass_by_material,
+            'total_mass': sum(mass_by_material.values()),
+            'placements': sorted(placements),
+        }
+
+    # Полочная упаковка: слои по высоте, в слое - полки по ширине, на полке - детали
+    # по длине. Детали идут по убыванию высоты, поэтому любая деталь ниже уже открытых
+    # слоёв и проверять приходится только свободную длину полки и её глубину
+
+    def _pack_shelves(self, items: List[Shape3D]) -> List[tuple]:
+        length, width, height = self._dims
+        order = sorted(range(len(self._dims)), key=lambda axis: -self._dims[axis])
+        boxes = []
+        for index, item in enumerate(items):
+            oriented = [0.0, 0.0, 0.0]
+            for axis, size in zip(order, bounding_box(item)):
+                oriented[axis] = size
+            boxes.append((oriented[2], oriented[1], oriented[0], index))
+        boxes.sort(reverse=True)
+
+        layers = _MaxTree()         # свободная ширина слоя
+        layer_info = []             # (z, высота, занятая ширина)
+        shelves = _MaxTree()        # свободная длина полки
+        shelf_info = []             # (слой, y, глубина, занятая длина)
+        used_height = 0.0
+        placements = []
+
+        for (dz, dy, dx), group in groupby(boxes, key=lambda box: box[:3]):
+            indexes = [box[3] for box in group]
+            if dx > length + _EPS or dy > width + _EPS or dz > height + _EPS:
+                continue
+            while indexes:
+                shelf = self._find_shelf(shelves, shelf_info, dx, dy)
+                if shelf < 0:
+                    layer = layers.find_first(dy - _EPS)
+                    if layer < 0:
+                        if used_height + dz > height + _EPS:
+                            break
+                        layer = layers.append(width)
+                        layer_info.append((used_height, dz, 0.0))
+                        used_height += dz
+                    z, layer_height, used_width = layer_info[layer]
+                    layer_info[layer] = (z, layer_height, used_width + dy)
+                    layers.update(layer, width - used_width - dy)
+                    shelf = shelves.append(length)
+                    shelf_info.append((layer, used_width, dy, 0.0))
+
+                layer, y, depth, used_length = shelf_info[shelf]
+                fit = int((length - used_length + _EPS) // dx)
+                count = min(fit, len(indexes))
+                z = layer_info[layer][0]
+                for k in range(count):
+                    placements.append((indexes[k], used_length + k * dx, y, z, dx, dy, dz))
+                del indexes[:count]
+                used_length += count * dx
+                shelf_info[shelf] = (layer, y, depth, used_length)
+                shelves.update(shelf, length - used_length)
+        return placements
+
+    @staticmethod
+    def _find_shelf(shelves: _MaxTree, shelf_info: List[tuple], dx: float, dy: float) -> int:
+        shelf = shelves.find_first(dx - _EPS)
+        while shelf >= 0 and shelf_info[shelf][2] + _EPS < dy:
+            shelf = shelves.find_first(dx - _EPS, shelf + 1)
+        return shelf
+
+    # Решётчатая упаковка одинаковых шаров
+
+    def _pack_lattice(self, items: List[Shape3D]) -> List[tuple]:
+        radius = float(items[0].radius)
+        capacity, axes, hexagonal = self._best_lattice(radius)
+        size = 2 * radius
+        placements = []
+        remaining = min(capacity, len(items))
+        for x0, y, z, count in self._lattice_rows(radius, axes, hexagonal):
+            for k in range(min(count, remaining)):
+                corner = [0.0, 0.0, 0.0]
+                for axis, value in zip(axes, (x0 + k * size - radius, y - radius, z - radius)):
+                    corner[axis] = value
+                placements.append((len(placements), *corner, size, size, size))
+            remaining -= count
+            if remaining <= 0:
+                break
+        return placements
+
+    def _best_lattice(self, radius: float) -> Tuple[int, Tuple[int, int, int], bool]:
+        #Лучшая из решёток: кубическая или ГПУ с любой из осей контейнера в роли
+        #рядов, направления между рядами и вертикали
+        if radius <= 0:
+            raise ValueError("Радиус должен быть положительным")
+        best = (0, (0, 1, 2), False)
+        for hexagonal in (False, True):
+            for axes in permutations(range(3)):
+                count = sum(row[3] for row in self._lattice_rows(radius, axes, hexagonal))
+                if count > best[0]:
+                    best = (count, axes, hexagonal)
+        return best
+
+    def _lattice_rows(self, radius: float, axes: Tuple[int, int, int], hexagonal: bool):
+        #Ряды решётки: (x первого центра, y, z, число шаров в ряду) в осях axes
+        length, width, height = (self._dims[axis] for axis in axes)
+        size = 2 * radius
+        if hexagonal:
+            row_step = radius * math.sqrt(3)
+            layer_step = size * math.sqrt(2 / 3)
+        else:
+            row_step = layer_step = size
+        layer = 0
+        z = radius
+        while z <= height - radius + _EPS:
+            # Слои B сдвинуты на (r, r/sqrt(3)) - шары ложатся в лунки слоя A
+            y = radius + (radius / math.sqrt(3) if hexagonal and layer % 2 else 0.0)
+            row = 0
+            while y <= width - radius + _EPS:
+                x0 = radius + (radius if hexagonal and (row + layer) % 2 else 0.0)
+                if x0 <= length - radius + _EPS:
+                    yield x0, y, z, int((length - radius - x0 + _EPS) // size) + 1
+                y += row_step
+                row += 1
+            z += layer_step
+            layer += 1
@@ -0,0 +1,167 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from operator import attrgetter
+from typing import Dict, Any, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from .base import Shape3D
+
+# Геттеры параметров по классу фигуры: attrgetter по именам из Shape3D.parameters
+# заметно дешевле, чем построение словаря parameters для каждой фигуры
+_PARAMETER_GETTERS = {}
+
+
+def _parameter_getter(shape: Shape3D):
+    shape_type = type(shape)
+    if shape_type not in _PARAMETER_GETTERS:
+        parameters = shape.parameters
+        if parameters is None:
+            _PARAMETER_GETTERS[shape_type] = None
+        else:
+            names = tuple(parameters)
+            _PARAMETER_GETTERS[shape_type] = (names, attrgetter(*names))
+    return _PARAMETER_GETTERS[shape_type]
+
+
+def _pack(shapes: Sequence[Shape3D]) -> List[tuple]:
+    #Упаковка фрагмента коллекции по типам фигур: для каждого типа - позиции во
+    #фрагменте, массив параметров float64 (n, k), коды материалов и таблица материалов.
+    #Фигуры без parameters передаются как есть (pickle объекта)
+    groups = {}
+    materials = {}
+    for position, shape in enumerate(shapes):
+        shape_type = type(shape)
+        group = groups.get(shape_type)
+        if group is None:
+            group = groups[shape_type] = (_parameter_getter(shape), [], [], [])
+        getter, positions, values, codes = group
+        positions.append(position)
+        if getter is None:
+            values.append(shape)
+            continue
+        values.append(getter[1](shape))
+        material = shape.material
+        code = materials.get(material)
+        if code is None:
+            code = materials[material] = len(materials)
+        codes.append(code)
+
+    material_table = list(materials)
+    packed = []
+    for shape_type, (getter, positions, values, codes) in groups.items():
+        positions = np.array(positions, dtype=np.int32)
+        if getter is None:
+            packed.append((None, None, positions, values, None, None))
+            continue
+        names = getter[0]
+        values = np.array(values, dtype=np.float64).reshape(len(positions), len(names))
+        packed.append((shape_type, names, positions, values,
+                       np.array(codes, dtype=np.int32), material_table))
+    return packed
+
+
+def _evaluate_packed(packed: List[tuple]) -> tuple:
+    #Расчёт в рабочем процессе: фигуры восстанавливаются из массивов, результаты
+    #to_dict() раскладываются обратно в порядке фрагмента строками-кортежами.
+    #Ключи словарей передаются один раз на набор ключей (код 0 - словарь как есть)
+    size = sum(len(group[2]) for group in packed)
+    rows = [None] * size
+    key_codes = bytearray(size)
+    key_table = [None]
+    key_index = {}
+    for shape_type, names, positions, values, codes, materials in packed:
+        if shape_type is None:
+            shapes = values
+        else:
+            shapes = [shape_type(*row, material=materials[code])
+                      for row, code in zip(values.tolist(), codes.tolist())]
+        for position, shape in zip(positions.tolist(), shapes):
+            record = shape.to_dict()
+            keys = tuple(record)
+            code = key_index.get(keys)
+            if code is None and len(key_table) < 256:
+                code = key_index[keys] = len(key_table)
+                key_table.append(keys)
+            if code is None:
+                rows[position] = record
+            else:
+                rows[position] = tuple(record.values())
+                key_codes[position] = code
+    return key_table, bytes(key_codes), rows
+
+
+def _merge(result: tuple) -> List[Dict[str, Any]]:
+    #Сборка словарей фрагмента в главном процессе
+    key_table, key_codes, rows = result
+    return [dict(zip(key_table[code], row)) if code else row
+            for code, row in zip(key_codes, rows)]
+
+
+class ParallelEvaluator:
+    #Параллельный расчёт to_dict() для больших разнотипных коллекций Shape3D.
+    #Коллекция режется на непрерывные фрагменты, каждый упаковывается в компактные
+    #массивы параметров и считается в ProcessPoolExecutor; результаты возвращаются
+    #в исходном порядке. Параметры передаются как float64, поэтому целые размеры
+    #дают в результатах float (24.0 вместо 24)
+
+    def __init__(self, workers: Optional[int] = None, chunk_size: Optional[int] = None,
+                 target_task_seconds: float = 0.05, probe_size: int = 512):
+        # chunk_size=None - размер фрагмента подбирается по пробному расчёту так,
+        # чтобы одна задача занимала около target_task_seconds
+        workers = workers or os.cpu_count() or 1
+        if workers < 1 or (chunk_size is not None and chunk_size < 1) or probe_size < 1:
+            raise ValueError("Число процессов и размеры фрагментов должны быть положительными")
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.target_task_seconds = target_task_seconds
+        self.probe_size = probe_size
+        self.last_chunk_size = None
+
+    def evaluate(self, shapes: Sequence[Shape3D]) -> List[Dict[str, Any]]:
+        return list(self.iter_evaluate(shapes))
+
+    def iter_evaluate(self, shapes: Sequence[Shape3D]) -> Iterator[Dict[str, Any]]:
+        #Словари to_dict() в порядке shapes; в работе не больше 2 * workers фрагментов
+        total = len(shapes)
+        start = 0
+        chunk_size = self.chunk_size
+        if chunk_size is None:
+            # Пробный фрагмент считается в текущем процессе, его результаты не теряются
+            probe = shapes[:self.probe_size]
+            started = time.perf_counter()
+            yield from _merge(_evaluate_packed(_pack(probe)))
+            chunk_size = self._tune_chunk_size(total, len(probe), time.perf_counter() - started)
+            start = len(probe)
+        self.last_chunk_size = chunk_size
+
+        if self.workers == 1 or total - start <= chunk_size:
+            for offset in range(start, total, chunk_size):
+                chunk = shapes[offset:offset + chunk_size]
+                yield from _merge(_evaluate_packed(_pack(chunk)))
+            return
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            pending = deque()
+            for offset in range(start, total, chunk_size):
+                chunk = shapes[offset:offset + chunk_size]
+                pending.append(executor.submit(_evaluate_packed, _pack(chunk)))
+                if len(pending) >= 2 * self.workers:
+                    yield from _merge(pending.popleft().result())
+            while pending:
+                yield from _merge(pending.popleft().result())
+
+    def _tune_chunk_size(self, total: int, probed: int, elapsed: float) -> int:
+        #Фрагмент на target_task_seconds работы, но не меньше 64 фигур и не больше
+        #1/4 доли одного процесса, чтобы хватило задач на выравнивание нагрузки
+        if probed == 0:
+            return self.probe_size
+        per_shape = max(elapsed / probed, 1e-7)
+        chunk_size = int(self.target_task_seconds / per_shape)
+        balanced = -(-total // (self.workers * 4))
+        return max(64, min(chunk_size, balanced))
+
+    def __repr__(self) -> str:
+        return f"ParallelEvaluator(workers={self.workers}, chunk_size={self.chunk_size})"
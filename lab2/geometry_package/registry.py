@@ -0,0 +1,284 @@
+import ast
+import math
+from abc import ABCMeta
+from functools import lru_cache
+from operator import attrgetter
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .base import Shape3D
+from .instrumentation import timed
+from .units import EXACT_NAMESPACES, EXACT_NUMBERS
+
+# Имена, доступные в формулах. Одна и та же строка формулы компилируется
+# в скалярную функцию (math) и в векторную (NumPy)
+_SCALAR_NAMESPACE = {
+    'pi': math.pi, 'e': math.e, 'sqrt': math.sqrt, 'exp': math.exp, 'log': math.log,
+    'sin': math.sin, 'cos': math.cos, 'tan': math.tan,
+    'asin': math.asin, 'acos': math.acos, 'atan': math.atan, 'hypot': math.hypot, 'abs': abs,
+}
+_VECTOR_NAMESPACE = {
+    'pi': np.pi, 'e': np.e, 'sqrt': np.sqrt, 'exp': np.exp, 'log': np.log,
+    'sin': np.sin, 'cos': np.cos, 'tan': np.tan,
+    'asin': np.arcsin, 'acos': np.arccos, 'atan': np.arctan, 'hypot': np.hypot, 'abs': np.abs,
+}
+_ALLOWED_NODES = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Call, ast.Name, ast.Load,
+                  ast.Constant, ast.operator, ast.unaryop)
+
+
+def _check_formula(expression: str, names: Sequence[str],
+                   namespace: Dict[str, Any] = _SCALAR_NAMESPACE) -> ast.Expression:
+    #Формула - арифметическое выражение от параметров и функций из namespace
+    try:
+        tree = ast.parse(expression, mode='eval')
+    except SyntaxError as e:
+        raise ValueError(f"Некорректная формула '{expression}': {e.msg}")
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ValueError(f"Недопустимая конструкция в формуле '{expression}'")
+        if isinstance(node, ast.Name) and node.id not in names and node.id not in namespace:
+            raise ValueError(f"Неизвестное имя '{node.id}' в формуле '{expression}'")
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float)):
+            raise ValueError(f"Недопустимая константа в формуле '{expression}'")
+        if isinstance(node, ast.Call) and (node.keywords or not isinstance(node.func, ast.Name)):
+            raise ValueError(f"Недопустимый вызов в формуле '{expression}'")
+    return tree
+
+
+class _ExactTransformer(ast.NodeTransformer):
+    #Числа формулы - в Decimal/Fraction по десятичной записи (иначе 4/3 посчитается
+    #во float), константы pi и e - в вызовы функций с точностью текущего контекста
+
+    def __init__(self, names: Sequence[str]):
+        self._names = names
+
+    def visit_Constant(self, node: ast.Constant) -> ast.AST:
+        return ast.Call(ast.Name('_number', ast.Load()), [ast.Constant(repr(node.value))], [])
+
+    def visit_Name(self, node: ast.Name) -> ast.AST:
+        if node.id in ('pi', 'e') and node.id not in self._names:
+            return ast.Call(ast.Name(node.id, ast.Load()), [], [])
+        return node
+
+
+@lru_cache(maxsize=None)
+def compile_formula(expression: str, names: Tuple[str, ...], vectorized: bool = False,
+                    arithmetic: str = 'float') -> Callable:
+    #Функция names -> значение формулы; результат кэшируется по (формула, параметры, режим).
+    #arithmetic='decimal'/'fraction' - расчёт в Decimal или Fraction (параметры
+    #должны быть того же типа, см. units.exact_value)
+    if arithmetic != 'float':
+        if vectorized or arithmetic not in EXACT_NAMESPACES:
+            raise ValueError(f"Режим арифметики {arithmetic!r} не поддерживается")
+        try:
+            tree = _check_formula(expression, names, EXACT_NAMESPACES[arithmetic])
+        except ValueError as e:
+            raise ValueError(f"Формула не вычисляется в режиме {arithmetic}: {e}") from None
+        body = ast.unparse(_ExactTransformer(names).visit(tree))
+        namespace = dict(EXACT_NAMESPACES[arithmetic], _number=EXACT_NUMBERS[arithmetic], __builtins__={})
+    else:
+        _check_formula(expression, names)
+        body = expression
+        namespace = dict(_VECTOR_NAMESPACE if vectorized else _SCALAR_NAMESPACE, __builtins__={})
+    code = compile(f"lambda {', '.join(names)}: ({body})", f"<формула {expression}>", 'eval')
+    return eval(code, namespace)
+
+
+def _compile_method(name: str, body: str, names: Sequence[str], source_name: str) -> Callable:
+    #Метод фигуры с формулой, подставленной прямо в тело (без лишнего вызова функции)
+    lines = [f"def {name}(self):"]
+    lines += [f"    {parameter} = self._{parameter}" for parameter in names]
+    lines.append(f"    return {body}")
+    namespace = dict(_SCALAR_NAMESPACE)
+    exec(compile('\n'.join(lines), f"<{source_name}.{name}>", 'exec'), namespace)
+    return namespace[name]
+
+
+class ShapeSpec:
+    #Описание зарегистрированной фигуры: параметры (имя, подпись, единица) и формулы.
+    #Фигуры без формул могут задаваться текстовыми полями inputs (например, путём
+    #к файлу) - тогда экземпляр строит factory(**значения, material=...)
+
+    __slots__ = ('shape_class', 'title', 'dimensions', 'volume_formula',
+                 'surface_area_formula', 'bounding_box_formula', 'inputs', 'factory')
+
+    def __init__(self, shape_class: type, title: str, dimensions: Sequence[tuple] = (),
+                 volume_formula: Optional[str] = None, surface_area_formula: Optional[str] = None,
+                 bounding_box_formula: Optional[Sequence[str]] = None,
+                 inputs: Sequence[tuple] = (), factory: Optional[Callable] = None):
+        self.shape_class = shape_class
+        self.title = title
+        self.dimensions = tuple((entry + ('м',))[:3] for entry in map(tuple, dimensions))
+        self.volume_formula = volume_formula
+        self.surface_area_formula = surface_area_formula
+        self.bounding_box_formula = tuple(bounding_box_formula) if bounding_box_formula else None
+        self.inputs = tuple(map(tuple, inputs))
+        self.factory = factory
+
+    @property
+    def name(self) -> str:
+        return self.shape_class.__name__
+
+    @property
+    def names(self) -> Tuple[str, ...]:
+        return tuple(dimension[0] for dimension in self.dimensions)
+
+    @property
+    def parametric(self) -> bool:
+        #Фигура полностью задаётся числовыми параметрами (можно ввести в меню или CSV)
+        return self.volume_formula is not None and self.surface_area_formula is not None
+
+    @property
+    def interactive(self) -> bool:
+        #Фигуру можно задать в меню или во входном файле пакетного режима
+        return self.parametric or bool(self.inputs)
+
+    def create(self, values: Dict[str, Any], material=None) -> Shape3D:
+        #Экземпляр по значениям параметров (parametric) или полей inputs
+        return (self.factory or self.shape_class)(**values, material=material)
+
+    def volume(self, vectorized: bool = False, arithmetic: str = 'float') -> Callable:
+        return compile_formula(self.volume_formula, self.names, vectorized, arithmetic)
+
+    def surface_area(self, vectorized: bool = False, arithmetic: str = 'float') -> Callable:
+        return compile_formula(self.surface_area_formula, self.names, vectorized, arithmetic)
+
+    def describe(self, shape: Shape3D) -> List[Tuple[str, Any, str]]:
+        #Строки (подпись, значение, единица) для отчётов
+        return [(label, getattr(shape, name), unit) for name, label, unit in self.dimensions]
+
+    def __repr__(self) -> str:
+        return f"ShapeSpec({self.name}, {self.title!r})"
+
+
+_REGISTRY = {}
+
+
+def register_shape(shape_class: type = None, *, title: Optional[str] = None,
+                   dimensions: Sequence[tuple] = (), inputs: Sequence[tuple] = (),
+                   factory: Optional[str] = None):
+    #Регистрация фигуры без формул (например, сетки) - можно как декоратор класса.
+    #factory - имя classmethod, который строит фигуру по полям inputs.
+    #Фигуры на FormulaShape регистрируются сами при объявлении класса
+    def register(cls):
+        spec = ShapeSpec(cls, title or cls.__name__, dimensions, inputs=inputs,
+                         factory=getattr(cls, factory) if factory else None)
+        cls.spec = spec
+        _REGISTRY[cls.__name__] = spec
+        return cls
+    return register(shape_class) if shape_class is not None else register
+
+
+def _register_spec(spec: ShapeSpec):
+    _REGISTRY[spec.name] = spec
+
+
+def get_shape_spec(shape: Union[str, type, Shape3D]) -> ShapeSpec:
+    #Описание по имени класса, русскому названию, классу или экземпляру фигуры
+    if isinstance(shape, str):
+        spec = _REGISTRY.get(shape)
+        if spec is None:
+            lowered = shape.strip().lower()
+            spec = next((s for s in _REGISTRY.values()
+                         if s.title.lower() == lowered or s.name.lower() == lowered), None)
+        if spec is None:
+            raise KeyError(f"Неизвестная фигура: {shape!r}")
+        return spec
+    shape_class = shape if isinstance(shape, type) else type(shape)
+    spec = _REGISTRY.get(shape_class.__name__)
+    if spec is None or spec.shape_class is not shape_class:
+        raise KeyError(f"Фигура {shape_class.__name__} не зарегистрирована")
+    return spec
+
+
+def shape_specs(parametric: Optional[bool] = None, interactive: Optional[bool] = None) -> List[ShapeSpec]:
+    #Зарегистрированные фигуры в порядке регистрации
+    return [spec for spec in _REGISTRY.values()
+            if (parametric is None or spec.parametric == parametric)
+            and (interactive is None or spec.interactive == interactive)]
+
+
+class _FormulaShapeMeta(ABCMeta):
+    #Строит класс фигуры по объявлению dimensions/volume_formula/surface_area_formula:
+    #__slots__, __init__, свойства параметров, parameters, формулы, __eq__ и регистрацию
+
+    def __new__(mcls, name, bases, namespace, **kwargs):
+        dimensions = namespace.get('dimensions')
+        if dimensions is None:
+            return super().__new__(mcls, name, bases, namespace, **kwargs)
+
+        spec_args = dict(
+            title=namespace.get('title', name),
+            dimensions=dimensions,
+            volume_formula=namespace.get('volume_formula'),
+            surface_area_formula=namespace.get('surface_area_formula'),
+            bounding_box_formula=namespace.get('bounding_box_formula'),
+        )
+        names = tuple(entry[0] for entry in dimensions)
+        if not names or any(not n.isidentifier() for n in names):
+            raise ValueError(f"Некорректные параметры фигуры {name}")
+        for formula in (spec_args['volume_formula'], spec_args['surface_area_formula'],
+                        *(spec_args['bounding_box_formula'] or ())):
+            if formula is not None:
+                _check_formula(formula, names)
+
+        namespace.setdefault('__slots__', tuple(f'_{n}' for n in names))
+        if '__init__' not in namespace:
+            namespace['__init__'] = mcls._make_init(name, names)
+        for n in names:
+            if n not in namespace:
+                namespace[n] = property(attrgetter(f'_{n}'), doc=f"Параметр {n}")
+        namespace.setdefault('parameters', property(
+            _compile_method('parameters', '{' + ', '.join(f"'{n}': {n}" for n in names) + '}',
+                            names, name)))
+        if spec_args['volume_formula'] is not None:
+            namespace.setdefault('_calculate_volume', timed(f'{name}._calculate_volume')(_compile_method(
+                '_calculate_volume', spec_args['volume_formula'], names, name)))
+        if spec_args['surface_area_formula'] is not None:
+            namespace.setdefault('_calculate_surface_area', timed(f'{name}._calculate_surface_area')(
+                _compile_method('_calculate_surface_area', spec_args['surface_area_formula'], names, name)))
+        if spec_args['bounding_box_formula'] is not None:
+            namespace.setdefault('bounding_box', _compile_method(
+                'bounding_box', '(' + ', '.join(spec_args['bounding_box_formula']) + ',)', names, name))
+        if '__eq__' not in namespace:
+            namespace['__eq__'] = mcls._make_eq(names)
+
+        cls = super().__new__(mcls, name, bases, namespace, **kwargs)
+        cls.spec = ShapeSpec(cls, **spec_args)
+        _register_spec(cls.spec)
+        return cls
+
+    @staticmethod
+    def _make_init(name: str, names: Tuple[str, ...]) -> Callable:
+        lines = [f"def __init__(self, {', '.join(names)}, material=None):",
+                 "    _Shape3D.__init__(self, material)"]
+        lines += [f"    self._{n} = {n}" for n in names]
+        namespace = {'_Shape3D': Shape3D}
+        exec(compile('\n'.join(lines), f"<{name}.__init__>", 'exec'), namespace)
+        return namespace['__init__']
+
+    @staticmethod
+    def _make_eq(names: Tuple[str, ...]) -> Callable:
+        attributes = tuple(f'_{n}' for n in names)
+
+        def __eq__(self, other):
+            if not isinstance(other, type(self)) and not isinstance(self, type(other)):
+                return False
+            return all(getattr(self, a) == getattr(other, a) for a in attributes)
+        return __eq__
+
+
+class FormulaShape(Shape3D, metaclass=_FormulaShapeMeta):
+    #База для фигур, которые объявляют параметры и формулы один раз:
+    #
+    #    class Cylinder(FormulaShape):
+    #        title = "Цилиндр"
+    #        dimensions = (('radius', 'Радиус'), ('height', 'Высота'))
+    #        volume_formula = "pi * radius ** 2 * height"
+    #        surface_area_formula = "2 * pi * radius * (radius + height)"
+    #        bounding_box_formula = ("2 * radius", "2 * radius", "height")
+    #
+    #Из объявления строятся конструктор Cylinder(radius, height, material=None),
+    #свойства, скалярные и векторные (ShapeBatch) формулы и запись в реестре
+    __slots__ = ()
@@ -1,41 +1,16 @@
-import math
-from .base import Shape3D
+from .registry import FormulaShape
 
-class Parallelepiped(Shape3D):
+# Фигура объявляет параметры и формулы один раз: конструктор, свойства, расчёт,
+# пакетные (NumPy) формулы и пункты меню строятся по объявлению (см. registry.py)
+
+class Parallelepiped(FormulaShape):
     #Класс параллелепипеда
     
-    def __init__(self, length: float, width: float, height: float, material=None):
-        super().__init__(material)
-        self._length = length
-        self._width = width
-        self._height = height
-    
-    @property
-    def length(self) -> float:
-        return self._length
-    
-    @property
-    def width(self) -> float:
-        return self._width
-    
-    @property
-    def height(self) -> float:
-        return self._height
-    
-    def _calculate_volume(self) -> float:
-        return self._length * self._width * self._height
-    
-    def _calculate_surface_area(self) -> float:
-        return 2 * (self._length * self._width + 
-                   self._length * self._height + 
-                   self._width * self._height)
-    
-    def __eq__(self, other):
-        if not isinstance(other, Parallelepiped):
-            return False
-        return (self._length == other._length and 
-                self._width == other._width and 
-                self._height == other._height)
+    title = "Параллелепипед"
+    dimensions = (('length', 'Длина'), ('width', 'Ширина'), ('height', 'Высота'))
+    volume_formula = "length * width * height"
+    surface_area_formula = "2 * (length * width + length * height + width * height)"
+    bounding_box_formula = ("length", "width", "height")
     
     def __add__(self, other):
         #Сложение объёмов двух параллелепипедов
@@ -43,27 +18,15 @@ class Parallelepiped(Shape3D):
             raise TypeError("Можно сложить только два параллелепипеда")
         return self.volume + other.volume
 
-class Tetrahedron(Shape3D):
+class Tetrahedron(FormulaShape):
     #Класс правильного тетраэдра
     
-    def __init__(self, edge: float, material=None):
-        super().__init__(material)
-        self._edge = edge
-    
-    @property
-    def edge(self) -> float:
-        return self._edge
-    
-    def _calculate_volume(self) -> float:
-        return (self._edge ** 3) * math.sqrt(2) / 12
-    
-    def _calculate_surface_area(self) -> float:
-        return math.sqrt(3) * (self._edge ** 2)
-    
-    def __eq__(self, other):
-        if not isinstance(other, Tetrahedron):
-            return False
-        return self._edge == other._edge
+    title = "Тетраэдр"
+    dimensions = (('edge', 'Длина ребра'),)
+    volume_formula = "(edge ** 3) * sqrt(2) / 12"
+    surface_area_formula = "sqrt(3) * (edge ** 2)"
+    # Тетраэдр, стоящий на грани: сторона основания, высота основания, высота
+    bounding_box_formula = ("edge", "edge * sqrt(3) / 2", "edge * sqrt(2 / 3)")
     
     def __lt__(self, other):
         #Сравнение по объёму
@@ -71,30 +34,65 @@ class Tetrahedron(Shape3D):
             raise TypeError("Можно сложить только два тетраэдра")
         return self.volume < other.volume
 
-class Sphere(Shape3D):
+class Sphere(FormulaShape):
     #Класс сферы
     
-    def __init__(self, radius: float, material=None):
-        super().__init__(material)
-        self._radius = radius
-    
-    @property
-    def radius(self) -> float:
-        return self._radius
-    
-    def _calculate_volume(self) -> float:
-        return (4/3) * math.pi * (self._radius ** 3)
-    
-    def _calculate_surface_area(self) -> float:
-        return 4 * math.pi * (self._radius ** 2)
-    
-    def __eq__(self, other):
-        if not isinstance(other, Sphere):
-            return False
-        return self._radius == other._radius
+    title = "Шар"
+    dimensions = (('radius', 'Радиус'),)
+    volume_formula = "(4/3) * pi * (radius ** 3)"
+    surface_area_formula = "4 * pi * (radius ** 2)"
+    bounding_box_formula = ("2 * radius", "2 * radius", "2 * radius")
     
     def __mul__(self, factor):
         #Умножение радиуса на коэффициент
         if not isinstance(factor, (int, float)):
             raise TypeError("Коэф. должен быть числом.")
-        return Sphere(self._radius * factor, self.material)
\ No newline at end of file
+        return Sphere(self._radius * factor, self.material)
+
+class Cylinder(FormulaShape):
+    #Класс прямого кругового цилиндра
+    
+    title = "Цилиндр"
+    dimensions = (('radius', 'Радиус'), ('height', 'Высота'))
+    volume_formula = "pi * radius ** 2 * height"
+    surface_area_formula = "2 * pi * radius * (radius + height)"
+    bounding_box_formula = ("2 * radius", "2 * radius", "height")
+
+class Cone(FormulaShape):
+    #Класс прямого кругового конуса
+    
+    title = "Конус"
+    dimensions = (('radius', 'Радиус основания'), ('height', 'Высота'))
+    volume_formula = "pi * radius ** 2 * height / 3"
+    surface_area_formula = "pi * radius * (radius + sqrt(radius ** 2 + height ** 2))"
+    bounding_box_formula = ("2 * radius", "2 * radius", "height")
+
+class Torus(FormulaShape):
+    #Класс тора: major_radius - от центра до оси трубки, minor_radius - радиус трубки
+    
+    title = "Тор"
+    dimensions = (('major_radius', 'Радиус тора'), ('minor_radius', 'Радиус трубки'))
+    volume_formula = "2 * pi ** 2 * major_radius * minor_radius ** 2"
+    surface_area_formula = "4 * pi ** 2 * major_radius * minor_radius"
+    bounding_box_formula = ("2 * (major_radius + minor_radius)", "2 * (major_radius + minor_radius)",
+                            "2 * minor_radius")
+
+class Ellipsoid(FormulaShape):
+    #Класс эллипсоида с полуосями a, b, c. Площадь поверхности - приближение
+    #Кнуда Томсена (p = 1.6075, погрешность до ~1%)
+    
+    title = "Эллипсоид"
+    dimensions = (('a', 'Полуось a'), ('b', 'Полуось b'), ('c', 'Полуось c'))
+    volume_formula = "(4/3) * pi * a * b * c"
+    surface_area_formula = ("4 * pi * (((a * b) ** 1.6075 + (a * c) ** 1.6075 + (b * c) ** 1.6075) / 3)"
+                            " ** (1 / 1.6075)")
+    bounding_box_formula = ("2 * a", "2 * b", "2 * c")
+
+class Prism(FormulaShape):
+    #Класс правильной n-угольной призмы: sides - число сторон основания, side - длина стороны
+    
+    title = "Призма"
+    dimensions = (('sides', 'Число сторон', ''), ('side', 'Длина стороны'), ('height', 'Высота'))
+    volume_formula = "sides * side ** 2 / (4 * tan(pi / sides)) * height"
+    surface_area_formula = "sides * side ** 2 / (2 * tan(pi / sides)) + sides * side * height"
+    bounding_box_formula = ("side / sin(pi / sides)", "side / sin(pi / sides)", "height")
@@ -0,0 +1,217 @@
+from decimal import Decimal, localcontext, getcontext
+from fractions import Fraction
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple, Union
+
+# Множители перевода в СИ (м, кг/м³, кг). Хранятся дробями: перевод в float
+# делается одним делением или умножением на целое, без ошибки множителя 0.001
+LENGTH_UNITS = {'mm': Fraction(1, 1000), 'cm': Fraction(1, 100), 'm': Fraction(1)}
+DENSITY_UNITS = {'kg/m3': Fraction(1), 'g/cm3': Fraction(1000)}
+MASS_UNITS = {'kg': Fraction(1), 'g': Fraction(1, 1000)}
+
+_ALIASES = {
+    'мм': 'mm', 'см': 'cm', 'м': 'm',
+    'кг/м³': 'kg/m3', 'кг/м3': 'kg/m3', 'kg/m³': 'kg/m3',
+    'г/см³': 'g/cm3', 'г/см3': 'g/cm3', 'g/cm³': 'g/cm3',
+    'кг': 'kg', 'г': 'g',
+}
+
+# Режимы арифметики: float - обычный расчёт, decimal - десятичный с точностью
+# текущего контекста decimal, fraction - точные рациональные дроби
+ARITHMETICS = ('float', 'decimal', 'fraction')
+
+
+def _unit(table: Dict[str, Fraction], name: str, kind: str) -> Tuple[str, Fraction]:
+    name = _ALIASES.get(name, name)
+    if name not in table:
+        raise ValueError(f"Неизвестная единица {kind}: {name!r} (допустимо: {', '.join(table)})")
+    return name, table[name]
+
+
+def _scale(value, factor: Fraction):
+    #Умножение на множитель в арифметике самого значения: float, массив NumPy,
+    #Decimal или Fraction. Для float множитель 1/1000 - это деление на 1000
+    if value is None or factor == 1:
+        return value
+    if isinstance(value, Fraction):
+        return value * factor
+    if isinstance(value, Decimal):
+        return value * Decimal(factor.numerator) / Decimal(factor.denominator)
+    if factor.denominator == 1:
+        return value * factor.numerator
+    if factor.numerator == 1:
+        return value / factor.denominator
+    return value * factor.numerator / factor.denominator
+
+
+def exact_value(value, arithmetic: str):
+    #Параметр в точной арифметике. float берётся по десятичной записи
+    #(0.1 -> Decimal('0.1')), а не по двоичному значению
+    if arithmetic == 'decimal':
+        if isinstance(value, Decimal):
+            return value
+        if isinstance(value, Fraction):
+            return Decimal(value.numerator) / Decimal(value.denominator)
+        return Decimal(repr(value)) if isinstance(value, float) else Decimal(value)
+    if arithmetic == 'fraction':
+        if isinstance(value, Fraction):
+            return value
+        return Fraction(repr(value)) if isinstance(value, float) else Fraction(value)
+    raise ValueError(f"Неизвестный режим арифметики: {arithmetic!r} (допустимо: {', '.join(ARITHMETICS)})")
+
+
+class Units:
+    #Единицы входных размеров и результатов: длина (mm, cm, m), плотность
+    #(kg/m3, g/cm3) и масса (kg, g). Фигуры считаются в СИ; Units переводит
+    #размеры при создании фигуры или пакета и результаты в to_dict/to_dicts.
+    #Перевод работает и с массивами NumPy - одной операцией на столбец
+    __slots__ = ('_length', '_density', '_mass')
+
+    def __init__(self, length: str = 'm', density: str = 'kg/m3', mass: str = 'kg'):
+        self._length = _unit(LENGTH_UNITS, length, 'длины')
+        self._density = _unit(DENSITY_UNITS, density, 'плотности')
+        self._mass = _unit(MASS_UNITS, mass, 'массы')
+
+    @property
+    def length(self) -> str:
+        return self._length[0]
+
+    @property
+    def density(self) -> str:
+        return self._density[0]
+
+    @property
+    def mass(self) -> str:
+        return self._mass[0]
+
+    @property
+    def is_si(self) -> bool:
+        return self._length[1] == self._density[1] == self._mass[1] == 1
+
+    def length_to_si(self, value):
+        return _scale(value, self._length[1])
+
+    def density_to_si(self, value):
+        return _scale(value, self._density[1])
+
+    def from_si(self, volume, surface_area, mass=None) -> tuple:
+        #Объём, площадь и масса из СИ в эти единицы (mass=None остаётся None)
+        length = self._length[1]
+        return (_scale(volume, 1 / length ** 3), _scale(surface_area, 1 / length ** 2),
+                _scale(mass, 1 / self._mass[1]))
+
+    def dimensions_to_si(self, spec, values: Dict[str, Any]) -> Dict[str, Any]:
+        #Перевод в метры параметров фигуры с единицей длины (число сторон призмы и
+        #другие безразмерные параметры не меняются)
+        lengths = {name for name, _, unit in spec.dimensions if unit == 'м'}
+        return {name: self.length_to_si(value) if name in lengths else value
+                for name, value in values.items()}
+
+    def create(self, shape, material=None, **values):
+        #Фигура по размерам в этих единицах: units.create(Sphere, radius=5)
+        from .registry import get_shape_spec
+        spec = get_shape_spec(shape)
+        return spec.create(self.dimensions_to_si(spec, values), material)
+
+    def material(self, name: str, density: float):
+        #Материал с плотностью в этих единицах (общий экземпляр Material.intern)
+        from .materials import Material
+        return Material.intern(name, float(self.density_to_si(density)))
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Units):
+            return NotImplemented
+        return (self.length, self.density, self.mass) == (other.length, other.density, other.mass)
+
+    def __hash__(self) -> int:
+        return hash((self.length, self.density, self.mass))
+
+    def __repr__(self) -> str:
+        return f"Units(length={self.length!r}, density={self.density!r}, mass={self.mass!r})"
+
+
+SI = Units()
+
+
+def resolve_units(units: Union[None, str, Units]) -> Optional[Units]:
+    #None и СИ - без перевода; строка - единица длины ('mm')
+    if isinstance(units, str):
+        units = Units(units)
+    if units is not None and units.is_si:
+        return None
+    return units
+
+
+# Функции для формул в режиме decimal. pi, sin и cos - рецепты из документации
+# модуля decimal; точность - у текущего контекста decimal (по умолчанию 28 знаков)
+
+@lru_cache(maxsize=None)
+def _decimal_pi_at(precision: int) -> Decimal:
+    with localcontext() as ctx:
+        ctx.prec = precision + 2
+        three = Decimal(3)
+        lasts, t, s, n, na, d, da = 0, three, 3, 1, 0, 0, 24
+        while s != lasts:
+            lasts = s
+            n, na = n + na, na + 8
+            d, da = d + da, da + 32
+            t = (t * n) / d
+            s += t
+    return s
+
+
+def _decimal_pi() -> Decimal:
+    return +_decimal_pi_at(getcontext().prec)
+
+
+def _decimal_e() -> Decimal:
+    return Decimal(1).exp()
+
+
+def _decimal_series(x: Decimal, start: int) -> Decimal:
+    #Ряд Тейлора синуса (start=1) или косинуса (start=0)
+    x = Decimal(x)
+    with localcontext() as ctx:
+        ctx.prec += 2
+        i = start
+        fact = 1
+        num = x if start else Decimal(1)
+        s = num
+        lasts = 0
+        sign = 1
+        while s != lasts:
+            lasts = s
+            i += 2
+            fact *= i * (i - 1)
+            num *= x * x
+            sign = -sign
+            s += num / fact * sign
+    return +s
+
+
+def _decimal_sin(x) -> Decimal:
+    return _decimal_series(x, 1)
+
+
+def _decimal_cos(x) -> Decimal:
+    return _decimal_series(x, 0)
+
+
+def _decimal_tan(x) -> Decimal:
+    return _decimal_sin(x) / _decimal_cos(x)
+
+
+# Константы pi и e в точных формулах вызываются как функции (см. registry)
+DECIMAL_NAMESPACE = {
+    'pi': _decimal_pi, 'e': _decimal_e,
+    'sqrt': lambda x: Decimal(x).sqrt(), 'exp': lambda x: Decimal(x).exp(),
+    'log': lambda x: Decimal(x).ln(),
+    'sin': _decimal_sin, 'cos': _decimal_cos, 'tan': _decimal_tan,
+    'hypot': lambda x, y: (Decimal(x) * x + Decimal(y) * y).sqrt(), 'abs': abs,
+}
+
+# В дробях точны только рациональные формулы: pi, корни и тригонометрия недоступны
+FRACTION_NAMESPACE = {'abs': abs}
+
+EXACT_NUMBERS = {'decimal': Decimal, 'fraction': Fraction}
+EXACT_NAMESPACES = {'decimal': DECIMAL_NAMESPACE, 'fraction': FRACTION_NAMESPACE}
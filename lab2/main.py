@@ -1,26 +1,28 @@
-from geometry_package import Parallelepiped, Tetrahedron, Sphere, Steel, Aluminum, Copper
+from geometry_package import ShapeCache, get_shape_cache, get_shape_spec, set_shape_cache, shape_specs
 from database import GeometryDatabase
+from batch_calculator import calculate_properties
+from exporters import EXPORTERS, export_calculations
 import os
 import json
+import sys
 
 class ConsoleGeometryCalculator:
     def __init__(self):
+        # Меню фигур строится по реестру: новая фигура появляется здесь без правок
         self.shapes = {
-            "1": {"name": "Параллелепипед", "class": Parallelepiped},
-            "2": {"name": "Тетраэдр", "class": Tetrahedron},
-            "3": {"name": "Шар", "class": Sphere}
-        }
-        
-        self.materials = {
-            "1": {"name": "Сталь", "obj": Steel()},
-            "2": {"name": "Алюминий", "obj": Aluminum()},
-            "3": {"name": "Медь", "obj": Copper()}
+            str(number): {"name": spec.title, "class": spec.shape_class, "spec": spec}
+            for number, spec in enumerate(shape_specs(interactive=True), start=1)
         }
         
         self.current_shape = None
         self.current_results = None
         self.current_parameters = None
+        self.history_page_size = 20
         self.db = GeometryDatabase()
+        # Детали в калькуляторе повторяются, поэтому общий кэш включён и
+        # сохраняется в базе между запусками
+        set_shape_cache(ShapeCache())
+        self.db.load_shape_cache(get_shape_cache())
         
     def clear_screen(self):
         """Очистка экрана консоли"""
@@ -72,26 +74,17 @@ class ConsoleGeometryCalculator:
         print(f"\nВыбрано: {shape_info['name']}")
         
         # Получение параметров фигуры
+        spec = shape_info['spec']
         parameters = {}
-        if shape_info['name'] == "Параллелепипед":
-            print("\nВведите размеры параллелепипеда:")
-            length = self.get_float_input("Длина (м): ")
-            width = self.get_float_input("Ширина (м): ")
-            height = self.get_float_input("Высота (м): ")
-            shape = shape_info['class'](length, width, height)
-            parameters = {'length': length, 'width': width, 'height': height}
-            
-        elif shape_info['name'] == "Тетраэдр":
-            print("\nВведите размеры тетраэдра:")
-            edge = self.get_float_input("Длина ребра (м): ")
-            shape = shape_info['class'](edge)
-            parameters = {'edge': edge}
-            
-        elif shape_info['name'] == "Шар":
-            print("\nВведите размеры шара:")
-            radius = self.get_float_input("Радиус (м): ")
-            shape = shape_info['class'](radius)
-            parameters = {'radius': radius}
+        if spec.parametric:
+            print("\nВведите размеры фигуры:")
+            for name, label, unit in spec.dimensions:
+                prompt = f"{label} ({unit}): " if unit else f"{label}: "
+                parameters[name] = self.get_float_input(prompt)
+        else:
+            for name, label in spec.inputs:
+                parameters[name] = input(f"{label}: ").strip()
+        shape = spec.create(parameters)
         
         return shape, parameters
     
@@ -102,16 +95,20 @@ class ConsoleGeometryCalculator:
         print("ВЫБОР МАТЕРИАЛА")
         print("-" * 30)
         
-        choice = self.get_user_choice(self.materials, "Доступные материалы:")
-        material_info = self.materials[choice]
+        # Меню материалов строится по каталогу из таблицы materials
+        materials = {
+            str(number): {"name": material.name, "obj": material}
+            for number, material in enumerate(self.db.materials, start=1)
+        }
+        choice = self.get_user_choice(materials, "Доступные материалы:")
+        material_info = materials[choice]
         
         print(f"\nВыбрано: {material_info['name']}")
         return material_info['obj']
     
     def calculate_properties(self, shape, material):
         """Расчёт свойств фигуры"""
-        shape.material = material
-        return shape.to_dict()
+        return calculate_properties(shape, material)
     
     def display_results(self, results, shape):
         """Отображение результатов"""
@@ -131,17 +128,20 @@ class ConsoleGeometryCalculator:
         print("Дополнительная информация:")
         print(f"  - Плотность {results['material']}: {shape.material.density} кг/м³")
         
-        if results['type'] == 'Parallelepiped':
-            print(f"  - Размеры: {shape.length} × {shape.width} × {shape.height} м")
-        elif results['type'] == 'Tetrahedron':
-            print(f"  - Длина ребра: {shape.edge} м")
-        elif results['type'] == 'Sphere':
-            print(f"  - Радиус: {shape.radius} м")
+        for label, value, unit in self.describe_shape(shape):
+            print(f"  - {label}: {value} {unit}".rstrip())
     
-    def save_to_database(self, results, parameters):
+    def describe_shape(self, shape):
+        """Размеры фигуры для отчётов: (подпись, значение, единица)"""
+        try:
+            return get_shape_spec(shape).describe(shape)
+        except KeyError:
+            return []
+    
+    def save_to_database(self, results, parameters, material=None):
         """Сохранение расчета в базу данных"""
         try:
-            self.db.save_calculation(results, parameters)
+            self.db.save_calculation(results, parameters, material)
             print("Расчет сохранен в базу данных")
         except Exception as e:
             print(f"Ошибка при сохранении в базу данных: {str(e)}")
@@ -153,23 +153,33 @@ class ConsoleGeometryCalculator:
         print("ИСТОРИЯ РАСЧЕТОВ")
         print("-" * 30)
         
-        calculations = self.db.get_all_calculations()
-        
-        if not calculations:
-            print("История расчетов пуста.")
-            input("\nНажмите Enter для продолжения...")
-            return
-        
-        for calc in calculations:
-            print(f"\nID: {calc['id']}")
-            print(f"  Фигура: {calc['shape_type']}")
-            print(f"  Материал: {calc['material']}")
-            print(f"  Объём: {calc['volume']:.4f} м³")
-            print(f"  Масса: {calc['mass']:.2f} кг")
-            print(f"  Дата: {calc['created_at']}")
-            print("-" * 30)
+        shown = 0
+        after = None
+        while True:
+            calculations, after = self.db.get_calculations_page(self.history_page_size, after)
+            
+            if not calculations and shown == 0:
+                print("История расчетов пуста.")
+                input("\nНажмите Enter для продолжения...")
+                return
+            
+            for calc in calculations:
+                print(f"\nID: {calc['id']}")
+                print(f"  Фигура: {calc['shape_type']}")
+                print(f"  Материал: {calc['material']}")
+                print(f"  Объём: {calc['volume']:.4f} м³")
+                print(f"  Масса: {calc['mass']:.2f} кг")
+                print(f"  Дата: {calc['created_at']}")
+                print("-" * 30)
+            shown += len(calculations)
+            
+            if after is None:
+                break
+            choice = input(f"\nПоказано расчетов: {shown}. Enter - следующая страница, q - выход: ")
+            if choice.lower() in ['q', 'й']:
+                return
         
-        print(f"\nВсего расчетов: {len(calculations)}")
+        print(f"\nВсего расчетов: {shown}")
         input("\nНажмите Enter для продолжения...")
     
     def show_statistics(self):
@@ -186,6 +196,14 @@ class ConsoleGeometryCalculator:
         print(f"Уникальных материалов: {stats['unique_materials']}")
         print(f"Последний расчет: {stats['last_calculation'] or 'Нет данных'}")
         
+        material_stats = self.db.get_material_statistics()
+        if material_stats:
+            print("\nПо материалам:")
+            for item in material_stats:
+                print(f"  {item['material']}: {item['count']} расч., "
+                      f"масса ср. {item['mass_mean']:.2f} / мин. {item['mass_min']:.2f} / "
+                      f"макс. {item['mass_max']:.2f} кг")
+        
         input("\nНажмите Enter для продолжения...")
     
     def save_report(self, results, shape):
@@ -195,9 +213,10 @@ class ConsoleGeometryCalculator:
         print("1. Сохранить как TEXT файл")
         print("2. Сохранить как CSV файл")
         print("3. Сохранить в базу данных")
-        print("4. Не сохранять")
+        print("4. Выгрузить всю историю расчетов")
+        print("5. Не сохранять")
         
-        choice = input("\nВведите ваш выбор (1-4): ")
+        choice = input("\nВведите ваш выбор (1-5): ")
         
         if choice == "1":
             filename = "geometry_report.txt"
@@ -210,13 +229,30 @@ class ConsoleGeometryCalculator:
             print(f"Отчёт сохранён как {filename}")
             
         elif choice == "3":
-            self.save_to_database(results, self.current_parameters)
+            self.save_to_database(results, self.current_parameters, shape.material)
             
         elif choice == "4":
+            self.export_history()
+            
+        elif choice == "5":
             print("Отчёт не сохранён")
         else:
             print("Неверный выбор!")
     
+    def export_history(self):
+        """Выгрузка истории расчетов в файл выбранного формата"""
+        formats = sorted(EXPORTERS)
+        fmt = input(f"Формат ({', '.join(formats)}) [csv]: ").strip().lower() or 'csv'
+        if fmt not in EXPORTERS:
+            print("Неизвестный формат!")
+            return
+        filename = "geometry_history" + EXPORTERS[fmt].extension
+        try:
+            count = export_calculations(self.db, filename, fmt)
+            print(f"Выгружено расчетов: {count}, файл {filename}")
+        except (ImportError, OSError) as e:
+            print(f"Ошибка при выгрузке: {str(e)}")
+    
     def save_as_text(self, results, shape, filename):
         """Сохранение в текстовом формате"""
         with open(filename, 'w', encoding='utf-8') as f:
@@ -230,12 +266,8 @@ class ConsoleGeometryCalculator:
             f.write(f"Плотность материала: {shape.material.density} кг/м³\n")
             
             # Добавляем информацию о размерах
-            if results['type'] == 'Parallelepiped':
-                f.write(f"Размеры:        {shape.length} × {shape.width} × {shape.height} м\n")
-            elif results['type'] == 'Tetrahedron':
-                f.write(f"Длина ребра:    {shape.edge} м\n")
-            elif results['type'] == 'Sphere':
-                f.write(f"Радиус:         {shape.radius} м\n")
+            for label, value, unit in self.describe_shape(shape):
+                f.write(f"{label + ':':<15} {value} {unit}".rstrip() + "\n")
     
     def save_as_csv(self, results, shape, filename):
         """Сохранение в CSV формате"""
@@ -249,14 +281,8 @@ class ConsoleGeometryCalculator:
             f.write(f"Плотность материала,{shape.material.density},кг/м³\n")
             
             # Добавляем информацию о размерах
-            if results['type'] == 'Parallelepiped':
-                f.write(f"Длина,{shape.length},м\n")
-                f.write(f"Ширина,{shape.width},м\n")
-                f.write(f"Высота,{shape.height},м\n")
-            elif results['type'] == 'Tetrahedron':
-                f.write(f"Длина ребра,{shape.edge},м\n")
-            elif results['type'] == 'Sphere':
-                f.write(f"Радиус,{shape.radius},м\n")
+            for label, value, unit in self.describe_shape(shape):
+                f.write(f"{label},{value},{unit}\n")
     
     def show_main_menu(self):
         """Главное меню"""
@@ -296,6 +322,8 @@ class ConsoleGeometryCalculator:
                     input("\nНажмите Enter для продолжения...")
             elif choice == "6":
                 print("\nСпасибо за использование калькулятора геометрических фигур!")
+                self.db.save_shape_cache(get_shape_cache())
+                self.db.close()
                 break
             else:
                 print("Неверный выбор! Пожалуйста, попробуйте снова.")
@@ -333,5 +361,10 @@ class ConsoleGeometryCalculator:
             input("\nНажмите Enter для продолжения...")
 
 if __name__ == "__main__":
+    # С аргументами командной строки - пакетный режим без диалога:
+    # python main.py shapes.csv -o results.jsonl --db -j 4
+    if len(sys.argv) > 1:
+        from batch_calculator import main
+        sys.exit(main(sys.argv[1:]))
     calculator = ConsoleGeometryCalculator()
     calculator.show_main_menu()
\ No newline at end of file
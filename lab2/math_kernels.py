@@ -0,0 +1,266 @@
+"""Арифметика больших целых чисел: умножение Тоома-Кука, возведение в степень по
+модулю и точные целые корни методом Ньютона.
+
+Встроенный int уже умножает длинные числа алгоритмом Карацубы на C, поэтому
+чисто питоновские алгоритмы выигрывают только там, где асимптотика лучше:
+Toom-3 (O(n^1.465)) поверх встроенного умножения обгоняет int.__mul__ начиная
+с сотен тысяч бит. Ниже порогов все функции сразу вызывают встроенные операции.
+Замер: python -m benchmarks.kernels
+"""
+from decimal import ROUND_DOWN, Decimal, localcontext
+from fractions import Fraction
+from math import isqrt
+from typing import Optional, Union
+
+# Пороги в битах меньшего множителя (подобраны benchmarks.kernels на CPython 3.11):
+# выше TOOM3_THRESHOLD fast_multiply переходит на Toom-3, рекурсия которого
+# опускается до встроенного умножения на TOOM3_CUTOFF
+TOOM3_THRESHOLD = 200_000
+TOOM3_CUTOFF = 20_000
+KARATSUBA_CUTOFF = 2_000
+
+
+def _karatsuba(a: int, b: int, cutoff: int) -> int:
+    if a.bit_length() <= cutoff or b.bit_length() <= cutoff:
+        return a * b
+    k = max(a.bit_length(), b.bit_length()) >> 1
+    mask = (1 << k) - 1
+    a1, a0 = a >> k, a & mask
+    b1, b0 = b >> k, b & mask
+    z2 = _karatsuba(a1, b1, cutoff)
+    z0 = _karatsuba(a0, b0, cutoff)
+    z1 = _karatsuba(a0 + a1, b0 + b1, cutoff) - z2 - z0
+    return (z2 << (2 * k)) + (z1 << k) + z0
+
+
+def karatsuba_multiply(a: int, b: int, cutoff: int = KARATSUBA_CUTOFF) -> int:
+    """Умножение Карацубы (три умножения половин вместо четырёх).
+
+    Эталонная реализация: встроенный int сам использует Карацубу, поэтому на
+    практике эта функция медленнее a * b при любых размерах."""
+    result = _karatsuba(abs(a), abs(b), cutoff)
+    return -result if (a < 0) != (b < 0) else result
+
+
+def _toom3(a: int, b: int, cutoff: int) -> int:
+    # Toom-3 для неотрицательных или отрицательных a, b: значения в точках
+    # 0, 1, -1, -2, бесконечность и интерполяция по схеме Бодрато
+    sign = 1
+    if a < 0:
+        a, sign = -a, -sign
+    if b < 0:
+        b, sign = -b, -sign
+    if a.bit_length() <= cutoff or b.bit_length() <= cutoff:
+        result = a * b
+        return result if sign > 0 else -result
+    k = (max(a.bit_length(), b.bit_length()) + 2) // 3
+    mask = (1 << k) - 1
+    a0, a1, a2 = a & mask, (a >> k) & mask, a >> (2 * k)
+    b0, b1, b2 = b & mask, (b >> k) & mask, b >> (2 * k)
+
+    t = a0 + a2
+    p1, pm1 = t + a1, t - a1
+    pm2 = ((pm1 + a2) << 1) - a0
+    t = b0 + b2
+    q1, qm1 = t + b1, t - b1
+    qm2 = ((qm1 + b2) << 1) - b0
+
+    r0 = _toom3(a0, b0, cutoff)
+    r1 = _toom3(p1, q1, cutoff)
+    rm1 = _toom3(pm1, qm1, cutoff)
+    rm2 = _toom3(pm2, qm2, cutoff)
+    rinf = _toom3(a2, b2, cutoff)
+
+    # Все деления точные
+    r3 = (rm2 - r1) // 3
+    r1 = (r1 - rm1) >> 1
+    r2 = rm1 - r0
+    r3 = ((r2 - r3) >> 1) + (rinf << 1)
+    r2 = r2 + r1 - rinf
+    r1 = r1 - r3
+    result = r0 + (r1 << k) + (r2 << (2 * k)) + (r3 << (3 * k)) + (rinf << (4 * k))
+    return result if sign > 0 else -result
+
+
+def _toom3_square(a: int, cutoff: int) -> int:
+    # Toom-3 для квадрата: пять квадратов третей; на нижнем уровне a * a, для
+    # которого встроенный int использует более быстрое возведение в квадрат
+    if a < 0:
+        a = -a
+    if a.bit_length() <= cutoff:
+        return a * a
+    k = (a.bit_length() + 2) // 3
+    mask = (1 << k) - 1
+    a0, a1, a2 = a & mask, (a >> k) & mask, a >> (2 * k)
+    t = a0 + a2
+    p1, pm1 = t + a1, t - a1
+    pm2 = ((pm1 + a2) << 1) - a0
+
+    r0 = _toom3_square(a0, cutoff)
+    r1 = _toom3_square(p1, cutoff)
+    rm1 = _toom3_square(pm1, cutoff)
+    rm2 = _toom3_square(pm2, cutoff)
+    rinf = _toom3_square(a2, cutoff)
+
+    r3 = (rm2 - r1) // 3
+    r1 = (r1 - rm1) >> 1
+    r2 = rm1 - r0
+    r3 = ((r2 - r3) >> 1) + (rinf << 1)
+    r2 = r2 + r1 - rinf
+    r1 = r1 - r3
+    return r0 + (r1 << k) + (r2 << (2 * k)) + (r3 << (3 * k)) + (rinf << (4 * k))
+
+
+def toom3_multiply(a: int, b: int, cutoff: int = TOOM3_CUTOFF) -> int:
+    """Умножение Тоома-Кука (Toom-3): пять умножений третей вместо девяти.
+
+    Сильно разные по длине множители режутся на куски длины меньшего, чтобы
+    Toom-3 работал с числами равной длины."""
+    small, large = (a, b) if abs(a).bit_length() <= abs(b).bit_length() else (b, a)
+    size = abs(small).bit_length()
+    if size <= cutoff:
+        return a * b
+    if abs(large).bit_length() <= 2 * size:
+        return _toom3(a, b, cutoff)
+    sign = -1 if large < 0 else 1
+    large = abs(large)
+    mask = (1 << size) - 1
+    result = 0
+    shift = 0
+    while large:
+        result += _toom3(large & mask, small, cutoff) << shift
+        large >>= size
+        shift += size
+    return result if sign > 0 else -result
+
+
+def fast_multiply(a: int, b: int) -> int:
+    """Произведение целых: встроенное умножение, для очень длинных чисел - Toom-3"""
+    if min(abs(a).bit_length(), abs(b).bit_length()) < TOOM3_THRESHOLD:
+        return a * b
+    return toom3_multiply(a, b)
+
+
+def fast_square(a: int) -> int:
+    """Квадрат целого числа (см. fast_multiply)"""
+    if abs(a).bit_length() < TOOM3_THRESHOLD:
+        return a * a
+    return _toom3_square(a, TOOM3_CUTOFF)
+
+
+Number = Union[int, float, Fraction, Decimal]
+
+
+def fast_power(base: Number, exponent: int, modulus: Optional[int] = None) -> Number:
+    """base ** exponent, по модулю modulus, если он задан.
+
+    Для целых - встроенный pow (скользящее окно на C). Отрицательная степень по
+    модулю - степень обратного элемента (ValueError, если он не существует); без
+    модуля отрицательная степень целого даёт Fraction, а не float. Остальные типы
+    (Fraction, Decimal, float) - двоичное возведение с приведением по модулю на
+    каждом шаге."""
+    if not isinstance(exponent, int):
+        raise TypeError("Показатель степени должен быть целым")
+    if modulus is not None:
+        if not isinstance(modulus, int) or modulus == 0:
+            raise ValueError("Модуль должен быть ненулевым целым числом")
+        if isinstance(base, int):
+            try:
+                return pow(base, exponent, modulus)
+            except ValueError:
+                raise ValueError(f"{base} не обратим по модулю {modulus}") from None
+        if exponent < 0:
+            raise ValueError("Отрицательная степень по модулю определена только для целых")
+    if isinstance(base, int) and exponent < 0:
+        if base == 0:
+            raise ZeroDivisionError("0 нельзя возвести в отрицательную степень")
+        return Fraction(1, pow(base, -exponent))
+    if isinstance(base, int):
+        return pow(base, exponent)
+    if exponent < 0:
+        base, exponent = 1 / base, -exponent
+    result = base ** 0
+    while exponent:
+        if exponent & 1:
+            result = result * base
+            if modulus is not None:
+                result %= modulus
+        exponent >>= 1
+        if exponent:
+            base = base * base
+            if modulus is not None:
+                base %= modulus
+    return result if modulus is None else result % modulus
+
+
+def _nth_root_floor(x: int, n: int) -> int:
+    # floor(x ** (1/n)) для x > 0. Начальное приближение - корень из старших бит
+    # (рекурсивно), сдвинутый на место, с запасом сверху; затем целый Ньютон,
+    # который из приближения сверху монотонно убывает к ответу
+    bits = x.bit_length()
+    if bits <= 2 * n:
+        y = 1 << -(-bits // n)
+    else:
+        k = bits // (2 * n)
+        y = (_nth_root_floor(x >> (n * k), n) + 1) << k
+    while True:
+        z = ((n - 1) * y + x // y ** (n - 1)) // n
+        if z >= y:
+            return y
+        y = z
+
+
+def integer_nth_root(x: int, n: int) -> int:
+    """Точный целый корень: наибольшее r, для которого r ** n <= x.
+
+    Для отрицательного x и нечётного n - корень из модуля со знаком минус
+    (округление к нулю). Квадратный корень - math.isqrt."""
+    if not isinstance(x, int) or not isinstance(n, int):
+        raise TypeError("Целый корень определён для целых чисел")
+    if n <= 0:
+        raise ValueError("Степень корня должна быть положительной")
+    if x < 0:
+        if n % 2 == 0:
+            raise ValueError("Четный корень из отрицательного числа")
+        return -integer_nth_root(-x, n)
+    if x < 2 or n == 1:
+        return x
+    if n == 2:
+        return isqrt(x)
+    return _nth_root_floor(x, n)
+
+
+def is_perfect_power(x: int, n: int) -> bool:
+    """Является ли x точной n-й степенью целого числа"""
+    return integer_nth_root(x, n) ** n == x
+
+
+def nth_root(number: Union[int, float, Fraction, Decimal], n: int, digits: int = 28) -> Decimal:
+    """Корень n-й степени с digits значащими цифрами (Decimal, отбрасывание лишних).
+
+    Число переводится в точную дробь, масштабируется на 10 ** (n * m) и
+    извлекается целый корень - без потери точности на больших числах."""
+    if not isinstance(n, int) or n <= 0:
+        raise ValueError("Степень корня должна быть положительным целым")
+    if digits <= 0:
+        raise ValueError("Число цифр должно быть положительным")
+    value = Fraction(repr(number)) if isinstance(number, float) else Fraction(number)
+    if value < 0:
+        if n % 2 == 0:
+            raise ValueError("Четный корень из отрицательного числа")
+        return -nth_root(-value, n, digits)
+    if value == 0:
+        return Decimal(0)
+    # scale знаков после запятой: корень получается не короче digits + 1 цифр
+    magnitude = (len(str(value.numerator)) - len(str(value.denominator))) // n
+    scale = digits + 1 - magnitude
+    while True:
+        scaled = value * 10 ** (n * scale) if scale >= 0 else value / 10 ** (-n * scale)
+        root = integer_nth_root(scaled.numerator // scaled.denominator, n)
+        if len(str(root)) > digits:
+            break
+        scale += 1
+    with localcontext() as ctx:
+        ctx.prec = digits
+        ctx.rounding = ROUND_DOWN
+        return +Decimal(root).scaleb(-scale)
@@ -1,11 +1,34 @@
 import pytest
+import asyncio
+import io
+import json
 import math
+import sqlite3
 import sys
 import os
+import pickle
+import random
+import subprocess
+import threading
+import time
+from decimal import Decimal, localcontext
+from fractions import Fraction
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '.'))
 
-from geometry_package import Parallelepiped, Tetrahedron, Sphere, Steel, Aluminum, Copper
+from geometry_package import (Shape3D, Parallelepiped, Tetrahedron, Sphere, Material, MaterialCatalog, Units, Steel, Aluminum, Copper,
+                              Cylinder, Cone, Torus, Ellipsoid, Prism, Mesh, FormulaShape,
+                              get_shape_spec, shape_specs, compile_formula, ShapeBatch, ParallelEvaluator, PackingEstimator, ShapeCache, get_shape_cache, set_shape_cache)
+from geometry_package import instrumentation
+from geometry_package.instrumentation import Metrics, ProfileCapture, MemoryCapture, timed
+from database import GeometryDatabase
+from async_database import AsyncGeometryDatabase
+import math_kernels
+from math_kernels import (karatsuba_multiply, toom3_multiply, fast_multiply, fast_square, fast_power,
+                          integer_nth_root, is_perfect_power, nth_root)
+from batch_calculator import BatchGeometryCalculator, evaluate_spec, read_specs
+from exporters import ReportExporter, export_records, export_calculations, exporter_for
+from benchmarks.runner import Benchmark, measure, compare, save_results, load_results
 
 
 class TestShapeBasicProperties:
@@ -312,7 +335,1179 @@ class TestMaterialProperties:
         
         with pytest.raises(AttributeError):
             steel.density = 1000
+    
+    def test_standard_materials_are_shared(self):
+        """Тест что стандартные материалы - общие экземпляры"""
+        assert Steel() is Steel()
+        assert Aluminum() is not Steel()
+        assert Material.intern("Титан", 4500) is Material.intern("Титан", 4500.0)
+        assert Material.intern("Титан", 4500).density == 4500
+    
+    def test_shapes_have_no_instance_dict(self):
+        """Тест что фигуры и материалы не хранят __dict__"""
+        for obj in (Parallelepiped(1, 2, 3), Tetrahedron(1), Sphere(1), Steel()):
+            assert not hasattr(obj, '__dict__')
+            with pytest.raises(AttributeError):
+                obj.extra = 1
+    
+    def test_material_catalog_index(self):
+        """Тест поиска в каталоге материалов по имени и id"""
+        rows = [(1, 'Сталь', 7850.0), (2, 'Алюминий', 2700.0)]
+        rows += [(i, f'Сплав {i}', 1000.0 + i) for i in range(3, 5003)]
+        catalog = MaterialCatalog(rows)
+        assert len(catalog) == 5002
+        assert catalog['Сталь'] is Steel()
+        assert catalog[1] is Steel()
+        assert catalog.id_of('Сплав 4000') == 4000
+        assert catalog.density(4000) == 5000.0
+        assert 'Медь' not in catalog and catalog.get('Медь') is None
+        with pytest.raises(KeyError):
+            catalog[9999]
+    
+    def test_material_catalog_is_immutable(self):
+        """Тест что каталог не меняется, а with_material возвращает новый"""
+        catalog = MaterialCatalog.standard()
+        extended = catalog.with_material(4, 'Титан', 4500)
+        assert 'Титан' not in catalog
+        assert extended['Титан'] is Material.intern('Титан', 4500)
+        assert [m.name for m in catalog] == ['Сталь', 'Алюминий', 'Медь']
+        with pytest.raises(TypeError):
+            catalog._by_name['Титан'] = Steel()
+        assert pickle.loads(pickle.dumps(extended)).rows() == extended.rows()
+
+
+class TestShapeRegistry:
+    """Тесты реестра фигур и формул"""
+    
+    def test_new_shapes_formulas(self):
+        """Тест формул цилиндра, конуса, тора, эллипсоида и призмы"""
+        assert Cylinder(1, 2).volume == pytest.approx(2 * math.pi)
+        assert Cylinder(1, 2).surface_area == pytest.approx(6 * math.pi)
+        assert Cone(3, 4).volume == pytest.approx(12 * math.pi)
+        assert Cone(3, 4).surface_area == pytest.approx(24 * math.pi)
+        assert Torus(2, 0.5).volume == pytest.approx(math.pi ** 2)
+        assert Torus(2, 0.5).surface_area == pytest.approx(4 * math.pi ** 2)
+        assert Ellipsoid(2, 2, 2).volume == pytest.approx(Sphere(2).volume)
+        assert Ellipsoid(2, 2, 2).surface_area == pytest.approx(Sphere(2).surface_area)
+        assert Prism(4, 2, 3).volume == pytest.approx(12)
+        assert Prism(4, 2, 3).surface_area == pytest.approx(32)
+    
+    def test_builtin_shapes_registered(self):
+        """Тест что меню и пакетный режим видят все параметрические фигуры"""
+        names = [spec.name for spec in shape_specs(parametric=True)]
+        assert names[:3] == ['Parallelepiped', 'Tetrahedron', 'Sphere']
+        assert {'Cylinder', 'Cone', 'Torus', 'Ellipsoid', 'Prism'} <= set(names)
+        assert get_shape_spec('шар').shape_class is Sphere
+        assert get_shape_spec(Cylinder(1, 1)).describe(Cylinder(1, 2)) == [('Радиус', 1, 'м'), ('Высота', 2, 'м')]
+        assert not get_shape_spec(Mesh).parametric
+    
+    def test_plugin_shape_everywhere(self):
+        """Тест что объявленная один раз фигура работает в to_dict, ShapeBatch и пакетном режиме"""
+        class Capsule(FormulaShape):
+            title = "Капсула"
+            dimensions = (('radius', 'Радиус'), ('length', 'Длина цилиндра'))
+            volume_formula = "pi * radius ** 2 * (4 / 3 * radius + length)"
+            surface_area_formula = "2 * pi * radius * (2 * radius + length)"
+        
+        capsule = Capsule(1.0, 2.0, Steel())
+        assert capsule.parameters == {'radius': 1.0, 'length': 2.0}
+        assert capsule == Capsule(1.0, 2.0)
+        assert capsule.to_dict()['volume'] == round(math.pi * (4 / 3 + 2), 4)
+        batch = ShapeBatch(Capsule, radius=[1.0, 2.0], length=[2.0, 0.0], density=7850.0)
+        assert batch.volume[0] == pytest.approx(capsule.volume)
+        result, _ = evaluate_spec({'shape': 'капсула', 'material': 'Сталь', 'radius': 1, 'length': 2})
+        assert result == capsule.to_dict()
+    
+    def test_formula_validation_and_cache(self):
+        """Тест отказа от небезопасных формул и кэша скомпилированных функций"""
+        with pytest.raises(ValueError):
+            compile_formula("__import__('os').system('ls')", ('x',))
+        with pytest.raises(ValueError):
+            compile_formula("x * y", ('x',))
+        assert compile_formula("x * 2", ('x',)) is compile_formula("x * 2", ('x',))
+        assert list(compile_formula("sqrt(x)", ('x',), vectorized=True)([4.0, 9.0])) == [2.0, 3.0]
+    
+    def test_mesh_cube(self):
+        """Тест сетки: единичный куб из 12 треугольников"""
+        vertices = [(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0), (0, 0, 1), (1, 0, 1), (1, 1, 1), (0, 1, 1)]
+        faces = [(0, 2, 1), (0, 3, 2), (4, 5, 6), (4, 6, 7), (0, 1, 5), (0, 5, 4),
+                 (1, 2, 6), (1, 6, 5), (2, 3, 7), (2, 7, 6), (3, 0, 4), (3, 4, 7)]
+        mesh = Mesh.from_arrays(vertices, faces, Copper())
+        assert mesh.volume == pytest.approx(1.0)
+        assert mesh.surface_area == pytest.approx(6.0)
+        assert mesh.to_dict()['mass'] == pytest.approx(8960.0)
+        assert mesh.bounding_box() == (1.0, 1.0, 1.0)
+
+
+class TestMesh:
+    """Тесты сетки из двоичного STL"""
+    
+    CUBE_VERTICES = [(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0), (0, 0, 1), (1, 0, 1), (1, 1, 1), (0, 1, 1)]
+    CUBE_FACES = [(0, 2, 1), (0, 3, 2), (4, 5, 6), (4, 6, 7), (0, 1, 5), (0, 5, 4),
+                  (1, 2, 6), (1, 6, 5), (2, 3, 7), (2, 7, 6), (3, 0, 4), (3, 4, 7)]
+    
+    @pytest.fixture
+    def cube_stl(self, tmp_path):
+        import numpy as np
+        from geometry_package.mesh import write_stl
+        # Куб 2 x 2 x 2, сдвинутый далеко от начала координат
+        triangles = np.array(self.CUBE_VERTICES, dtype=float)[np.array(self.CUBE_FACES)] * 2 + 1000
+        path = tmp_path / "cube.stl"
+        assert write_stl(str(path), triangles) == 12
+        return str(path)
+    
+    def test_from_stl(self, cube_stl):
+        """Тест чтения STL через memmap и расчёта объёма и площади"""
+        mesh = Mesh.from_stl(cube_stl, Aluminum())
+        assert mesh.triangle_count == 12
+        assert mesh.volume == pytest.approx(8.0)
+        assert mesh.surface_area == pytest.approx(24.0)
+        assert mesh.to_dict() == {'type': 'Mesh', 'volume': 8.0, 'surface_area': 24.0,
+                                  'mass': 21600.0, 'material': 'Алюминий'}
+    
+    def test_chunked_measure(self, cube_stl, monkeypatch):
+        """Тест что расчёт по кускам не зависит от размера куска"""
+        import geometry_package.mesh as mesh_module
+        monkeypatch.setattr(mesh_module, '_CHUNK_TRIANGLES', 5)
+        mesh = Mesh.from_stl(cube_stl)
+        assert mesh.volume == pytest.approx(8.0)
+        assert mesh.surface_area == pytest.approx(24.0)
+        assert mesh.bounding_box() == (2.0, 2.0, 2.0)
+    
+    def test_empty_mesh(self):
+        """Тест что у пустой сетки нулевой объём, а габариты не определены"""
+        import numpy as np
+        mesh = Mesh(np.zeros((0, 3, 3)))
+        assert mesh.volume == 0
+        with pytest.raises(ValueError):
+            mesh.bounding_box()
+    
+    def test_invalid_stl(self, tmp_path):
+        """Тест отказа от текстового STL"""
+        path = tmp_path / "ascii.stl"
+        path.write_text("solid cube\nendsolid cube\n" * 10)
+        with pytest.raises(ValueError):
+            Mesh.from_stl(str(path))
+    
+    def test_mesh_in_batch_and_database(self, cube_stl, tmp_path):
+        """Тест что сетка проходит через пакетный режим и базу данных"""
+        result, parameters = evaluate_spec({'shape': 'Mesh', 'material': 'Сталь', 'path': cube_stl})
+        assert parameters == {'path': cube_stl}
+        assert result['mass'] == 8 * 7850.0
+        with GeometryDatabase(str(tmp_path / "test.db")) as db:
+            db.save_calculation(result, parameters)
+            saved = db.get_all_calculations()[0]
+        assert saved['shape_type'] == 'Mesh'
+        assert saved['parameters'] == {'path': cube_stl}
+        with pytest.raises(ValueError):
+            evaluate_spec({'shape': 'Mesh', 'material': 'Сталь', 'path': str(tmp_path / "missing.stl")})
+
+
+class TestShapeBatch:
+    """Тесты векторного пакетного расчёта"""
+    
+    def test_batch_matches_objects(self):
+        """Тест совпадения пакетного расчёта с расчётом по объектам"""
+        cases = [
+            (Parallelepiped, [(2, 3, 4), (0.5, 1.5, 2.5), (1000, 1, 0.001)]),
+            (Tetrahedron, [(2,), (0.001,), (7.5,)]),
+            (Sphere, [(3,), (0.05,), (1000,)]),
+        ]
+        for shape_type, dims in cases:
+            shapes = [shape_type(*d, Steel()) for d in dims]
+            batch = ShapeBatch.from_shapes(shapes)
+            for i, shape in enumerate(shapes):
+                assert batch.volume[i] == pytest.approx(shape.volume, rel=1e-12)
+                assert batch.surface_area[i] == pytest.approx(shape.surface_area, rel=1e-12)
+                assert batch.mass[i] == pytest.approx(shape.mass, rel=1e-12)
+    
+    def test_batch_from_arrays(self):
+        """Тест создания пакета из массивов и столбца плотности"""
+        batch = ShapeBatch(Parallelepiped, length=[1, 2], width=[1, 3], height=[1, 4],
+                           density=[7850.0, 2700.0])
+        assert len(batch) == 2
+        assert list(batch.volume) == [1.0, 24.0]
+        assert list(batch.mass) == [7850.0, 24.0 * 2700]
+    
+    def test_batch_to_dicts(self):
+        """Тест что to_dicts совпадает с to_dict"""
+        shapes = [Sphere(r, Copper()) for r in (0.1, 1.0, 2.5)]
+        batch = ShapeBatch.from_shapes(shapes)
+        assert list(batch.to_dicts()) == [s.to_dict() for s in shapes]
+    
+    def test_batch_without_density(self):
+        """Тест пакета без плотности"""
+        batch = ShapeBatch(Sphere, radius=[1.0])
+        with pytest.raises(ValueError):
+            batch.mass
+        assert next(batch.to_dicts())['mass'] is None
+    
+    def test_batch_validation(self):
+        """Тест проверки входных массивов"""
+        with pytest.raises(ValueError):
+            ShapeBatch(Parallelepiped, length=[1, 2], width=[1], height=[1, 2])
+        with pytest.raises(ValueError):
+            ShapeBatch(Sphere, edge=[1])
+        with pytest.raises(TypeError):
+            ShapeBatch.from_shapes([Sphere(1), Tetrahedron(1)])
+
+
+class TestUnitsAndPrecision:
+    """Тесты единиц измерения, точности и точной арифметики"""
+    
+    def test_micro_part_is_not_rounded_to_zero(self):
+        """Тест что мелкая деталь не округляется до нуля"""
+        units = Units('mm', 'g/cm3')
+        sphere = units.create(Sphere, radius=0.05, material=units.material('Сталь', 7.85))
+        assert sphere.radius == 5e-05
+        assert sphere.material.density == 7850.0
+        assert sphere.to_dict()['volume'] == 0.0
+        result = sphere.to_dict(precision=None, units='mm')
+        assert result['volume'] == pytest.approx(4 / 3 * math.pi * 0.05 ** 3)
+        assert sphere.to_dict(precision=None)['volume'] == sphere.volume
+    
+    def test_units_keep_dimensionless_parameters(self):
+        """Тест что безразмерные параметры (число сторон) не переводятся"""
+        prism = Units('cm').create('Prism', sides=6, side=10, height=20)
+        assert prism.sides == 6
+        assert prism.side == pytest.approx(0.1)
+        assert prism.to_dict(units=Units('cm'))['volume'] == pytest.approx(6 * 100 / (4 * math.tan(math.pi / 6)) * 20, rel=1e-4)
+        with pytest.raises(ValueError):
+            Units('inch')
+    
+    def test_decimal_and_fraction_arithmetic(self):
+        """Тест точного расчёта в Decimal и Fraction"""
+        box = Parallelepiped(0.1, 0.2, 0.3, Steel()).to_dict(arithmetic='fraction', precision=None)
+        assert box['volume'] == Fraction(3, 500)
+        assert box['mass'] == Fraction(471, 10)
+        sphere = Sphere(1, Steel()).to_dict(arithmetic='decimal', precision=10)
+        assert sphere['volume'] == Decimal('4.1887902048')
+        with localcontext() as ctx:
+            ctx.prec = 50
+            volume = Sphere(1).to_dict(arithmetic='decimal', precision=None)['volume']
+        assert str(volume).startswith('4.18879020478639098461685784437267')
+        for shape in (Tetrahedron(1), Cone(1, 2), Ellipsoid(1, 2, 3), Prism(6, 1, 2)):
+            exact = shape.to_dict(arithmetic='decimal', precision=None)
+            assert float(exact['surface_area']) == pytest.approx(shape.surface_area, rel=1e-12)
+        with pytest.raises(ValueError):
+            Sphere(1).to_dict(arithmetic='fraction')
+    
+    def test_batch_units_match_shapes(self):
+        """Тест что пакет с единицами совпадает с поштучным расчётом"""
+        units = Units('mm', 'g/cm3', 'g')
+        batch = ShapeBatch(Parallelepiped, density=2.7, units=units,
+                           length=[10, 20], width=[10, 5], height=[1, 2])
+        assert batch.column('length').tolist() == [0.01, 0.02]
+        records = list(batch.to_dicts(precision=None, units=units))
+        assert records[0]['volume'] == pytest.approx(100)
+        assert records[0]['mass'] == pytest.approx(0.27)
+        shape = units.create(Parallelepiped, length=20, width=5, height=2,
+                             material=units.material('Алюминий', 2.7))
+        expected = shape.to_dict(precision=None, units=units)
+        assert records[1]['volume'] == pytest.approx(expected['volume'])
+        assert records[1]['mass'] == pytest.approx(expected['mass'])
+
 
+class TestParallelEvaluator:
+    """Тесты параллельного расчёта разнотипных коллекций"""
+    
+    class Cube(Shape3D):
+        # Фигура без parameters передаётся в рабочий процесс целиком
+        __slots__ = ()
+        
+        def _calculate_volume(self):
+            return 8.0
+        
+        def _calculate_surface_area(self):
+            return 24.0
+    
+    def shapes(self, count):
+        materials = [Steel(), Aluminum(), Copper(), None]
+        shapes = []
+        for i in range(count):
+            size = 0.5 + i % 7
+            shape = [Parallelepiped(size, 2.0, 3.0), Tetrahedron(size), Sphere(size)][i % 3]
+            if materials[i % 4] is not None:
+                shape.material = materials[i % 4]
+            shapes.append(shape)
+        return shapes
+    
+    def test_order_and_values_match_to_dict(self):
+        """Тест что результаты совпадают с to_dict() и идут в исходном порядке"""
+        shapes = self.shapes(500)
+        evaluator = ParallelEvaluator(workers=2, chunk_size=64)
+        assert evaluator.evaluate(shapes) == [shape.to_dict() for shape in shapes]
+    
+    def test_shapes_without_parameters(self):
+        """Тест фигур, которые нельзя упаковать в массив параметров"""
+        shapes = self.shapes(10)
+        shapes.insert(3, TestParallelEvaluator.Cube(Steel()))
+        result = ParallelEvaluator(workers=1, chunk_size=4).evaluate(shapes)
+        assert result[3] == {'type': 'Cube', 'volume': 8.0, 'surface_area': 24.0,
+                             'mass': 62800.0, 'material': 'Сталь'}
+        assert len(result) == 11
+    
+    def test_chunk_size_auto_tuning(self):
+        """Тест подбора размера фрагмента по пробному расчёту"""
+        shapes = self.shapes(3000)
+        evaluator = ParallelEvaluator(workers=4, probe_size=100)
+        assert evaluator.evaluate(shapes) == [shape.to_dict() for shape in shapes]
+        assert 64 <= evaluator.last_chunk_size <= 3000 // 16 + 1
+        assert ParallelEvaluator(workers=1).evaluate([]) == []
+
+
+class TestPackingEstimator:
+    """Тесты оценки загрузки контейнера"""
+    
+    @staticmethod
+    def assert_no_overlap(result, container):
+        boxes = [placement[1:] for placement in result['placements']]
+        limits = (container.length, container.width, container.height)
+        for i, box in enumerate(boxes):
+            assert all(-1e-9 <= box[a] and box[a] + box[a + 3] <= limits[a] + 1e-9 for a in range(3))
+            for other in boxes[i + 1:]:
+                assert any(box[a] + box[a + 3] <= other[a] + 1e-9 or other[a] + other[a + 3] <= box[a] + 1e-9
+                           for a in range(3))
+    
+    def test_boxes_fill_container_exactly(self):
+        """Тест что одинаковые коробки заполняют контейнер целиком"""
+        container = Parallelepiped(1, 1, 1)
+        items = [Parallelepiped(0.5, 0.5, 0.5, Steel()) for _ in range(10)]
+        result = PackingEstimator(container).pack(items)
+        assert result['method'] == 'shelf'
+        assert result['placed'] == 8
+        assert len(result['unplaced']) == 2
+        assert result['fill_ratio'] == pytest.approx(1.0)
+        assert result['mass_by_material'] == {'Сталь': pytest.approx(8 * items[0].mass)}
+        self.assert_no_overlap(result, container)
+    
+    def test_mixed_items_rotation_and_mass(self):
+        """Тест разнотипных деталей: поворот длинной стороной и масса по материалам"""
+        container = Parallelepiped(0.2, 2.0, 0.3)
+        items = [Parallelepiped(0.1, 0.1, 1.5, Aluminum()), Sphere(0.05, Copper()),
+                 Tetrahedron(0.1, Steel()), Sphere(0.5, Steel())]
+        result = PackingEstimator(container).pack(items)
+        assert result['unplaced'] == [3]
+        assert set(result['mass_by_material']) == {'Алюминий', 'Медь', 'Сталь'}
+        assert result['total_mass'] == pytest.approx(sum(item.mass for item in items[:3]))
+        self.assert_no_overlap(result, container)
+    
+    def test_sphere_lattice_beats_cubic(self):
+        """Тест что плотная решётка вмещает больше шаров, чем кубическая"""
+        estimator = PackingEstimator(Parallelepiped(1, 1, 1))
+        assert estimator.lattice_capacity(0.25) == 8
+        assert estimator.lattice_capacity(0.05) > 1000
+        result = estimator.pack([Sphere(0.1, Steel()) for _ in range(200)])
+        assert result['method'] == 'lattice'
+        centers = [(p[1] + 0.1, p[2] + 0.1, p[3] + 0.1) for p in result['placements']]
+        assert len(centers) == estimator.lattice_capacity(0.1)
+        assert all(math.dist(a, b) >= 0.2 - 1e-9 for i, a in enumerate(centers) for b in centers[i + 1:])
+    
+    def test_invalid_arguments(self):
+        """Тест ошибок: контейнер не параллелепипед, решётка для разных шаров"""
+        with pytest.raises(TypeError):
+            PackingEstimator(Sphere(1))
+        with pytest.raises(ValueError):
+            PackingEstimator(Parallelepiped(1, 1, 1)).pack([Sphere(0.1), Sphere(0.2)], method='lattice')
+
+
+class TestShapeCache:
+    """Тесты общего кэша результатов фигур"""
+    
+    @pytest.fixture
+    def cache(self):
+        previous = get_shape_cache()
+        cache = ShapeCache(maxsize=2)
+        set_shape_cache(cache)
+        yield cache
+        set_shape_cache(previous)
+    
+    def test_disabled_by_default(self):
+        """Тест что без set_shape_cache кэш выключен и to_dict считает напрямую"""
+        code = ("from geometry_package import Sphere, Steel, get_shape_cache\n"
+                "print(get_shape_cache(), Sphere(1, Steel()).to_dict()['volume'])\n")
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout
+        assert output.split() == ['None', '4.1888']
+    
+    def test_repeated_shapes_hit_cache(self, cache):
+        """Тест попаданий для одинаковых деталей"""
+        first = Sphere(0.05, Steel()).to_dict()
+        second = Sphere(0.05, Steel()).to_dict()
+        assert first == second
+        assert cache.stats()['hits'] == 1
+        assert cache.stats()['misses'] == 1
+        
+        Sphere(0.05, Copper()).to_dict()
+        assert cache.stats()['misses'] == 2
+    
+    def test_cached_result_matches_direct(self, cache):
+        """Тест что кэш не меняет результат"""
+        cached = Tetrahedron(3, Aluminum()).to_dict()
+        set_shape_cache(None)
+        assert Tetrahedron(3, Aluminum()).to_dict() == cached
+    
+    def test_returned_dict_is_a_copy(self, cache):
+        """Тест что изменение результата не портит кэш"""
+        Parallelepiped(1, 2, 3, Steel()).to_dict()['volume'] = -1
+        assert Parallelepiped(1, 2, 3, Steel()).to_dict()['volume'] == 6.0
+    
+    def test_lru_eviction(self, cache):
+        """Тест вытеснения давно не использованных записей"""
+        Sphere(1).to_dict()
+        Sphere(2).to_dict()
+        Sphere(1).to_dict()
+        Sphere(3).to_dict()
+        assert len(cache) == 2
+        Sphere(1).to_dict()
+        assert cache.stats()['hits'] == 2
+    
+    def test_cache_persistence(self, cache, tmp_path):
+        """Тест сохранения кэша в базу и прогрева из неё"""
+        Sphere(0.05, Steel()).to_dict()
+        with GeometryDatabase(str(tmp_path / "test.db")) as db:
+            assert db.save_shape_cache(cache) == 1
+            warm = ShapeCache()
+            assert db.load_shape_cache(warm) == 1
+        set_shape_cache(warm)
+        assert Sphere(0.05, Steel()).to_dict() == cache.items()[0][1][2]
+        assert warm.stats()['hits'] == 1
+
+
+class TestGeometryDatabase:
+    """Тесты работы с базой данных расчётов"""
+    
+    def test_save_and_read_calculation(self, tmp_path):
+        """Тест сохранения и чтения расчёта"""
+        with GeometryDatabase(str(tmp_path / "test.db")) as db:
+            shape = Parallelepiped(2, 3, 4, Steel())
+            db.save_calculation(shape.to_dict(), {'length': 2, 'width': 3, 'height': 4})
+            calculations = db.get_all_calculations()
+            assert len(calculations) == 1
+            assert calculations[0]['shape_type'] == 'Parallelepiped'
+            assert calculations[0]['volume'] == 24.0
+            assert calculations[0]['material'] == 'Сталь'
+            assert db.get_statistics()['total_calculations'] == 1
+    
+    def test_connection_is_reused(self, tmp_path):
+        """Тест что соединение создаётся один раз на поток"""
+        db = GeometryDatabase(str(tmp_path / "test.db"))
+        assert db.connection is db.connection
+        mode = db.connection.execute('PRAGMA journal_mode').fetchone()[0]
+        assert mode == 'wal'
+        db.close()
+    
+    def test_close_and_reopen(self, tmp_path):
+        """Тест что после close() база снова доступна"""
+        db = GeometryDatabase(str(tmp_path / "test.db"))
+        db.save_calculation(Sphere(1, Copper()).to_dict(), {'radius': 1})
+        db.close()
+        assert len(db.get_all_calculations()) == 1
+        db.close()
+
+    
+    def test_bulk_save(self, tmp_path):
+        """Тест пакетного сохранения"""
+        with GeometryDatabase(str(tmp_path / "test.db")) as db:
+            records = ((Sphere(r, Steel()).to_dict(), {'radius': r}) for r in range(1, 251))
+            report = db.save_calculations_bulk(records, chunk_size=100)
+            assert report['rows'] == 250
+            assert report['rows_per_second'] >= 0
+            assert db.get_statistics()['total_calculations'] == 250
+    
+    def test_bulk_save_rolls_back_on_error(self, tmp_path):
+        """Тест что ошибка в пакете отменяет всю транзакцию"""
+        with GeometryDatabase(str(tmp_path / "test.db")) as db:
+            good = Sphere(1, Steel()).to_dict()
+            bad = Sphere(1).to_dict()  # mass = None нарушает NOT NULL
+            with pytest.raises(Exception):
+                db.save_calculations_bulk([(good, {'radius': 1}), (bad, {'radius': 1})])
+            assert db.get_all_calculations() == []
+    
+    def test_group_commit_writer(self, tmp_path):
+        """Тест фоновой записи с групповой фиксацией"""
+        with GeometryDatabase(str(tmp_path / "test.db")) as db:
+            with db.group_writer(max_batch=50, max_delay=0.01) as writer:
+                for r in range(1, 121):
+                    writer.save_calculation(Tetrahedron(r, Copper()).to_dict(), {'edge': r})
+                writer.flush()
+                stats = writer.get_statistics()
+                assert stats['rows'] == 120
+                assert stats['batches'] >= 3
+                assert stats['pending'] == 0
+            assert len(db.get_all_calculations()) == 120
+        
+        # Поток-писатель открыл бы свою пустую базу в памяти
+        with GeometryDatabase(":memory:") as db:
+            with pytest.raises(ValueError):
+                db.group_writer()
+
+    
+    def test_paginated_history(self, tmp_path):
+        """Тест постраничной выборки истории с фильтрами"""
+        with GeometryDatabase(str(tmp_path / "test.db")) as db:
+            records = []
+            for i in range(1, 26):
+                shape = Sphere(i, Steel()) if i % 2 else Parallelepiped(i, 1, 1, Aluminum())
+                records.append((shape.to_dict(), {}))
+            db.save_calculations_bulk(records)
+            
+            page, after = db.get_calculations_page(10)
+            assert [c['id'] for c in page] == list(range(25, 15, -1))
+            assert after == 16
+            page, after = db.get_calculations_page(10, after)
+            assert page[0]['id'] == 15
+            
+            spheres = list(db.iter_calculations(page_size=4, shape_type='Sphere'))
+            assert len(spheres) == 13
+            assert all(c['shape_type'] == 'Sphere' for c in spheres)
+            
+            aluminum = list(db.iter_calculations(material='Алюминий', min_volume=5, max_volume=10))
+            assert sorted(c['volume'] for c in aluminum) == [6.0, 8.0, 10.0]
+            
+            assert len(db.get_all_calculations()) == 25
+            assert db.get_calculations_page(5, 1) == ([], None)
+
+    
+    def test_statistics_rollup(self, tmp_path):
+        """Тест статистики из сводной таблицы"""
+        with GeometryDatabase(str(tmp_path / "test.db")) as db:
+            db.save_calculation(Parallelepiped(1, 1, 1, Steel()).to_dict(), {})
+            db.save_calculation(Parallelepiped(2, 1, 1, Steel()).to_dict(), {})
+            db.save_calculations_bulk([(Sphere(1, Copper()).to_dict(), {})])
+            
+            stats = db.get_statistics()
+            assert stats['total_calculations'] == 3
+            assert stats['unique_shapes'] == 2
+            assert stats['unique_materials'] == 2
+            assert stats['last_calculation'] is not None
+            
+            steel = db.get_material_statistics()[1]
+            assert steel['material'] == 'Сталь'
+            assert steel['count'] == 2
+            assert steel['mass_sum'] == 3 * 7850.0
+            assert steel['mass_mean'] == 1.5 * 7850.0
+            assert (steel['mass_min'], steel['mass_max']) == (7850.0, 2 * 7850.0)
+            assert [s['shape_type'] for s in db.get_shape_statistics()] == ['Parallelepiped', 'Sphere']
+    
+    def test_statistics_after_delete(self, tmp_path):
+        """Тест что триггеры поддерживают статистику при удалении"""
+        with GeometryDatabase(str(tmp_path / "test.db")) as db:
+            for edge in (1, 2, 3):
+                db.save_calculation(Tetrahedron(edge, Aluminum()).to_dict(), {})
+            with db.connection as conn:
+                conn.execute("DELETE FROM calculations WHERE id = 3")
+            stats = db.get_material_statistics()[0]
+            assert stats['count'] == 2
+            assert stats['mass_max'] == Tetrahedron(2, Aluminum()).to_dict()['mass']
+            with db.connection as conn:
+                conn.execute("DELETE FROM calculations")
+            assert db.get_statistics()['total_calculations'] == 0
+            assert db.get_material_statistics() == []
+            
+            # Пересчёт минимума и максимума группы идёт по индексу, без просмотра группы
+            plan = db.connection.execute(
+                "EXPLAIN QUERY PLAN SELECT MIN(mass) FROM calculations "
+                "WHERE shape_type = 'Tetrahedron' AND material_id = 1").fetchall()
+            assert 'idx_calculations_group_mass' in plan[0][-1]
+    
+    def test_statistics_after_update(self, tmp_path):
+        """Тест что триггер поддерживает статистику при изменении строк"""
+        def rebuilt(db):
+            return db.connection.execute(
+                "SELECT shape_type, material_id, COUNT(*), ROUND(SUM(volume), 6), ROUND(SUM(mass), 6), "
+                "MIN(mass), MAX(mass) FROM calculations GROUP BY shape_type, material_id ORDER BY 1, 2").fetchall()
+        
+        def rollup(db):
+            return db.connection.execute(
+                "SELECT shape_type, material_id, count, ROUND(volume_sum, 6), ROUND(mass_sum, 6), "
+                "mass_min, mass_max FROM calculation_stats ORDER BY 1, 2").fetchall()
+        
+        with GeometryDatabase(str(tmp_path / "test.db")) as db:
+            for edge in (1, 2, 3):
+                db.save_calculation(Tetrahedron(edge, Aluminum()).to_dict(), {})
+            db.save_calculation(Sphere(1, Steel()).to_dict(), {})
+            steel = db.materials.id_of('Сталь')
+            
+            with db.connection as conn:
+                # Крайнее значение группы, перенос в другую группу и её исчезновение
+                conn.execute("UPDATE calculations SET mass = 1.0, volume = 0.5 WHERE id = 3")
+                assert rollup(db) == rebuilt(db)
+                conn.execute("UPDATE calculations SET material_id = ? WHERE id = 1", (steel,))
+                assert rollup(db) == rebuilt(db)
+                conn.execute("UPDATE calculations SET shape_type = 'Cube' WHERE id = 4")
+                assert rollup(db) == rebuilt(db)
+                conn.execute("UPDATE calculations SET shape_type = 'Sphere', material_id = ? "
+                             "WHERE shape_type = 'Tetrahedron'", (steel,))
+                assert rollup(db) == rebuilt(db)
+            assert db.get_statistics()['unique_shapes'] == 2
+    
+    def test_statistics_migration(self, tmp_path):
+        """Тест заполнения сводной таблицы для базы старой версии"""
+        path = str(tmp_path / "old.db")
+        conn = sqlite3.connect(path)
+        conn.execute('''
+            CREATE TABLE calculations (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                shape_type TEXT NOT NULL,
+                volume REAL NOT NULL,
+                surface_area REAL NOT NULL,
+                mass REAL NOT NULL,
+                material TEXT NOT NULL,
+                parameters TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        conn.execute("INSERT INTO calculations (shape_type, volume, surface_area, mass, material, parameters) "
+                     "VALUES ('Sphere', 1.0, 2.0, 3.0, 'Медь', '{}')")
+        conn.commit()
+        conn.close()
+        
+        with GeometryDatabase(path) as db:
+            assert db.get_statistics()['total_calculations'] == 1
+    
+    def test_material_id_storage(self, tmp_path):
+        """Тест что расчёты хранят внешний ключ material_id, а не имя"""
+        with GeometryDatabase(str(tmp_path / "test.db")) as db:
+            assert db.materials['Медь'] is Copper()
+            db.save_calculation(Sphere(1, Copper()).to_dict(), {'radius': 1})
+            columns = [row[1] for row in db.connection.execute('PRAGMA table_info(calculations)')]
+            assert 'material' not in columns
+            material_id, = db.connection.execute('SELECT material_id FROM calculations').fetchone()
+            assert material_id == db.materials.id_of('Медь')
+            assert db.get_all_calculations()[0]['material'] == 'Медь'
+            
+            # Неизвестный материал добавляется с плотностью самого материала
+            gold = Material('Золото', 19300)
+            db.save_calculation(Sphere(1, gold).to_dict(), {'radius': 1}, gold)
+            assert db.materials['Золото'].density == 19300
+            assert [c['material'] for c in db.iter_calculations(material='Золото')] == ['Золото']
+            
+            # Объём маленькой фигуры округляется до нуля, но плотность известна
+            silver = Material('Серебро', 10490)
+            db.save_calculation(Sphere(0.01, silver).to_dict(), {'radius': 0.01})
+            assert db.materials['Серебро'].density == 10490
+            
+            # Материал, добавленный внутри транзакции пакета, откатывается вместе с ней
+            platinum = Material('Платина', 21450)
+            records = [(Sphere(1, Copper()).to_dict(), {'radius': 1}),
+                       (Sphere(1, platinum).to_dict(), {'radius': 1}, platinum),
+                       (Sphere(2, platinum).to_dict(), {'radius': 2}, platinum), ({}, {})]
+            with pytest.raises(KeyError):
+                db.save_calculations_bulk(records)
+            assert 'Платина' not in db.materials
+            assert 'Платина' not in db.reload_materials()
+            assert list(db.iter_calculations(material='Платина')) == []
+            
+            db.save_calculation(Sphere(1, platinum).to_dict(), {'radius': 1})
+            assert db.materials['Платина'].density == 21450
+            assert db.get_all_calculations()[0]['material'] == 'Платина'
+            
+            with pytest.raises(ValueError):
+                db.save_calculation({'type': 'Sphere', 'volume': 1.0, 'surface_area': 1.0,
+                                     'mass': 1.0, 'material': 'Неизвестный сплав'}, {'radius': 1})
+            assert [s['material'] for s in db.get_material_statistics()] == ['Золото', 'Медь', 'Платина', 'Серебро']
+    
+    def test_material_id_migration(self, tmp_path):
+        """Тест перевода столбца material в material_id для базы версии 2"""
+        path = str(tmp_path / "old.db")
+        conn = sqlite3.connect(path)
+        conn.execute('''
+            CREATE TABLE calculations (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                shape_type TEXT NOT NULL,
+                volume REAL NOT NULL,
+                surface_area REAL NOT NULL,
+                mass REAL NOT NULL,
+                material TEXT NOT NULL,
+                parameters TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        conn.executemany("INSERT INTO calculations (shape_type, volume, surface_area, mass, material, parameters) "
+                         "VALUES ('Sphere', ?, 2.0, ?, ?, '{}')",
+                         [(1.0, 8960.0, 'Медь'), (2.0, 9000.0, 'Олово'), (1.0, 7850.0, 'Сталь')])
+        conn.execute('PRAGMA user_version = 2')
+        conn.commit()
+        conn.close()
+        
+        with GeometryDatabase(path) as db:
+            assert [c['material'] for c in db.get_all_calculations()] == ['Сталь', 'Олово', 'Медь']
+            assert db.materials['Олово'].density == 4500.0
+            assert db.get_statistics()['unique_materials'] == 3
+            db.save_calculation(Sphere(1, Steel()).to_dict(), {'radius': 1})
+            assert db.get_all_calculations()[0]['id'] == 4
+
+    
+    def test_parameter_range_query(self, tmp_path):
+        """Тест выборки по диапазону параметра через индекс по JSON"""
+        with GeometryDatabase(str(tmp_path / "test.db")) as db:
+            radii = [0.05, 0.1, 0.15, 0.2, 0.25]
+            db.save_calculations_bulk((Sphere(r, Steel()).to_dict(), {'radius': r}) for r in radii)
+            db.save_calculation(Tetrahedron(0.15, Steel()).to_dict(), {'edge': 0.15})
+            
+            found = list(db.iter_calculations(shape_type='Sphere',
+                                              parameter_ranges={'radius': (0.1, 0.2)}))
+            assert sorted(c['parameters']['radius'] for c in found) == [0.1, 0.15, 0.2]
+            
+            plan = db.connection.execute(
+                "EXPLAIN QUERY PLAN SELECT id FROM calculations "
+                "WHERE json_extract(parameters, '$.radius') >= 0.1").fetchall()
+            assert 'idx_calculations_param_radius' in str(plan)
+            
+            # Индексы есть у параметров всех фигур реестра, а не только у базовых
+            indexes = {row[0] for row in db.connection.execute(
+                "SELECT name FROM sqlite_master WHERE name LIKE 'idx_calculations_param_%'")}
+            for spec in shape_specs(parametric=True):
+                for name in spec.names:
+                    assert f'idx_calculations_param_{name}' in indexes
+            db.save_calculation(Torus(2, 0.5, Steel()).to_dict(), {'major_radius': 2, 'minor_radius': 0.5})
+            found = db.get_calculations_page(10, parameter_ranges={'minor_radius': (0.4, 0.6)})[0]
+            assert [c['shape_type'] for c in found] == ['Torus']
+            
+            with pytest.raises(ValueError):
+                db.get_calculations_page(10, parameter_ranges={"radius') OR 1=1 --": (0, 1)})
+    
+    def test_parameters_migration(self, tmp_path):
+        """Тест перевода старых параметров str(dict) в JSON"""
+        path = str(tmp_path / "old.db")
+        conn = sqlite3.connect(path)
+        conn.execute('''
+            CREATE TABLE calculations (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                shape_type TEXT NOT NULL,
+                volume REAL NOT NULL,
+                surface_area REAL NOT NULL,
+                mass REAL NOT NULL,
+                material TEXT NOT NULL,
+                parameters TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        for parameters in (str({'radius': 0.5}), 'не словарь'):
+            conn.execute("INSERT INTO calculations (shape_type, volume, surface_area, mass, material, parameters) "
+                         "VALUES ('Sphere', 1.0, 2.0, 3.0, 'Медь', ?)", (parameters,))
+        conn.commit()
+        conn.close()
+        
+        with GeometryDatabase(path) as db:
+            calculations = db.get_all_calculations()
+            assert calculations[1]['parameters'] == {'radius': 0.5}
+            assert calculations[0]['parameters'] == {'raw': 'не словарь'}
+            found = list(db.iter_calculations(parameter_ranges={'radius': (0.4, None)}))
+            assert len(found) == 1
+
+class TestBatchCalculator:
+    """Тесты пакетного режима без диалога"""
+    
+    SPECS = [
+        (2, {'shape': 'Parallelepiped', 'material': 'Сталь', 'length': '2', 'width': '3', 'height': '4'}),
+        (3, {'shape': 'Шар', 'material': 'Медь', 'radius': 0.05}),
+        (4, {'shape': 'Sphere', 'material': 'Золото', 'radius': 1}),
+        (5, {'shape': 'Tetrahedron', 'material': 'Алюминий', 'edge': -1}),
+    ]
+    
+    def test_evaluate_spec_matches_to_dict(self):
+        """Тест что результат совпадает с to_dict()"""
+        result, parameters = evaluate_spec(self.SPECS[0][1])
+        assert result == Parallelepiped(2, 3, 4, Steel()).to_dict()
+        assert parameters == {'length': 2.0, 'width': 3.0, 'height': 4.0}
+    
+    def test_run_to_jsonl(self):
+        """Тест записи результатов в JSONL с подсчётом ошибок"""
+        output = io.StringIO()
+        calculator = BatchGeometryCalculator(chunk_size=2)
+        report = calculator.run(self.SPECS, output)
+        lines = [json.loads(line) for line in output.getvalue().splitlines()]
+        assert [line['type'] for line in lines] == ['Parallelepiped', 'Sphere']
+        assert lines[1]['parameters'] == {'radius': 0.05}
+        assert report['rows'] == 2
+        assert report['errors'] == 2
+        assert [line for line, _ in calculator.errors] == [4, 5]
+    
+    def test_run_to_database(self, tmp_path):
+        """Тест сохранения результатов в базу данных"""
+        with GeometryDatabase(str(tmp_path / "test.db")) as db:
+            BatchGeometryCalculator().run(self.SPECS, db=db)
+            assert db.get_statistics()['total_calculations'] == 2
+    
+    def test_materials_from_catalog(self, tmp_path):
+        """Тест что материалы берутся из каталога базы данных"""
+        with GeometryDatabase(str(tmp_path / "test.db")) as db:
+            db.add_material('Золото', 19300)
+            calculator = BatchGeometryCalculator(materials=db.materials)
+            report = calculator.run(self.SPECS, db=db)
+            assert report['errors'] == 1
+            assert db.get_all_calculations()[0]['material'] == 'Золото'
+    
+    def test_read_csv_specs(self, tmp_path):
+        """Тест чтения CSV с пустыми ячейками"""
+        path = tmp_path / "specs.csv"
+        path.write_text("shape,material,edge,radius\nTetrahedron,Сталь,1.5,\nSphere,Медь,,2\n",
+                        encoding='utf-8')
+        specs = list(read_specs(str(path)))
+        assert specs == [(2, {'shape': 'Tetrahedron', 'material': 'Сталь', 'edge': '1.5'}),
+                         (3, {'shape': 'Sphere', 'material': 'Медь', 'radius': '2'})]
+
+
+class TestExporters:
+    """Тесты потоковых экспортёров"""
+    
+    RECORDS = [
+        dict(Parallelepiped(2, 3, 4, Steel()).to_dict(), parameters={'length': 2, 'width': 3, 'height': 4}),
+        dict(Sphere(1, Copper()).to_dict(), parameters={'radius': 1}),
+    ]
+    
+    def test_csv_to_stream(self):
+        """Тест CSV: вложенные параметры записываются JSON-строкой"""
+        output = io.StringIO()
+        assert export_records(self.RECORDS, output, 'csv') == 2
+        lines = output.getvalue().splitlines()
+        assert lines[0] == 'type,volume,surface_area,mass,material,parameters'
+        assert lines[2].startswith('Sphere,4.1888,')
+        assert '"{""radius"": 1}"' in lines[2]
+    
+    def test_jsonl_to_file(self, tmp_path):
+        """Тест JSONL с выбором формата по расширению"""
+        path = tmp_path / "out.jsonl"
+        export_records(self.RECORDS, str(path))
+        lines = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+        assert lines == self.RECORDS
+    
+    def test_xlsx(self, tmp_path):
+        """Тест XLSX в режиме write-only"""
+        from openpyxl import load_workbook
+        path = tmp_path / "out.xlsx"
+        export_records(self.RECORDS, str(path))
+        rows = list(load_workbook(str(path)).active.values)
+        assert rows[0][0] == 'type'
+        assert rows[1][:3] == ('Parallelepiped', 24.0, 52.0)
+    
+    def test_docx(self, tmp_path):
+        """Тест таблицы в DOCX"""
+        from docx import Document
+        path = tmp_path / "out.docx"
+        export_records(self.RECORDS, str(path))
+        table = Document(str(path)).tables[0]
+        assert len(table.rows) == 3
+        assert table.rows[2].cells[0].text == 'Sphere'
+    
+    def test_parquet(self, tmp_path):
+        """Тест Parquet с несколькими row group"""
+        pq = pytest.importorskip("pyarrow.parquet")
+        path = tmp_path / "out.parquet"
+        with exporter_for(str(path)) as exporter:
+            exporter.batch_size = 1
+            exporter.write_many(self.RECORDS)
+        table = pq.read_table(str(path))
+        assert pq.ParquetFile(str(path)).num_row_groups == 2
+        assert table.column('volume').to_pylist() == [24.0, 4.1888]
+    
+    def test_unknown_format(self):
+        """Тест ошибок выбора формата"""
+        with pytest.raises(ValueError):
+            exporter_for("out.txt")
+        with pytest.raises(ValueError):
+            exporter_for(io.StringIO(), 'xlsx')
+        # Формат без _write_rows не создаётся
+        with pytest.raises(TypeError):
+            ReportExporter(io.StringIO())
+    
+    def test_export_calculations_from_database(self, tmp_path):
+        """Тест выгрузки истории страницами из базы данных"""
+        with GeometryDatabase(str(tmp_path / "test.db")) as db:
+            for radius in (1, 2, 3):
+                db.save_calculation(Sphere(radius, Steel()).to_dict(), {'radius': radius})
+            output = io.StringIO()
+            assert export_calculations(db, output, 'jsonl', page_size=2, material='Сталь') == 3
+        lines = [json.loads(line) for line in output.getvalue().splitlines()]
+        assert [line['parameters'] for line in lines] == [{'radius': 3}, {'radius': 2}, {'radius': 1}]
+        assert lines[0]['shape_type'] == 'Sphere'
+    
+    def test_jsonl_keeps_control_characters(self):
+        """Тест что символ NUL в полях не ломает вставку параметров в JSONL"""
+        with GeometryDatabase(":memory:") as db:
+            data = Sphere(1, Steel()).to_dict()
+            data['type'] = '\x00'
+            db.save_calculation(data, {'radius': '\x00'})
+            output = io.StringIO()
+            assert export_calculations(db, output, 'jsonl') == 1
+        line = json.loads(output.getvalue())
+        assert line['shape_type'] == '\x00'
+        assert line['parameters'] == {'radius': '\x00'}
+        assert line['material'] == 'Сталь'
+
+
+class TestBenchmarkRunner:
+    """Тесты запускателя замеров и сравнения с базой"""
+    
+    def test_measure_runs_setup_and_cleanup(self):
+        """Тест что замер готовит данные, повторяется и убирает за собой"""
+        calls = []
+        
+        def case(size):
+            calls.append('setup')
+            yield lambda: calls.append(size)
+            calls.append('cleanup')
+        
+        result = measure(Benchmark('case', case, params=[3], ops=lambda size: size, number=2),
+                         3, repeat=4)
+        assert calls.count('setup') == 1 and calls[-1] == 'cleanup'
+        assert calls.count(3) == 8
+        assert result['number'] == 2 and result['ops'] == 3
+        assert result['min'] <= result['median']
+    
+    def test_compare_with_baseline(self, tmp_path):
+        """Тест поиска регрессий относительно базовых результатов"""
+        def results(**medians):
+            return {'version': 1, 'benchmarks': {key: {'median': value} for key, value in medians.items()}}
+        
+        path = str(tmp_path / "baseline.json")
+        save_results(results(a=1.0, b=1.0, c=1.0), path)
+        rows = compare(results(a=1.05, b=1.5, c=0.5, d=1.0), load_results(path), threshold=0.1)
+        assert {row['key']: row['status'] for row in rows} == {
+            'a': 'ok', 'b': 'regression', 'c': 'improvement'}
+
+
+class TestInstrumentation:
+    """Тесты слоя замеров горячих путей"""
+    
+    def test_disabled_decorator_is_identity(self):
+        """Тест что выключенный декоратор возвращает саму функцию"""
+        def work():
+            return 42
+        assert timed('work', enabled=False)(work) is work
+        if not instrumentation.is_enabled():
+            assert timed('work')(work) is work
+            assert Shape3D.__dict__['to_dict'].__name__ == 'to_dict'
+            assert not hasattr(Shape3D.__dict__['to_dict'], '__wrapped__')
+    
+    def test_histogram_and_export(self):
+        """Тест гистограммы, счётчиков и форматов снимка"""
+        metrics = Metrics()
+        work = timed('work "fast"', metrics, enabled=True)(lambda x: x * 2)
+        assert [work(i) for i in range(3)] == [0, 2, 4]
+        metrics.increment('rows', 5)
+        metrics.register_collector(lambda: {'cache.size': 7})
+        
+        snapshot = json.loads(metrics.to_json())
+        operation = snapshot['operations']['work "fast"']
+        assert operation['count'] == 3
+        assert operation['buckets']['+Inf'] == 3
+        assert operation['min'] <= operation['mean'] <= operation['max']
+        assert snapshot['counters'] == {'rows': 5}
+        assert snapshot['gauges'] == {'cache.size': 7}
+        
+        text = metrics.to_prometheus()
+        assert '# TYPE geometry_operation_seconds histogram' in text
+        assert 'geometry_operation_seconds_count{operation="work \\"fast\\""} 3' in text
+        assert 'geometry_events_total{event="rows"} 5' in text
+    
+    def test_env_var_instruments_hot_paths(self):
+        """Тест что GEOMETRY_METRICS=1 включает замеры фигур и базы данных"""
+        code = ("from geometry_package import Sphere, Steel, ShapeCache, set_shape_cache\n"
+                "from geometry_package.instrumentation import METRICS\n"
+                "set_shape_cache(ShapeCache())\n"
+                "from database import GeometryDatabase\n"
+                "with GeometryDatabase(':memory:') as db:\n"
+                "    db.save_calculation(Sphere(1, Steel()).to_dict(), {'radius': 1})\n"
+                "print(METRICS.to_json(indent=None))\n")
+        env = dict(os.environ, GEOMETRY_METRICS='1')
+        output = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout
+        snapshot = json.loads(output)
+        assert snapshot['enabled'] is True
+        for operation in ('Sphere._calculate_volume', 'Shape3D.to_dict', 'GeometryDatabase._connect',
+                          'database._insert_calculations'):
+            assert snapshot['operations'][operation]['count'] >= 1
+        assert 'shape_cache.misses' in snapshot['gauges']
+    
+    def test_profile_and_memory_capture(self, tmp_path):
+        """Тест снятия профиля и памяти вокруг блока"""
+        path = str(tmp_path / "block.prof")
+        with ProfileCapture(path, limit=5) as profile:
+            records = [Sphere(i + 1.0, Steel()).to_dict() for i in range(2000)]
+        with MemoryCapture(limit=3) as memory:
+            shapes = [Sphere(i + 1.0, Steel()) for i in range(2000)]
+        assert len(records) == len(shapes) == 2000
+        assert os.path.getsize(path) > 0
+        assert 'to_dict' in profile.report()
+        assert memory.allocated > 0 and memory.peak >= memory.allocated
+        assert len(memory.top) <= 3
+
+
+class TestAsyncGeometryDatabase:
+    """Тесты асинхронной обёртки базы данных"""
+    
+    @staticmethod
+    def _blocking_records(gate, count=1):
+        # Записи пакета, которые держат поток-писатель до gate.set()
+        gate.wait(5)
+        for r in range(1, count + 1):
+            yield Sphere(r, Steel()).to_dict(), {'radius': r}
+    
+    def test_save_page_and_statistics(self, tmp_path):
+        """Тест параллельной записи, постраничного чтения и статистики"""
+        async def scenario():
+            async with AsyncGeometryDatabase(str(tmp_path / "test.db"), readers=2) as db:
+                await asyncio.gather(*(db.save_calculation(Sphere(r, Copper()).to_dict(), {'radius': r})
+                                       for r in range(1, 41)))
+                report = await db.save_calculations_bulk(
+                    ((Tetrahedron(r, Steel()).to_dict(), {'edge': r}) for r in range(1, 11)), chunk_size=3)
+                page, after = await db.get_calculations_page(5, shape_type='Sphere')
+                rows = [row async for row in db.iter_calculations(page_size=7)]
+                stats, shapes = await asyncio.gather(db.get_statistics(), db.get_shape_statistics())
+                return report, page, after, rows, stats, shapes
+        report, page, after, rows, stats, shapes = asyncio.run(scenario())
+        assert report['rows'] == 10
+        assert len(page) == 5 and after == page[-1]['id']
+        assert len(rows) == 50 and rows[0]['shape_type'] == 'Tetrahedron'
+        assert stats['total_calculations'] == 50
+        assert {row['shape_type']: row['count'] for row in shapes} == {'Sphere': 40, 'Tetrahedron': 10}
+    
+    def test_backpressure_limits_pending_writes(self, tmp_path):
+        """Тест что при заполненной очереди запись ждёт, а после освобождения проходит"""
+        gate = threading.Event()
+        
+        async def scenario():
+            async with AsyncGeometryDatabase(str(tmp_path / "test.db"), max_pending=2) as db:
+                bulk = asyncio.ensure_future(db.save_calculations_bulk(self._blocking_records(gate)))
+                await asyncio.sleep(0)
+                first = await db.submit_calculation(Sphere(2, Steel()).to_dict(), {'radius': 2})
+                assert db.pending == 2
+                with pytest.raises(asyncio.TimeoutError):
+                    await asyncio.wait_for(db.submit_calculation(Sphere(3, Steel()).to_dict(), {}), 0.05)
+                gate.set()
+                await bulk
+                await first
+                await db.save_calculation(Sphere(4, Steel()).to_dict(), {'radius': 4})
+                await db.flush()
+                assert db.pending == 0
+                return (await db.get_statistics())['total_calculations']
+        assert asyncio.run(scenario()) == 3
+    
+    def test_concurrent_flush(self, tmp_path):
+        """Тест что несколько одновременных flush не блокируют друг друга"""
+        async def scenario():
+            async with AsyncGeometryDatabase(str(tmp_path / "test.db"), max_pending=4) as db:
+                for r in range(1, 5):
+                    await db.submit_calculation(Sphere(r, Steel()).to_dict(), {'radius': r})
+                await asyncio.wait_for(asyncio.gather(db.flush(), db.flush()), 5)
+                assert db.pending == 0
+                await asyncio.wait_for(db.flush(), 5)
+                return (await db.get_statistics())['total_calculations']
+        assert asyncio.run(scenario()) == 4
+    
+    def test_cancelled_writes_are_skipped_or_rolled_back(self, tmp_path):
+        """Тест отмены: запись из очереди не выполняется, пакет откатывается целиком"""
+        gate = threading.Event()
+        
+        async def scenario():
+            async with AsyncGeometryDatabase(str(tmp_path / "test.db")) as db:
+                blocker = asyncio.ensure_future(db.save_calculations_bulk(self._blocking_records(gate)))
+                queued = asyncio.ensure_future(db.save_calculation(Sphere(5, Steel()).to_dict(), {'radius': 5}))
+                await asyncio.sleep(0.01)
+                queued.cancel()
+                await asyncio.sleep(0)
+                gate.set()
+                await blocker
+                
+                started = threading.Event()
+                
+                def slow_records():
+                    for r in range(1, 1001):
+                        if r == 10:
+                            started.set()
+                            time.sleep(0.05)
+                        yield Sphere(r, Steel()).to_dict(), {'radius': r}
+                bulk = asyncio.ensure_future(db.save_calculations_bulk(slow_records(), chunk_size=5))
+                await asyncio.to_thread(started.wait, 5)
+                bulk.cancel()
+                await db.flush()
+                return queued.cancelled(), bulk.cancelled(), (await db.get_statistics())['total_calculations']
+        assert asyncio.run(scenario()) == (True, True, 1)
+    
+    def test_cancelled_read_is_interrupted(self, tmp_path):
+        """Тест что отменённое чтение прерывает запрос и не занимает поток"""
+        slow = ('WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) '
+                'SELECT count(*) FROM n')
+        
+        async def scenario():
+            async with AsyncGeometryDatabase(str(tmp_path / "test.db"), readers=1) as db:
+                with pytest.raises(asyncio.TimeoutError):
+                    await asyncio.wait_for(db._read(lambda: db.database.connection.execute(slow).fetchone()), 0.1)
+                return await asyncio.wait_for(db.get_statistics(), 2)
+        assert asyncio.run(scenario())['total_calculations'] == 0
+        with pytest.raises(ValueError):
+            AsyncGeometryDatabase(":memory:")
+
+
+class TestMathKernels:
+    """Тесты ядер длинной арифметики"""
+    
+    def test_task_wrappers_keep_results(self):
+        """Тест что функции task.py возвращают прежние типы и значения"""
+        import task
+        assert task.fast_power(2, -2) == 0.25 and isinstance(task.fast_power(2, -2), float)
+        assert task.fast_power(2, 10) == 1024 and isinstance(task.fast_power(2, 10), int)
+        assert task.fast_power(1.5, 2) == 2.25
+        assert task.nth_root_newton(27, 3) == pytest.approx(3)
+        assert task.nth_root_newton(-8, 3) == pytest.approx(-2)
+        assert task.nth_root_newton(16.0, 2.0) == pytest.approx(4)
+        with pytest.raises(ValueError):
+            task.nth_root_newton(-16, 2)
+        # Отрицательный множитель: прежний цикл возвращал 0, теперь - произведение
+        assert task.fast_multiply(13, -17) == -221
+    
+    def test_multiplication_matches_builtin(self):
+        """Тест Карацубы и Toom-3 на числах разных знаков и длины"""
+        rng = random.Random(7)
+        for _ in range(50):
+            a = rng.getrandbits(rng.randrange(1, 5000)) * rng.choice((1, -1))
+            b = rng.getrandbits(rng.randrange(1, 5000)) * rng.choice((1, -1))
+            assert karatsuba_multiply(a, b, cutoff=64) == a * b
+            assert toom3_multiply(a, b, cutoff=64) == a * b
+        a = rng.getrandbits(math_kernels.TOOM3_THRESHOLD + 1000)
+        b = -rng.getrandbits(math_kernels.TOOM3_THRESHOLD + 10)
+        assert fast_multiply(a, b) == a * b
+        assert fast_square(b) == b * b
+    
+    def test_fast_power(self):
+        """Тест степени по модулю, отрицательных степеней и нецелых оснований"""
+        assert fast_power(3, 200, 1000007) == pow(3, 200, 1000007)
+        assert fast_power(3, -1, 7) == 5
+        assert fast_power(2, -3) == Fraction(1, 8)
+        assert fast_power(Fraction(2, 3), 3) == Fraction(8, 27)
+        assert fast_power(Decimal(2), 10, 1000) == Decimal(24)
+        assert fast_power(1.5, 2) == 2.25
+        with pytest.raises(ValueError):
+            fast_power(2, -1, 4)
+        with pytest.raises(ValueError):
+            fast_power(2, 3, 0)
+    
+    def test_integer_nth_root_is_exact(self):
+        """Тест что целый корень точен там, где float теряет знаки"""
+        rng = random.Random(3)
+        for _ in range(100):
+            x = rng.getrandbits(rng.randrange(1, 3000))
+            n = rng.randrange(1, 12)
+            r = integer_nth_root(x, n)
+            assert r ** n <= x < (r + 1) ** n
+        big = 10 ** 200 + 12345
+        assert integer_nth_root(big ** 3, 3) == big
+        assert integer_nth_root(big ** 3 - 1, 3) == big - 1
+        assert integer_nth_root(-27, 3) == -3
+        assert is_perfect_power(3 ** 300, 100) and not is_perfect_power(3 ** 300 + 1, 100)
+        with pytest.raises(ValueError):
+            integer_nth_root(-16, 4)
+    
+    def test_nth_root_digits(self):
+        """Тест корня с заданным числом знаков"""
+        assert str(nth_root(2, 2, 30)) == '1.41421356237309504880168872420'
+        assert nth_root(27, 3) == 3
+        assert nth_root(-8, 3) == -2
+        assert str(nth_root(1e-10, 2, 5)) == '0.000010000'
+        assert nth_root(10 ** 400, 4, 10) == Decimal('1E+100')
 
 if __name__ == "__main__":
     # Запуск тестов напрямую
@@ -1,81 +1,445 @@
-import sqlite3
+import atexit
+import json
 import logging
+import queue
+import re
+import sqlite3
+import threading
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
 from models import Artwork, ValidationError
 
+LOG_FILE = 'gallery_activity.log'
+
+PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('temp_store', 'MEMORY'),
+    ('cache_size', -64000),
+    ('mmap_size', 268435456),
+    ('foreign_keys', 'ON'),
+)
+
+CREATE_ARTWORKS_SQL = '''
+    CREATE TABLE IF NOT EXISTS artworks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        artist TEXT NOT NULL,
+        year INTEGER NOT NULL,
+        style TEXT NOT NULL,
+        price REAL NOT NULL,
+        created_at TEXT NOT NULL
+    )
+'''
+
+INSERT_ARTWORK_SQL = '''
+    INSERT INTO artworks (title, artist, year, style, price, created_at)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+SELECT_ARTWORKS_SQL = '''
+    SELECT id, title, artist, year, style, price, created_at
+    FROM artworks ORDER BY id DESC
+'''
+
+SELECT_ARTWORK_ROWS_SQL = '''
+    SELECT id, title, artist, year, style, price, created_at
+    FROM artworks WHERE id < ? ORDER BY id DESC LIMIT ?
+'''
+
+SELECT_ARTWORK_RANGE_SQL = '''
+    SELECT id, title, artist, year, style, price, created_at
+    FROM artworks WHERE id BETWEEN ? AND ? ORDER BY id DESC
+'''
+
+# Строки по списку id (окно кэша в режиме поиска, где id идут с пропусками).
+# Список передаётся одним JSON-параметром, поэтому текст запроса не зависит от
+# размера окна и остаётся в кэше выражений; каждый id - поиск по первичному ключу
+SELECT_ARTWORKS_BY_IDS_SQL = '''
+    SELECT id, title, artist, year, style, price, created_at
+    FROM artworks WHERE id IN (SELECT value FROM json_each(?)) ORDER BY id DESC
+'''
+
+DELETE_ARTWORK_SQL = 'DELETE FROM artworks WHERE id = ?'
+
+# Подпись таблицы для проверки согласованности. COUNT(*) просматривает весь
+# индекс (~180 мс на 2 млн строк), поэтому число строк ведут триггеры в
+# отдельной таблице; MAX(id) - один переход по первичному ключу
+CREATE_COUNT_SQL = '''
+    CREATE TABLE IF NOT EXISTS artworks_count (
+        id INTEGER PRIMARY KEY CHECK (id = 0),
+        count INTEGER NOT NULL
+    )
+'''
+
+INIT_COUNT_SQL = 'INSERT OR IGNORE INTO artworks_count (id, count) SELECT 0, COUNT(*) FROM artworks'
+
+COUNT_TRIGGERS = [
+    '''CREATE TRIGGER IF NOT EXISTS artworks_count_insert AFTER INSERT ON artworks BEGIN
+        UPDATE artworks_count SET count = count + 1 WHERE id = 0;
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS artworks_count_delete AFTER DELETE ON artworks BEGIN
+        UPDATE artworks_count SET count = count - 1 WHERE id = 0;
+    END''',
+]
+
+TABLE_SIGNATURE_SQL = '''
+    SELECT (SELECT count FROM artworks_count WHERE id = 0), (SELECT MAX(id) FROM artworks)
+'''
+
+# Полнотекстовый поиск: внешнее содержимое FTS5 поверх artworks, синхронизация
+# триггерами. Префиксные индексы до 6 символов держат подсказки при наборе
+# быстрыми: неполное последнее слово ищется по префиксу
+CREATE_SEARCH_SQL = '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS artworks_fts USING fts5(
+        title, artist, style,
+        content='artworks', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3 4 5 6'
+    )
+'''
+
+# Самый короткий префикс из индекса выше
+MIN_PREFIX = 2
+
+SEARCH_TRIGGERS = [
+    '''CREATE TRIGGER IF NOT EXISTS artworks_fts_insert AFTER INSERT ON artworks BEGIN
+        INSERT INTO artworks_fts (rowid, title, artist, style)
+        VALUES (new.id, new.title, new.artist, new.style);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS artworks_fts_delete AFTER DELETE ON artworks BEGIN
+        INSERT INTO artworks_fts (artworks_fts, rowid, title, artist, style)
+        VALUES ('delete', old.id, old.title, old.artist, old.style);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS artworks_fts_update AFTER UPDATE OF title, artist, style ON artworks BEGIN
+        INSERT INTO artworks_fts (artworks_fts, rowid, title, artist, style)
+        VALUES ('delete', old.id, old.title, old.artist, old.style);
+        INSERT INTO artworks_fts (rowid, title, artist, style)
+        VALUES (new.id, new.title, new.artist, new.style);
+    END''',
+]
+
+FACET_INDEXES = [
+    'CREATE INDEX IF NOT EXISTS idx_artworks_style ON artworks (style)',
+    'CREATE INDEX IF NOT EXISTS idx_artworks_year ON artworks (year)',
+    'CREATE INDEX IF NOT EXISTS idx_artworks_price ON artworks (price)',
+]
+
+# Различные стили прыжками по индексу: по одному поиску на стиль вместо
+# просмотра всего индекса
+DISTINCT_STYLES_SQL = '''
+    WITH RECURSIVE styles (style) AS (
+        SELECT MIN(style) FROM artworks
+        UNION ALL
+        SELECT (SELECT MIN(style) FROM artworks WHERE style > styles.style)
+        FROM styles WHERE style IS NOT NULL
+    )
+    SELECT style FROM styles WHERE style IS NOT NULL
+'''
+
+ARTWORK_COLUMNS = 'a.id, a.title, a.artist, a.year, a.style, a.price, a.created_at'
+
+# Границы диапазонов цен для фасета (последний - без верхней границы)
+PRICE_RANGES = [(0, 1000), (1000, 10000), (10000, 100000), (100000, 1000000), (1000000, None)]
+
+MAX_ID = 2 ** 63 - 1
+
+logger = logging.getLogger('gallery')
+_log_listener = None
+
+
+def _start_log_listener(filename):
+    global _log_listener
+    if _log_listener is not None:
+        return
+    handler = logging.FileHandler(filename, encoding='utf-8', delay=True)
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    log_queue = queue.SimpleQueue()
+    _log_listener = QueueListener(log_queue, handler)
+    _log_listener.start()
+    atexit.register(_stop_log_listener)
+    logger.addHandler(QueueHandler(log_queue))
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def _stop_log_listener():
+    global _log_listener
+    if _log_listener is not None:
+        _log_listener.stop()
+        _log_listener = None
+        for handler in logger.handlers[:]:
+            if isinstance(handler, QueueHandler):
+                logger.removeHandler(handler)
+
+
+def search_expression(text):
+    # Строка поиска -> запрос FTS5: слова в кавычках (операторы FTS не
+    # срабатывают), все слова обязательны, недописанное последнее - по префиксу.
+    # Префикс короче MIN_PREFIX пропускается: в индексе префиксов его нет, а
+    # поиск по нему перебирал бы почти все термины
+    words = re.findall(r'\w+', text.lower())
+    prefix = bool(words) and not text[-1:].isspace()
+    if prefix and len(words[-1]) < MIN_PREFIX:
+        words.pop()
+        prefix = False
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    if prefix:
+        terms[-1] += '*'
+    return ' '.join(terms)
+
+
 class DatabaseError(Exception):
     pass
 
 class DatabaseManager:
-    def __init__(self, db_name="art_gallery.db"):
+    def __init__(self, db_name="art_gallery.db", cached_statements=64):
         self.db_name = db_name
+        self.cached_statements = cached_statements
+        self._connections = {}
+        self._connections_lock = threading.Lock()
+        self._listeners = []
         self.setup_database()
         self.setup_logging()
-    
+
     def setup_logging(self):
-        logging.basicConfig(
-            filename='gallery_activity.log',
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s'
-        )
-    
+        _start_log_listener(LOG_FILE)
+
+    @property
+    def connection(self):
+        # Своё соединение у каждого потока: фоновые запросы интерфейса читают
+        # параллельно с основным потоком (WAL). Ключ - id потока, а не
+        # threading.local: в потоках QThreadPool состояние Python-потока
+        # создаётся заново на каждую задачу, и локальные данные теряются
+        thread_id = threading.get_ident()
+        conn = self._connections.get(thread_id)
+        if conn is None:
+            try:
+                conn = sqlite3.connect(self.db_name, check_same_thread=False,
+                                       cached_statements=self.cached_statements)
+                for name, value in PRAGMAS:
+                    conn.execute(f'PRAGMA {name} = {value}')
+            except sqlite3.Error as e:
+                raise DatabaseError(f"Ошибка подключения к базе данных: {e}")
+            with self._connections_lock:
+                self._connections[thread_id] = conn
+        return conn
+
+    def close_thread_connection(self):
+        with self._connections_lock:
+            conn = self._connections.pop(threading.get_ident(), None)
+        if conn is not None:
+            conn.close()
+
+    def close(self):
+        with self._connections_lock:
+            connections, self._connections = list(self._connections.values()), {}
+        for conn in connections:
+            try:
+                conn.execute('PRAGMA optimize')
+            except sqlite3.Error:
+                pass
+            conn.close()
+
+    def interrupt(self, thread_id=None):
+        # Прерывает выполняющиеся запросы всех соединений или только соединения
+        # потока thread_id (безопасно из другого потока)
+        with self._connections_lock:
+            if thread_id is None:
+                connections = list(self._connections.values())
+            else:
+                connections = [self._connections[thread_id]] if thread_id in self._connections else []
+        for conn in connections:
+            conn.interrupt()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add_listener(self, callback):
+        # callback(event, artwork_id) после фиксации изменения: event - 'inserted'
+        # или 'deleted'. Вызывается в потоке, который выполнил запись
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _notify(self, event, artwork_id):
+        for callback in list(self._listeners):
+            try:
+                callback(event, artwork_id)
+            except Exception:
+                logger.exception("Listener failed on %s %s", event, artwork_id)
+
     def setup_database(self):
         try:
-            with sqlite3.connect(self.db_name) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS artworks (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        title TEXT NOT NULL,
-                        artist TEXT NOT NULL,
-                        year INTEGER NOT NULL,
-                        style TEXT NOT NULL,
-                        price REAL NOT NULL,
-                        created_at TEXT NOT NULL
-                    )
-                ''')
-                conn.commit()
+            with self.connection as conn:
+                conn.execute(CREATE_ARTWORKS_SQL)
+                has_search = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'artworks_fts'").fetchone()
+                conn.execute(CREATE_SEARCH_SQL)
+                for sql in SEARCH_TRIGGERS + FACET_INDEXES:
+                    conn.execute(sql)
+                conn.execute(CREATE_COUNT_SQL)
+                conn.execute(INIT_COUNT_SQL)
+                for sql in COUNT_TRIGGERS:
+                    conn.execute(sql)
+                if not has_search:
+                    conn.execute("INSERT INTO artworks_fts (artworks_fts) VALUES ('rebuild')")
         except sqlite3.Error as e:
             raise DatabaseError(f"Ошибка создания базы данных: {e}")
-    
+
+    def rebuild_search_index(self):
+        try:
+            with self.connection as conn:
+                conn.execute("INSERT INTO artworks_fts (artworks_fts) VALUES ('rebuild')")
+                conn.execute("INSERT INTO artworks_fts (artworks_fts) VALUES ('optimize')")
+        except sqlite3.Error as e:
+            raise DatabaseError(f"Ошибка перестроения поискового индекса: {e}")
+
     def add_artwork(self, artwork: Artwork):
         artwork.validate()
         try:
-            with sqlite3.connect(self.db_name) as conn:
-                cursor = conn.cursor()
-                current_time = datetime.now().strftime("%d.%m.%Y %H:%M")
-                cursor.execute('''
-                    INSERT INTO artworks (title, artist, year, style, price, created_at)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (artwork.title, artwork.artist, artwork.year, artwork.style, 
-                      artwork.price, current_time))
-                conn.commit()
-                
-                logging.info(f"Added artwork: {artwork.title} by {artwork.artist}")
-                return cursor.lastrowid
+            conn = self.connection
+            current_time = datetime.now().strftime("%d.%m.%Y %H:%M")
+            with conn:
+                cursor = conn.execute(INSERT_ARTWORK_SQL, (artwork.title, artwork.artist, artwork.year,
+                                                           artwork.style, artwork.price, current_time))
+            logger.info("Added artwork: %s by %s", artwork.title, artwork.artist)
         except sqlite3.Error as e:
             raise DatabaseError(f"Ошибка добавления произведения: {e}")
-    
+        self._notify('inserted', cursor.lastrowid)
+        return cursor.lastrowid
+
     def get_all_artworks(self):
         try:
-            with sqlite3.connect(self.db_name) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT id, title, artist, year, style, price, created_at 
-                    FROM artworks ORDER BY id DESC
-                ''')
-                rows = cursor.fetchall()
-                return [Artwork(*row) for row in rows]
+            rows = self.connection.execute(SELECT_ARTWORKS_SQL).fetchall()
+            return [Artwork(*row) for row in rows]
         except sqlite3.Error as e:
             raise DatabaseError(f"Ошибка получения данных: {e}")
-    
+
+    def get_artwork_rows(self, limit: int, before_id=None):
+        if before_id is None:
+            before_id = MAX_ID
+        try:
+            return self.connection.execute(SELECT_ARTWORK_ROWS_SQL, (before_id, limit)).fetchall()
+        except sqlite3.Error as e:
+            raise DatabaseError(f"Ошибка получения данных: {e}")
+
+    def get_artwork_rows_between(self, low_id: int, high_id: int):
+        try:
+            return self.connection.execute(SELECT_ARTWORK_RANGE_SQL, (low_id, high_id)).fetchall()
+        except sqlite3.Error as e:
+            raise DatabaseError(f"Ошибка получения данных: {e}")
+
+    def get_artwork_rows_by_ids(self, ids):
+        try:
+            return self.connection.execute(SELECT_ARTWORKS_BY_IDS_SQL, (json.dumps(list(ids)),)).fetchall()
+        except sqlite3.Error as e:
+            raise DatabaseError(f"Ошибка получения данных: {e}")
+
     def delete_artwork(self, artwork_id: int):
         try:
-            with sqlite3.connect(self.db_name) as conn:
-                cursor = conn.cursor()
-                cursor.execute('DELETE FROM artworks WHERE id = ?', (artwork_id,))
-                conn.commit()
-                logging.info(f"Deleted artwork with ID: {artwork_id}")
+            with self.connection as conn:
+                cursor = conn.execute(DELETE_ARTWORK_SQL, (artwork_id,))
+            logger.info("Deleted artwork with ID: %s", artwork_id)
         except sqlite3.Error as e:
             raise DatabaseError(f"Ошибка удаления произведения: {e}")
-   
\ No newline at end of file
+        if cursor.rowcount:
+            self._notify('deleted', artwork_id)
+
+    def get_table_signature(self):
+        # (число произведений, наибольший id) - дешёвая проверка, что таблица
+        # не менялась в обход событий
+        try:
+            count, max_id = self.connection.execute(TABLE_SIGNATURE_SQL).fetchone()
+            return count, max_id or 0
+        except sqlite3.Error as e:
+            raise DatabaseError(f"Ошибка получения данных: {e}")
+
+    def _search_source(self, text):
+        expression = search_expression(text or '')
+        if expression is None:
+            return 'artworks a', 'a.id', [], []
+        # Совпадения FTS5 идут в порядке rowid, поэтому сортировка по f.rowid с
+        # LIMIT не требует перебора всех совпадений
+        return ('artworks_fts f JOIN artworks a ON a.id = f.rowid', 'f.rowid',
+                ['artworks_fts MATCH ?'], [expression])
+
+    @staticmethod
+    def _facet_filters(style=None, year_from=None, year_to=None, price_from=None, price_to=None,
+                       exclude=None):
+        clauses, params = [], []
+        if style and exclude != 'style':
+            clauses.append('a.style = ?')
+            params.append(style)
+        if exclude != 'year':
+            if year_from is not None:
+                clauses.append('a.year >= ?')
+                params.append(year_from)
+            if year_to is not None:
+                clauses.append('a.year <= ?')
+                params.append(year_to)
+        if exclude != 'price':
+            if price_from is not None:
+                clauses.append('a.price >= ?')
+                params.append(price_from)
+            if price_to is not None:
+                clauses.append('a.price <= ?')
+                params.append(price_to)
+        return clauses, params
+
+    def search_artworks(self, text='', limit=50, before_id=None, **filters):
+        # Страница результатов поиска по id DESC (ключ - before_id, как у get_artwork_rows)
+        source, key, clauses, params = self._search_source(text)
+        filter_clauses, filter_params = self._facet_filters(**filters)
+        clauses += filter_clauses
+        params += filter_params
+        if before_id is not None:
+            clauses.append(f'{key} < ?')
+            params.append(before_id)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        sql = f'SELECT {ARTWORK_COLUMNS} FROM {source} {where} ORDER BY {key} DESC LIMIT ?'
+        try:
+            return self.connection.execute(sql, params + [limit]).fetchall()
+        except sqlite3.Error as e:
+            raise DatabaseError(f"Ошибка поиска: {e}")
+
+    def get_facets(self, text='', **filters):
+        # Счётчики по стилям, десятилетиям и диапазонам цен для текущего поиска.
+        # Фильтр самого фасета не применяется, чтобы были видны соседние значения
+        source, _, search_clauses, search_params = self._search_source(text)
+        price_case = ' '.join(
+            f'WHEN a.price < {high} THEN {number}' for number, (_, high) in enumerate(PRICE_RANGES)
+            if high is not None)
+        groups = {
+            'style': 'a.style',
+            'year': 'a.year / 10 * 10',
+            'price': f'CASE {price_case} ELSE {len(PRICE_RANGES) - 1} END',
+        }
+        facets = {}
+        try:
+            for name, expression in groups.items():
+                clauses, params = self._facet_filters(exclude=name, **filters)
+                clauses = search_clauses + clauses
+                where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+                rows = self.connection.execute(
+                    f'SELECT {expression} AS value, COUNT(*) FROM {source} {where} GROUP BY value',
+                    search_params + params).fetchall()
+                facets[name] = rows
+        except sqlite3.Error as e:
+            raise DatabaseError(f"Ошибка подсчёта фасетов: {e}")
+        facets['style'].sort(key=lambda item: (-item[1], item[0]))
+        facets['year'].sort()
+        facets['price'] = [(PRICE_RANGES[number], count) for number, count in sorted(facets['price'])]
+        return facets
+
+    def get_styles(self):
+        try:
+            return [row[0] for row in self.connection.execute(DISTINCT_STYLES_SQL)]
+        except sqlite3.Error as e:
+            raise DatabaseError(f"Ошибка получения стилей: {e}")
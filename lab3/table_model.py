@@ -0,0 +1,283 @@
+from array import array
+from collections import OrderedDict
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, Signal
+
+HEADERS = ["ID", "Название", "Художник", "Год", "Стиль", "Цена (€)", "Дата добавления"]
+
+
+def format_cell(row, column):
+    value = row[column]
+    if column == 0 or column == 3:
+        return str(value)
+    if column == 5:
+        return f"{value:,.2f}"
+    return value
+
+
+class ArtworkTableModel(QAbstractTableModel):
+    # Ленивая модель таблицы: строки подгружаются окнами по page_size через
+    # fetchMore (по ключу id, без OFFSET). Для загруженных строк хранятся только
+    # id, сами строки лежат в кэше последних cache_windows окон (id -> строка) и
+    # при вытеснении перечитываются одним запросом по диапазону id.
+    # С worker (DatabaseWorker) все запросы идут в фоне: страница добавляется,
+    # когда придёт ответ, а ячейки перечитываемого окна до ответа пустые.
+    # Добавления и удаления приходят событиями базы и вставляют или убирают одну
+    # строку; полная перезагрузка - только если check_consistency() заметит
+    # изменения в обход событий
+    error = Signal(str)
+    artwork_changed = Signal(str, object)
+
+    def __init__(self, db, worker=None, page_size=256, cache_windows=64, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.worker = worker
+        self.page_size = page_size
+        self.cache_windows = cache_windows
+        self._ids = array('q')
+        self._cache = OrderedDict()
+        self._exhausted = False
+        self._fetching = False
+        self._generation = 0
+        self._replay = None
+        self._expected = None
+        self.search = {}
+        # Событие приходит из потока записи, сигнал доставляет его в поток модели
+        self.artwork_changed.connect(self._apply_change)
+        db.add_listener(self.artwork_changed.emit)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._ids)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.UserRole):
+            return None
+        if role == Qt.UserRole:
+            return self._ids[index.row()]
+        row = self.row_values(index.row())
+        if row is None:
+            return None
+        return format_cell(row, index.column())
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted and not self._fetching
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        before_id = self._ids[-1] if self._ids else None
+        if self.worker is None:
+            self._append_page(self._generation, self._fetch_rows(self.search, before_id))
+            return
+        self._fetching = True
+        generation = self._generation
+        self.worker.read('table.page', self._fetch_rows, self.search, before_id,
+                         on_result=lambda rows: self._append_page(generation, rows),
+                         on_error=lambda message: self._on_error(generation, message))
+
+    def load(self, search=None):
+        # Первая страница (заново или для нового поиска); прежние ответы устаревают
+        search = self.search if search is None else dict(search)
+        if self.worker is None:
+            self.set_search(search, self._fetch_rows(search, None))
+            return
+        self._generation += 1
+        self._fetching = True
+        self._replay = []
+        self.worker.cancel('table.page')
+        generation = self._generation
+        self.worker.read('table.search', self._fetch_rows, search, None,
+                         on_result=lambda rows: self._apply_search(generation, search, rows),
+                         on_error=lambda message: self._on_error(generation, message))
+
+    def reload(self):
+        self._expected = None
+        self.load()
+        self.check_consistency()
+
+    def check_consistency(self):
+        # Подпись таблицы читается в потоке записи: события всех записей, начатых
+        # раньше, к этому моменту уже отправлены, и сравнение не даёт ложных срабатываний
+        if self.worker is None:
+            self._apply_signature(self.db.get_table_signature())
+            return
+        self.worker.write(self.db.get_table_signature, on_result=self._apply_signature,
+                          on_error=lambda message: self._on_error(self._generation, message))
+
+    def set_search(self, search, rows):
+        # Новый поиск с уже полученной первой страницей результатов
+        self.beginResetModel()
+        self._generation += 1
+        self.search = dict(search)
+        self._ids = array('q', (row[0] for row in rows))
+        self._cache.clear()
+        if rows:
+            self._store_window(0, {row[0]: row for row in rows})
+        self._exhausted = len(rows) < self.page_size
+        self._fetching = False
+        self.endResetModel()
+
+    def artwork_id(self, row):
+        return self._ids[row]
+
+    def row_values(self, row):
+        # После вставок и удалений строки сдвигаются, поэтому строка ищется по id
+        # в своём окне и в соседних; промах - перечитывание окна
+        artwork_id = self._ids[row]
+        window = row // self.page_size
+        for cached in (window, window - 1, window + 1):
+            rows = self._cache.get(cached)
+            if rows is not None and artwork_id in rows:
+                self._cache.move_to_end(cached)
+                return rows[artwork_id]
+        start = window * self.page_size
+        ids = self._ids[start:start + self.page_size]
+        if self.worker is None:
+            return self._store_window(window, self._read_window(ids))[artwork_id]
+        key = f'table.window.{window}'
+        if not self.worker.is_pending(key):
+            generation = self._generation
+            self.worker.read(key, self._read_window, ids,
+                             on_result=lambda rows: self._apply_window(generation, window, rows),
+                             on_error=lambda message: self._on_error(generation, message))
+        return None
+
+    def _fetch_rows(self, search, before_id):
+        if search:
+            return self.db.search_artworks(limit=self.page_size, before_id=before_id, **search)
+        return self.db.get_artwork_rows(self.page_size, before_id)
+
+    def _read_window(self, ids):
+        # По списку id, а не диапазоном: в режиме поиска между соседними
+        # строками окна могут лежать сотни тысяч несовпавших
+        found = {row[0]: row for row in self.db.get_artwork_rows_by_ids(ids)}
+        # Удалённая в другом месте строка остаётся пустой до следующего обновления
+        return {artwork_id: found.get(artwork_id) for artwork_id in ids}
+
+    def _append_page(self, generation, rows):
+        if generation != self._generation:
+            return
+        self._fetching = False
+        if len(rows) < self.page_size:
+            self._exhausted = True
+        if not rows:
+            return
+        start = len(self._ids)
+        self.beginInsertRows(QModelIndex(), start, start + len(rows) - 1)
+        self._ids.extend(row[0] for row in rows)
+        self._store_window(start // self.page_size, {row[0]: row for row in rows})
+        self.endInsertRows()
+
+    def _apply_search(self, generation, search, rows):
+        if generation != self._generation:
+            return
+        # Изменения, пришедшие во время запроса, могли в ответ не попасть
+        replay, self._replay = self._replay or [], None
+        self.set_search(search, rows)
+        for event, artwork_id in replay:
+            self._apply_change(event, artwork_id)
+
+    def _apply_window(self, generation, window, rows):
+        if generation != self._generation:
+            return
+        self._store_window(window, rows)
+        start = window * self.page_size
+        end = min(start + self.page_size, len(self._ids)) - 1
+        if start <= end:
+            self.dataChanged.emit(self.index(start, 0), self.index(end, len(HEADERS) - 1))
+
+    def _apply_change(self, event, artwork_id):
+        if self._replay is not None:
+            self._replay.append((event, artwork_id))
+        if self._expected is not None:
+            count, max_id = self._expected
+            if event == 'inserted':
+                self._expected = (count + 1, max_id if max_id is None else max(max_id, artwork_id))
+            else:
+                # Новый наибольший id после удаления прежнего неизвестен до проверки
+                self._expected = (count - 1, None if artwork_id == max_id else max_id)
+        if event == 'deleted':
+            self._remove_row(artwork_id)
+        elif not self.search:
+            self._insert_row(artwork_id)
+        else:
+            self._insert_match(artwork_id)
+
+    def _insert_match(self, artwork_id):
+        # Подходит ли новое произведение под текущий поиск - запрос одной строки
+        generation = self._generation
+
+        def apply(rows):
+            if generation == self._generation and rows and rows[0][0] == artwork_id:
+                self._insert_row(artwork_id, rows[0])
+
+        if self.worker is None:
+            apply(self._match_rows(self.search, artwork_id))
+            return
+        self.worker.read(f'table.match.{artwork_id}', self._match_rows, self.search, artwork_id,
+                         on_result=apply,
+                         on_error=lambda message: self._on_error(generation, message))
+
+    def _match_rows(self, search, artwork_id):
+        return self.db.search_artworks(limit=1, before_id=artwork_id + 1, **search)
+
+    def _position(self, artwork_id):
+        # Место id в убывающем массиве: число загруженных id больше него
+        low, high = 0, len(self._ids)
+        while low < high:
+            middle = (low + high) // 2
+            if self._ids[middle] > artwork_id:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _insert_row(self, artwork_id, values=None):
+        row = self._position(artwork_id)
+        if row < len(self._ids) and self._ids[row] == artwork_id:
+            return
+        if row == len(self._ids) and not self._exhausted:
+            # Ниже загруженного - придёт со следующей страницей
+            return
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._ids.insert(row, artwork_id)
+        if values is not None:
+            rows = self._cache.get(row // self.page_size)
+            if rows is not None:
+                rows[artwork_id] = values
+        self.endInsertRows()
+
+    def _remove_row(self, artwork_id):
+        row = self._position(artwork_id)
+        if row == len(self._ids) or self._ids[row] != artwork_id:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._ids[row]
+        self.endRemoveRows()
+
+    def _apply_signature(self, signature):
+        expected, self._expected = self._expected, signature
+        if expected is None:
+            return
+        count, max_id = expected
+        if signature[0] != count or (max_id is not None and signature[1] != max_id):
+            self.reload()
+
+    def _on_error(self, generation, message):
+        if generation == self._generation:
+            self._fetching = False
+            self.error.emit(message)
+
+    def _store_window(self, window, rows):
+        self._cache[window] = rows
+        self._cache.move_to_end(window)
+        while len(self._cache) > self.cache_windows:
+            self._cache.popitem(last=False)
+        return rows
@@ -2,7 +2,8 @@ import pytest
 import tempfile
 import os
 import sqlite3
-from database import DatabaseManager
+import database
+from database import DatabaseManager, search_expression
 from models import Artwork
 
 class TestDatabaseAddition:
@@ -237,5 +238,309 @@ class TestDatabaseEdgeCases:
             except PermissionError:
                 pass
 
+class TestDatabaseConnection:
+    
+    def test_connection_is_reused_with_pragmas(self):
+        fd, db_path = tempfile.mkstemp(suffix='.db')
+        try:
+            os.close(fd)
+            
+            db = DatabaseManager(db_path)
+            conn = db.connection
+            
+            db.add_artwork(Artwork(None, "Картина", "Художник", 2000, "Стиль", 10.0, ""))
+            db.get_all_artworks()
+            
+            assert db.connection is conn
+            assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+            assert conn.execute('PRAGMA synchronous').fetchone()[0] == 1
+            assert conn.execute('PRAGMA cache_size').fetchone()[0] == -64000
+            
+            db.close()
+            
+        finally:
+            try:
+                if os.path.exists(db_path):
+                    os.unlink(db_path)
+            except PermissionError:
+                pass
+    
+    def test_close_and_reopen(self):
+        fd, db_path = tempfile.mkstemp(suffix='.db')
+        try:
+            os.close(fd)
+            
+            with DatabaseManager(db_path) as db:
+                artwork_id = db.add_artwork(Artwork(None, "Картина", "Художник", 2000, "Стиль", 10.0, ""))
+            
+            assert db._connections == {}
+            
+            artworks = db.get_all_artworks()
+            assert len(artworks) == 1
+            assert artworks[0].id == artwork_id
+            
+            db.close_thread_connection()
+            assert db._connections == {}
+            
+            db.close()
+            db.close()
+            
+        finally:
+            try:
+                if os.path.exists(db_path):
+                    os.unlink(db_path)
+            except PermissionError:
+                pass
+    
+    def test_logging_goes_through_queue(self):
+        fd, db_path = tempfile.mkstemp(suffix='.db')
+        try:
+            os.close(fd)
+            
+            db = DatabaseManager(db_path)
+            
+            handlers = [handler for handler in database.logger.handlers
+                        if isinstance(handler, database.QueueHandler)]
+            assert len(handlers) == 1
+            assert database.logger.propagate is False
+            
+            DatabaseManager(db_path).close()
+            assert [handler for handler in database.logger.handlers
+                    if isinstance(handler, database.QueueHandler)] == handlers
+            
+            db.close()
+            
+        finally:
+            try:
+                if os.path.exists(db_path):
+                    os.unlink(db_path)
+            except PermissionError:
+                pass
+
+class TestDatabaseWindows:
+    
+    def test_artwork_rows_keyset_pages(self):
+        fd, db_path = tempfile.mkstemp(suffix='.db')
+        try:
+            os.close(fd)
+            
+            db = DatabaseManager(db_path)
+            
+            artwork_ids = [db.add_artwork(Artwork(None, f"Картина {i}", "Художник", 2000, "Стиль", 10.0, ""))
+                           for i in range(7)]
+            
+            first_page = db.get_artwork_rows(3)
+            assert [row[0] for row in first_page] == artwork_ids[:3:-1]
+            
+            second_page = db.get_artwork_rows(3, before_id=first_page[-1][0])
+            assert [row[0] for row in second_page] == artwork_ids[3:0:-1]
+            
+            last_page = db.get_artwork_rows(3, before_id=second_page[-1][0])
+            assert [row[0] for row in last_page] == artwork_ids[:1]
+            assert last_page[0][1] == "Картина 0"
+            
+            db.close()
+            
+        finally:
+            try:
+                if os.path.exists(db_path):
+                    os.unlink(db_path)
+            except PermissionError:
+                pass
+    
+    def test_artwork_rows_between(self):
+        fd, db_path = tempfile.mkstemp(suffix='.db')
+        try:
+            os.close(fd)
+            
+            db = DatabaseManager(db_path)
+            
+            artwork_ids = [db.add_artwork(Artwork(None, f"Картина {i}", "Художник", 2000, "Стиль", 10.0, ""))
+                           for i in range(5)]
+            db.delete_artwork(artwork_ids[2])
+            
+            rows = db.get_artwork_rows_between(artwork_ids[1], artwork_ids[3])
+            assert [row[0] for row in rows] == [artwork_ids[3], artwork_ids[1]]
+            
+            rows = db.get_artwork_rows_by_ids([artwork_ids[4], artwork_ids[2], artwork_ids[0]])
+            assert [row[0] for row in rows] == [artwork_ids[4], artwork_ids[0]]
+            assert db.get_artwork_rows_by_ids([]) == []
+            
+            db.close()
+            
+        finally:
+            try:
+                if os.path.exists(db_path):
+                    os.unlink(db_path)
+            except PermissionError:
+                pass
+
+class TestDatabaseSearch:
+    
+    def add_collection(self, db):
+        artworks_data = [
+            ("Звездная ночь", "Винсент Ван Гог", 1889, "Постимпрессионизм", 100000000.0),
+            ("Подсолнухи", "Винсент Ван Гог", 1888, "Постимпрессионизм", 500000.0),
+            ("Впечатление. Восходящее солнце", "Клод Моне", 1872, "Импрессионизм", 50000.0),
+            ("Черный квадрат", "Казимир Малевич", 1915, "Супрематизм", 5000.0),
+        ]
+        return [db.add_artwork(Artwork(None, title, artist, year, style, price, ""))
+                for title, artist, year, style, price in artworks_data]
+    
+    def test_search_expression(self):
+        assert search_expression("ван го") == '"ван" "го"*'
+        assert search_expression("Ван Гог ") == '"ван" "гог"'
+        assert search_expression('ночь" OR *') == '"ночь" "or"*'
+        assert search_expression("  ") is None
+        assert search_expression("в") is None
+        assert search_expression("ван г") == '"ван"'
+        assert search_expression("a ") == '"a"'
+    
+    def test_full_text_search_follows_changes(self):
+        fd, db_path = tempfile.mkstemp(suffix='.db')
+        try:
+            os.close(fd)
+            
+            db = DatabaseManager(db_path)
+            artwork_ids = self.add_collection(db)
+            
+            rows = db.search_artworks("ван г")
+            assert [row[0] for row in rows] == [artwork_ids[1], artwork_ids[0]]
+            
+            assert [row[1] for row in db.search_artworks("импрессионизм")] == ["Впечатление. Восходящее солнце"]
+            assert [row[1] for row in db.search_artworks("звезд")] == ["Звездная ночь"]
+            
+            db.delete_artwork(artwork_ids[0])
+            assert [row[0] for row in db.search_artworks("ван")] == [artwork_ids[1]]
+            
+            page = db.search_artworks("", limit=2)
+            assert [row[0] for row in page] == [artwork_ids[3], artwork_ids[2]]
+            assert [row[0] for row in db.search_artworks("", limit=2, before_id=page[-1][0])] == [artwork_ids[1]]
+            
+            db.close()
+            
+        finally:
+            try:
+                if os.path.exists(db_path):
+                    os.unlink(db_path)
+            except PermissionError:
+                pass
+    
+    def test_facet_filters_and_counts(self):
+        fd, db_path = tempfile.mkstemp(suffix='.db')
+        try:
+            os.close(fd)
+            
+            db = DatabaseManager(db_path)
+            artwork_ids = self.add_collection(db)
+            
+            rows = db.search_artworks("", year_from=1880, year_to=1900, price_to=1000000)
+            assert [row[0] for row in rows] == [artwork_ids[1]]
+            assert [row[0] for row in db.search_artworks("ван", style="Постимпрессионизм", price_from=1000000)] == \
+                [artwork_ids[0]]
+            
+            facets = db.get_facets("", style="Постимпрессионизм")
+            assert facets['style'][0] == ("Постимпрессионизм", 2)
+            assert len(facets['style']) == 3
+            assert facets['year'] == [(1880, 2)]
+            assert facets['price'] == [((100000, 1000000), 1), ((1000000, None), 1)]
+            
+            assert db.get_styles() == ["Импрессионизм", "Постимпрессионизм", "Супрематизм"]
+            
+            db.close()
+            
+        finally:
+            try:
+                if os.path.exists(db_path):
+                    os.unlink(db_path)
+            except PermissionError:
+                pass
+    
+    def test_search_index_built_for_existing_database(self):
+        fd, db_path = tempfile.mkstemp(suffix='.db')
+        try:
+            os.close(fd)
+            
+            with sqlite3.connect(db_path) as conn:
+                conn.execute(database.CREATE_ARTWORKS_SQL)
+                conn.execute(database.INSERT_ARTWORK_SQL,
+                             ("Грачи прилетели", "Алексей Саврасов", 1871, "Реализм", 1000.0, ""))
+            conn.close()
+            
+            db = DatabaseManager(db_path)
+            assert [row[1] for row in db.search_artworks("грачи")] == ["Грачи прилетели"]
+            
+            db.close()
+            
+        finally:
+            try:
+                if os.path.exists(db_path):
+                    os.unlink(db_path)
+            except PermissionError:
+                pass
+class TestDatabaseChanges:
+    
+    def test_listeners_receive_changes(self):
+        fd, db_path = tempfile.mkstemp(suffix='.db')
+        try:
+            os.close(fd)
+            
+            db = DatabaseManager(db_path)
+            events = []
+            db.add_listener(lambda event, artwork_id: events.append((event, artwork_id)))
+            
+            artwork_id = db.add_artwork(Artwork(None, "Картина", "Художник", 2000, "Стиль", 10.0, ""))
+            db.delete_artwork(artwork_id)
+            db.delete_artwork(artwork_id)
+            assert events == [('inserted', artwork_id), ('deleted', artwork_id)]
+            
+            def failing(event, artwork_id):
+                raise RuntimeError("listener")
+            db.add_listener(failing)
+            second_id = db.add_artwork(Artwork(None, "Картина 2", "Художник", 2000, "Стиль", 10.0, ""))
+            assert events[-1] == ('inserted', second_id)
+            
+            db.remove_listener(failing)
+            db.remove_listener(failing)
+            assert len(db._listeners) == 1
+            
+            db.close()
+            
+        finally:
+            try:
+                if os.path.exists(db_path):
+                    os.unlink(db_path)
+            except PermissionError:
+                pass
+    
+    def test_table_signature(self):
+        fd, db_path = tempfile.mkstemp(suffix='.db')
+        try:
+            os.close(fd)
+            
+            db = DatabaseManager(db_path)
+            assert db.get_table_signature() == (0, 0)
+            
+            artwork_ids = [db.add_artwork(Artwork(None, f"Картина {i}", "Художник", 2000, "Стиль", 10.0, ""))
+                           for i in range(3)]
+            assert db.get_table_signature() == (3, artwork_ids[-1])
+            
+            db.delete_artwork(artwork_ids[0])
+            assert db.get_table_signature() == (2, artwork_ids[-1])
+            
+            db.close()
+            
+            db = DatabaseManager(db_path)
+            assert db.get_table_signature() == (2, artwork_ids[-1])
+            
+            db.close()
+            
+        finally:
+            try:
+                if os.path.exists(db_path):
+                    os.unlink(db_path)
+            except PermissionError:
+                pass
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
\ No newline at end of file
@@ -0,0 +1,137 @@
+import pytest
+import tempfile
+import os
+import time
+from database import DatabaseManager
+from models import Artwork
+
+QtCore = pytest.importorskip("PySide6.QtCore")
+from workers import DatabaseWorker
+
+SLOW_QUERY_SQL = '''
+    WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n)
+    SELECT COUNT(*) FROM n
+'''
+
+def process_events(until, timeout=5.0):
+    app = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+    deadline = time.monotonic() + timeout
+    while not until() and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.001)
+    return until()
+
+class TestDatabaseWorker:
+
+    def test_pool_threads_keep_connections(self):
+        fd, db_path = tempfile.mkstemp(suffix='.db')
+        try:
+            os.close(fd)
+
+            db = DatabaseManager(db_path)
+            worker = DatabaseWorker(readers=2)
+            assert worker.read_pool.expiryTimeout() == -1
+            assert worker.write_pool.expiryTimeout() == -1
+
+            results = []
+            for i in range(20):
+                worker.write(db.add_artwork, Artwork(None, f"Картина {i}", "Художник", 2000, "Стиль", 10.0, ""),
+                             on_result=results.append)
+                worker.read(f'rows.{i}', db.get_artwork_rows, 5, on_result=results.append)
+            assert process_events(lambda: len(results) == 40)
+
+            # Основной поток, один поток записи и не больше двух читающих
+            assert len(db._connections) <= 4
+            assert worker.read_pool.activeThreadCount() == 0
+
+            assert worker.shutdown()
+            db.close()
+
+        finally:
+            try:
+                if os.path.exists(db_path):
+                    os.unlink(db_path)
+            except PermissionError:
+                pass
+
+    def test_shutdown_finishes_writes_and_interrupts_reads(self):
+        fd, db_path = tempfile.mkstemp(suffix='.db')
+        try:
+            os.close(fd)
+
+            db = DatabaseManager(db_path)
+            worker = DatabaseWorker(readers=1)
+
+            errors, started = [], []
+            def slow_read():
+                started.append(True)
+                return db.connection.execute(SLOW_QUERY_SQL).fetchone()
+            worker.read('slow', slow_read, on_error=errors.append)
+            assert process_events(lambda: started)
+
+            def slow_add(artwork):
+                time.sleep(0.3)
+                return db.add_artwork(artwork)
+            worker.write(slow_add, Artwork(None, "Картина", "Художник", 2000, "Стиль", 10.0, ""))
+
+            # Запись не прерывается и не держит поток интерфейса дольше msecs
+            started_at = time.monotonic()
+            assert not worker.shutdown(msecs=50)
+            assert time.monotonic() - started_at < 0.25
+            assert worker.pending_writes == 1
+
+            assert worker.wait_for_writes(1000)
+            assert len(db.get_all_artworks()) == 1
+            assert process_events(lambda: worker.pending_writes == 0)
+
+            assert worker.shutdown(msecs=1000, interrupt=db.interrupt)
+            assert worker.read_pool.activeThreadCount() == 0
+            assert errors == []
+            assert worker.write(db.delete_artwork, 1) is None
+
+            db.close()
+
+        finally:
+            try:
+                if os.path.exists(db_path):
+                    os.unlink(db_path)
+            except PermissionError:
+                pass
+
+    def test_background_reads_leave_table_readers_free(self):
+        fd, db_path = tempfile.mkstemp(suffix='.db')
+        try:
+            os.close(fd)
+
+            db = DatabaseManager(db_path)
+            worker = DatabaseWorker(readers=1, interrupt=db.interrupt)
+
+            started = []
+            def slow_facets():
+                started.append(True)
+                return db.connection.execute(SLOW_QUERY_SQL).fetchone()
+
+            errors, facets, rows = [], [], []
+            worker.read('facets', slow_facets, background=True, on_result=facets.append,
+                        on_error=errors.append)
+            assert process_events(lambda: started)
+
+            # Таблица читает, пока фасеты считаются
+            worker.read('rows', db.get_artwork_rows, 5, on_result=rows.append)
+            assert process_events(lambda: rows == [[]])
+
+            # Новый запрос фасетов прерывает выполняющийся устаревший
+            worker.read('facets', lambda: 'new', background=True, on_result=facets.append,
+                        on_error=errors.append)
+            assert process_events(lambda: facets == ['new'])
+            assert errors == []
+
+            assert worker.shutdown(msecs=1000)
+            db.close()
+
+        finally:
+            try:
+                if os.path.exists(db_path):
+                    os.unlink(db_path)
+            except PermissionError:
+                pass
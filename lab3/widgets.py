@@ -1,11 +1,15 @@
-from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, 
-                              QTableWidgetItem, QLineEdit, QPushButton, QLabel, 
+from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTableView,
+                              QLineEdit, QPushButton, QLabel, QAbstractItemView,
                               QMessageBox, QHeaderView, QFormLayout, QGroupBox,
-                              QMainWindow, QStatusBar, QDialog, QDialogButtonBox)
-from PySide6.QtCore import Qt
+                              QMainWindow, QStatusBar, QDialog, QDialogButtonBox,
+                              QComboBox, QSpinBox, QProgressDialog, QApplication)
+from PySide6.QtCore import Qt, QTimer, Signal
+from PySide6.QtGui import QDoubleValidator
 from datetime import datetime
-from database import DatabaseManager
+from database import DatabaseManager, search_expression
 from models import Artwork, ValidationError
+from table_model import ArtworkTableModel
+from workers import DatabaseWorker
 
 class DeleteConfirmationDialog(QDialog):
     def __init__(self, artwork_title, parent=None):
@@ -23,12 +27,131 @@ class DeleteConfirmationDialog(QDialog):
         layout.addWidget(button_box)
         self.setLayout(layout)
 
+class SearchPanel(QWidget):
+    search_changed = Signal(dict)
+    
+    def __init__(self, delay=250):
+        super().__init__()
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay)
+        self.timer.timeout.connect(lambda: self.search_changed.emit(self.search()))
+        self.init_ui()
+    
+    def init_ui(self):
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        
+        filters_layout = QHBoxLayout()
+        
+        self.text_input = QLineEdit()
+        self.text_input.setPlaceholderText("Поиск по названию, художнику, стилю")
+        self.text_input.setClearButtonEnabled(True)
+        filters_layout.addWidget(self.text_input, 2)
+        
+        self.style_input = QComboBox()
+        filters_layout.addWidget(self.style_input)
+        
+        current_year = datetime.now().year
+        self.year_from_input = QSpinBox()
+        self.year_to_input = QSpinBox()
+        for spin_box in (self.year_from_input, self.year_to_input):
+            spin_box.setRange(99, current_year)
+            spin_box.setSpecialValueText("любой")
+            spin_box.setValue(99)
+        filters_layout.addWidget(QLabel("Год:"))
+        filters_layout.addWidget(self.year_from_input)
+        filters_layout.addWidget(QLabel("—"))
+        filters_layout.addWidget(self.year_to_input)
+        
+        self.price_from_input = QLineEdit()
+        self.price_to_input = QLineEdit()
+        for line_edit, placeholder in ((self.price_from_input, "от"), (self.price_to_input, "до")):
+            line_edit.setValidator(QDoubleValidator(0, 1e12, 2, line_edit))
+            line_edit.setPlaceholderText(placeholder)
+        filters_layout.addWidget(QLabel("Цена (€):"))
+        filters_layout.addWidget(self.price_from_input)
+        filters_layout.addWidget(self.price_to_input)
+        
+        layout.addLayout(filters_layout)
+        
+        self.facets_label = QLabel()
+        self.facets_label.setWordWrap(True)
+        layout.addWidget(self.facets_label)
+        
+        self.text_input.textChanged.connect(self.timer.start)
+        self.style_input.currentIndexChanged.connect(self.timer.start)
+        self.year_from_input.valueChanged.connect(self.timer.start)
+        self.year_to_input.valueChanged.connect(self.timer.start)
+        self.price_from_input.textChanged.connect(self.timer.start)
+        self.price_to_input.textChanged.connect(self.timer.start)
+        
+        self.setLayout(layout)
+    
+    def set_styles(self, styles):
+        current = self.style_input.currentData()
+        self.style_input.blockSignals(True)
+        self.style_input.clear()
+        self.style_input.addItem("Все стили", None)
+        for style in styles:
+            self.style_input.addItem(style, style)
+        index = self.style_input.findData(current)
+        self.style_input.setCurrentIndex(max(index, 0))
+        self.style_input.blockSignals(False)
+    
+    def search(self):
+        search = {}
+        # Одна недописанная буква ещё не поиск (см. search_expression)
+        if search_expression(self.text_input.text()) is not None:
+            search['text'] = self.text_input.text()
+        if self.style_input.currentData():
+            search['style'] = self.style_input.currentData()
+        if self.year_from_input.value() != self.year_from_input.minimum():
+            search['year_from'] = self.year_from_input.value()
+        if self.year_to_input.value() != self.year_to_input.minimum():
+            search['year_to'] = self.year_to_input.value()
+        for key, line_edit in (('price_from', self.price_from_input), ('price_to', self.price_to_input)):
+            try:
+                search[key] = float(line_edit.text().replace(',', '.'))
+            except ValueError:
+                pass
+        return search
+    
+    def show_facets(self, facets):
+        if not facets:
+            self.facets_label.clear()
+            return
+        
+        styles = ", ".join(f"{style} ({count})" for style, count in facets['style'][:8])
+        decades = ", ".join(f"{decade}-е ({count})" for decade, count in facets['year'][-8:])
+        prices = ", ".join(
+            f"{low:,.0f}{f'–{high:,.0f}' if high is not None else '+'} ({count})"
+            for (low, high), count in facets['price'])
+        self.facets_label.setText(f"Стили: {styles}\nДесятилетия: {decades}\nЦены: {prices}")
+
+
 class ArtworkTable(QWidget):
-    def __init__(self):
+    def __init__(self, db=None, worker=None, check_interval=30000, facets_delay=800):
         super().__init__()
-        self.db = DatabaseManager()
+        self.db = db or DatabaseManager()
+        self.worker = worker or DatabaseWorker(parent=self, interrupt=self.db.interrupt)
+        
+        # Фасеты - несколько GROUP BY по всем совпадениям, поэтому считаются
+        # только после паузы в наборе и в фоновом потоке, а не на каждое нажатие
+        self.facets_timer = QTimer(self)
+        self.facets_timer.setSingleShot(True)
+        self.facets_timer.setInterval(facets_delay)
+        self.facets_timer.timeout.connect(lambda: self.load_facets(self.facets_search))
+        self.facets_search = {}
         self.init_ui()
         self.load_data()
+        
+        # Добавления и удаления попадают в таблицу событиями базы; таймер лишь
+        # сверяет число строк и наибольший id на случай изменений извне
+        self.check_timer = QTimer(self)
+        self.check_timer.setInterval(check_interval)
+        self.check_timer.timeout.connect(self.model.check_consistency)
+        self.check_timer.start()
     
     def init_ui(self):
         layout = QVBoxLayout()
@@ -49,34 +172,76 @@ class ArtworkTable(QWidget):
         
         layout.addLayout(header_layout)
         
-        self.table = QTableWidget()
-        self.table.setColumnCount(7)
-        self.table.setHorizontalHeaderLabels([
-            "ID", "Название", "Художник", "Год", "Стиль", "Цена (€)", "Дата добавления"
-        ])
+        self.search_panel = SearchPanel()
+        self.search_panel.set_styles([])
+        self.search_panel.search_changed.connect(self.start_search)
+        layout.addWidget(self.search_panel)
+        
+        self.model = ArtworkTableModel(self.db, self.worker, parent=self)
+        self.model.error.connect(self.on_load_failed)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SingleSelection)
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.table.itemSelectionChanged.connect(self.on_selection_changed)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table.selectionModel().selectionChanged.connect(self.on_selection_changed)
         
         layout.addWidget(self.table)
         self.setLayout(layout)
     
+    def start_search(self, search):
+        self.model.load(search)
+        self.worker.cancel('facets')
+        self.facets_search = search
+        if search:
+            self.facets_timer.start()
+        else:
+            self.facets_timer.stop()
+            self.search_panel.show_facets(None)
+    
+    def load_facets(self, search):
+        if search:
+            self.worker.read('facets', self.db.get_facets, **search, background=True,
+                             on_result=self.search_panel.show_facets)
+        else:
+            self.worker.cancel('facets')
+            self.search_panel.show_facets(None)
+    
+    def refresh_filters(self):
+        # После добавления или удаления строки таблицы уже на месте, обновить
+        # нужно только список стилей и счётчики фасетов
+        self.worker.read('styles', self.db.get_styles, on_result=self.search_panel.set_styles)
+        self.load_facets(self.model.search)
+    
+    def on_load_failed(self, message):
+        QMessageBox.critical(self, "Ошибка", f"Ошибка загрузки данных: {message}")
+    
     def on_selection_changed(self):
-        has_selection = len(self.table.selectedItems()) > 0
+        has_selection = self.table.selectionModel().hasSelection()
         self.delete_btn.setEnabled(has_selection)
     
+    def get_selected_row(self):
+        selected_rows = self.table.selectionModel().selectedRows()
+        if not selected_rows:
+            return None
+        
+        return selected_rows[0].row()
+    
     def get_selected_artwork_id(self):
-        selected_items = self.table.selectedItems()
-        if not selected_items:
+        row = self.get_selected_row()
+        if row is None:
             return None
         
-        return int(self.table.item(selected_items[0].row(), 0).text())
+        return self.model.artwork_id(row)
     
     def get_selected_artwork_title(self):
-        selected_items = self.table.selectedItems()
-        if not selected_items:
+        row = self.get_selected_row()
+        if row is None:
             return None
         
-        return self.table.item(selected_items[0].row(), 1).text()
+        values = self.model.row_values(row)
+        return values[1] if values else f"ID {self.model.artwork_id(row)}"
     
     def delete_selected_artwork(self):
         artwork_id = self.get_selected_artwork_id()
@@ -88,35 +253,32 @@ class ArtworkTable(QWidget):
         
         dialog = DeleteConfirmationDialog(artwork_title, self)
         if dialog.exec() == QDialog.Accepted:
-            try:
-                self.db.delete_artwork(artwork_id)
-                self.load_data()
-                QMessageBox.information(self, "Успех", "Произведение успешно удалено!")
-            except Exception as e:
-                QMessageBox.critical(self, "Ошибка", f"Ошибка при удалении: {str(e)}")
+            self.delete_btn.setEnabled(False)
+            self.worker.write(self.db.delete_artwork, artwork_id,
+                              on_result=self.on_artwork_deleted, on_error=self.on_delete_failed)
+    
+    def on_artwork_deleted(self, _):
+        self.refresh_filters()
+        QMessageBox.information(self, "Успех", "Произведение успешно удалено!")
+    
+    def on_delete_failed(self, message):
+        self.on_selection_changed()
+        QMessageBox.critical(self, "Ошибка", f"Ошибка при удалении: {message}")
     
     def load_data(self):
         try:
-            artworks = self.db.get_all_artworks()
-            self.table.setRowCount(len(artworks))
-            
-            for row, artwork in enumerate(artworks):
-                self.table.setItem(row, 0, QTableWidgetItem(str(artwork.id)))
-                self.table.setItem(row, 1, QTableWidgetItem(artwork.title))
-                self.table.setItem(row, 2, QTableWidgetItem(artwork.artist))
-                self.table.setItem(row, 3, QTableWidgetItem(str(artwork.year)))
-                self.table.setItem(row, 4, QTableWidgetItem(artwork.style))
-                self.table.setItem(row, 5, QTableWidgetItem(f"{artwork.price:,.2f}"))
-                self.table.setItem(row, 6, QTableWidgetItem(artwork.created_at))
+            self.worker.read('styles', self.db.get_styles, on_result=self.search_panel.set_styles)
+            self.model.reload()
                 
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Ошибка загрузки данных: {str(e)}")
 
 class InputForm(QWidget):
-    def __init__(self, table_widget):
+    def __init__(self, table_widget, db=None, worker=None):
         super().__init__()
         self.table_widget = table_widget
-        self.db = DatabaseManager()
+        self.db = db or table_widget.db
+        self.worker = worker or table_widget.worker
         self.init_ui()
     
     def init_ui(self):
@@ -177,14 +339,24 @@ class InputForm(QWidget):
                 created_at=""
             )
             
-            self.db.add_artwork(artwork)
-            self.table_widget.load_data()
-            self.clear_form()
-            QMessageBox.information(self, "Успех", "Произведение успешно добавлено!")
+            artwork.validate()
+            self.add_btn.setEnabled(False)
+            self.worker.write(self.db.add_artwork, artwork,
+                              on_result=self.on_artwork_added, on_error=self.on_add_failed)
             
         except (ValidationError, Exception) as e:
             QMessageBox.critical(self, "Ошибка", str(e))
     
+    def on_artwork_added(self, _):
+        self.add_btn.setEnabled(True)
+        self.table_widget.refresh_filters()
+        self.clear_form()
+        QMessageBox.information(self, "Успех", "Произведение успешно добавлено!")
+    
+    def on_add_failed(self, message):
+        self.add_btn.setEnabled(True)
+        QMessageBox.critical(self, "Ошибка", message)
+    
     def clear_form(self):
         self.title_input.clear()
         self.artist_input.clear()
@@ -197,6 +369,7 @@ class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.db = DatabaseManager()
+        self.worker = DatabaseWorker(parent=self, interrupt=self.db.interrupt)
         self.init_ui()
     
     def init_ui(self):
@@ -206,10 +379,10 @@ class MainWindow(QMainWindow):
         central_widget = QWidget()
         main_layout = QVBoxLayout()
         
-        self.table_widget = ArtworkTable()
+        self.table_widget = ArtworkTable(self.db, self.worker)
         main_layout.addWidget(self.table_widget)
         
-        self.input_form = InputForm(self.table_widget)
+        self.input_form = InputForm(self.table_widget, self.db, self.worker)
         main_layout.addWidget(self.input_form)
         
         central_widget.setLayout(main_layout)
@@ -218,6 +391,10 @@ class MainWindow(QMainWindow):
         self.status_bar = QStatusBar()
         self.setStatusBar(self.status_bar)
         self.status_bar.showMessage("Готов к работе")
+        self.worker.busy_changed.connect(self.on_busy_changed)
+    
+    def on_busy_changed(self, busy):
+        self.status_bar.showMessage("Загрузка..." if busy else "Готов к работе")
         
         
     def closeEvent(self, event):
@@ -228,7 +405,34 @@ class MainWindow(QMainWindow):
             QMessageBox.No
         )
         
-        if reply == QMessageBox.Yes:
-            event.accept()
-        else:
-            event.ignore()
\ No newline at end of file
+        if reply != QMessageBox.Yes or not self.finish_writes():
+            event.ignore()
+            return
+        
+        # Соединения закрываются, только если ни один запрос их уже не использует
+        if self.worker.shutdown(interrupt=self.db.interrupt):
+            self.db.close()
+        event.accept()
+    
+    def finish_writes(self):
+        # Начатые добавления и удаления не прерываются. Долгая запись
+        # дожидается с окном прогресса, а не замораживает окно; отмена
+        # возвращает к работе с программой
+        if self.worker.wait_for_writes(200):
+            return True
+        
+        progress = QProgressDialog("Сохранение изменений...", "Отменить выход", 0, 0, self)
+        progress.setWindowTitle("Завершение работы")
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setMinimumDuration(0)
+        progress.show()
+        while not self.worker.wait_for_writes(50):
+            QApplication.processEvents()
+            if progress.wasCanceled():
+                self.status_bar.showMessage(
+                    f"Выход отменён: не завершено записей - {self.worker.pending_writes}")
+                return False
+            progress.setLabelText(
+                f"Сохранение изменений: не завершено записей - {self.worker.pending_writes}")
+        progress.close()
+        return True
\ No newline at end of file
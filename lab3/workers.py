@@ -0,0 +1,176 @@
+import threading
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal, Slot
+
+
+class TaskSignals(QObject):
+    finished = Signal(object, object)
+    failed = Signal(object, str)
+
+
+class DatabaseTask(QRunnable):
+    # Один запрос к базе в пуле потоков. Результат уходит сигналом в поток
+    # интерфейса; отменённая до запуска задача не выполняется. Временем жизни
+    # задачи управляет DatabaseWorker, а не пул (autoDelete выключен)
+    def __init__(self, key, func, args, kwargs, on_result=None, on_error=None):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.key = key
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.on_result = on_result
+        self.on_error = on_error
+        self.pool = None
+        self.cancelled = False
+        self.signals = TaskSignals()
+        # Поток, в котором сейчас выполняется func (None - не выполняется)
+        self._thread_id = None
+        self._lock = threading.Lock()
+
+    def cancel(self, interrupt=None):
+        # interrupt(thread_id) прерывает запрос уже выполняющейся задачи; под
+        # блокировкой, чтобы не задеть следующую задачу того же потока
+        with self._lock:
+            self.cancelled = True
+            if interrupt is not None and self._thread_id is not None:
+                interrupt(self._thread_id)
+
+    def run(self):
+        with self._lock:
+            if not self.cancelled:
+                self._thread_id = threading.get_ident()
+        if self._thread_id is None:
+            self.signals.finished.emit(self, None)
+            return
+        try:
+            result = self.func(*self.args, **self.kwargs)
+        except Exception as e:
+            self._finish()
+            self.signals.failed.emit(self, str(e))
+            return
+        self._finish()
+        self.signals.finished.emit(self, result)
+
+    def _finish(self):
+        with self._lock:
+            self._thread_id = None
+
+
+class DatabaseWorker(QObject):
+    # Вся работа с базой вне потока интерфейса. Чтение идёт в пуле из readers
+    # потоков (у каждого своё соединение, WAL), запись - в одном потоке строго по
+    # порядку. Чтения с одним ключом объединяются: новый запрос отменяет ещё не
+    # начатый прежний, а ответ прежнего, если он уже выполняется, отбрасывается.
+    # Колбэки вызываются в потоке интерфейса. Потоки пулов не завершаются по
+    # простою: у каждого потока своё соединение с базой, и новый поток открывал
+    # бы новое.
+    # Долгие агрегаты (background=True) идут в отдельном потоке и не занимают
+    # читателей таблицы. Если задан interrupt(thread_id), выполняющееся
+    # устаревшее чтение прерывается, а не досчитывается впустую
+    busy_changed = Signal(bool)
+
+    def __init__(self, readers=2, parent=None, interrupt=None):
+        super().__init__(parent)
+        self.read_pool = QThreadPool(self)
+        self.read_pool.setMaxThreadCount(readers)
+        self.read_pool.setExpiryTimeout(-1)
+        self.background_pool = QThreadPool(self)
+        self.background_pool.setMaxThreadCount(1)
+        self.background_pool.setExpiryTimeout(-1)
+        self.write_pool = QThreadPool(self)
+        self.write_pool.setMaxThreadCount(1)
+        self.write_pool.setExpiryTimeout(-1)
+        self.interrupt = interrupt
+        self._latest = {}
+        self._running = set()
+        self._closed = False
+
+    @property
+    def busy(self):
+        return bool(self._running)
+
+    def read(self, key, func, *args, on_result=None, on_error=None, background=False, **kwargs):
+        self.cancel(key)
+        pool = self.background_pool if background else self.read_pool
+        task = self._submit(pool, key, func, args, kwargs, on_result, on_error)
+        if task is not None:
+            self._latest[key] = task
+        return task
+
+    def write(self, func, *args, on_result=None, on_error=None, **kwargs):
+        return self._submit(self.write_pool, None, func, args, kwargs, on_result, on_error)
+
+    def cancel(self, key):
+        task = self._latest.pop(key, None)
+        if task is None:
+            return
+        if task.pool.tryTake(task):
+            task.cancel()
+            self._forget(task)
+        else:
+            task.cancel(self.interrupt)
+
+    def is_pending(self, key):
+        return key in self._latest
+
+    @property
+    def pending_writes(self):
+        # Принятые записи, о завершении которых поток интерфейса ещё не узнал
+        return sum(1 for task in self._running if task.pool is self.write_pool)
+
+    def wait_for_writes(self, msecs):
+        return self.write_pool.waitForDone(msecs)
+
+    def shutdown(self, msecs=5000, interrupt=None):
+        # Незапущенные чтения отменяются. Принятые записи не прерываются (иначе
+        # изменения потеряются), их ждём не дольше msecs; если не успели - False,
+        # соединения закрывать нельзя (дождаться можно через wait_for_writes).
+        # Чтения, не успевшие за msecs, прерываются interrupt() (записей к этому
+        # моменту уже нет). True - все потоки остановлены и соединения можно закрывать
+        self._closed = True
+        for key in list(self._latest):
+            self.cancel(key)
+        if not self.wait_for_writes(msecs):
+            return False
+        if self._wait_reads(msecs):
+            return True
+        if interrupt is None:
+            return False
+        interrupt()
+        return self._wait_reads(msecs)
+
+    def _wait_reads(self, msecs):
+        return self.read_pool.waitForDone(msecs) and self.background_pool.waitForDone(msecs)
+
+    def _submit(self, pool, key, func, args, kwargs, on_result, on_error):
+        if self._closed:
+            return None
+        task = DatabaseTask(key, func, args, kwargs, on_result, on_error)
+        task.pool = pool
+        task.signals.finished.connect(self._on_finished)
+        task.signals.failed.connect(self._on_failed)
+        self._running.add(task)
+        if len(self._running) == 1:
+            self.busy_changed.emit(True)
+        pool.start(task)
+        return task
+
+    def _forget(self, task):
+        if task.key is not None and self._latest.get(task.key) is task:
+            del self._latest[task.key]
+        self._running.discard(task)
+        if not self._running:
+            self.busy_changed.emit(False)
+
+    @Slot(object, object)
+    def _on_finished(self, task, result):
+        self._forget(task)
+        if not task.cancelled and not self._closed and task.on_result is not None:
+            task.on_result(result)
+
+    @Slot(object, str)
+    def _on_failed(self, task, message):
+        self._forget(task)
+        if not task.cancelled and not self._closed and task.on_error is not None:
+            task.on_error(message)